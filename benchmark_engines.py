@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""Benchmark of DockerSimManager's execution engines
+
+Runs the same jobs with the thread engine (docker SDK, one worker thread per running job) and with the asyncio engine
+against a fake Docker Engine API, which is served over a unix socket by a separate process. Reports throughput and
+the manager's CPU time, thread count and memory per in-flight job.
+"""
+
+import getopt
+import multiprocessing
+import resource
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import docker
+from loguru import logger
+
+from docker_sim_manager import DockerSimManager, SimJob, ENGINES
+from fake_docker import serve_fake_docker_api
+
+__author__ = "Michael Wittmann"
+
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+
+class OfflineSimManager(DockerSimManager):
+    def _authenticate_at_container_registry(self):
+        pass
+
+
+def _rss() -> int:
+    """
+    :return: resident set size of this process in bytes
+    """
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+class _Sampler():
+    def __init__(self, interval: float = 0.01) -> None:
+        """
+        Samples the peak thread count and resident memory of this process
+        """
+        self._interval = interval
+        self._stopped = threading.Event()
+        self.peak_threads = 0
+        self.peak_rss = 0
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stopped.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count() - 1)
+            self.peak_rss = max(self.peak_rss, _rss())
+            self._stopped.wait(self._interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+def run_engine(engine: str, docker_url: str, jobs: int, workers: int) -> dict:
+    """
+    Runs jobs with a new DockerSimManager
+    :return: measurements of the run
+    """
+    with tempfile.TemporaryDirectory() as data_directory:
+        manager = OfflineSimManager('fake/sim-image', workers, Path(data_directory),
+                                    docker_client=docker.DockerClient(base_url=docker_url),
+                                    engine=engine, docker_url=docker_url, journal=False)
+        baseline_rss = _rss()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        tic = time.perf_counter()
+        with _Sampler() as sampler:
+            succeeded = sum(result for _, result in manager.stream_computation(
+                SimJob(f'job{i}', None, command=f'-r {i}') for i in range(jobs)))
+        wall_time = time.perf_counter() - tic
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_time = usage_after.ru_utime - usage.ru_utime + usage_after.ru_stime - usage.ru_stime
+        return {
+            'succeeded': succeeded,
+            'jobs/s': jobs / wall_time,
+            'cpu ms/job': 1000 * cpu_time / jobs,
+            'threads': sampler.peak_threads,
+            'KiB/in-flight job': (sampler.peak_rss - baseline_rss) / 1024 / workers,
+        }
+
+
+def main(argv):
+    jobs: int = 1000
+    workers: int = 200
+    job_time: float = 0.5
+    usage = 'benchmark_engines.py -n <jobs> -w <workers> -j <job_time>'
+
+    try:
+        opts, args = getopt.getopt(argv, 'hn:w:j:', ['jobs=', 'workers=', 'job_time='])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit(0)
+
+        if opt in ('-n', '--jobs'):
+            jobs = int(arg)
+
+        if opt in ('-w', '--workers'):
+            workers = int(arg)
+
+        if opt in ('-j', '--job_time'):
+            job_time = float(arg)
+
+    logger.remove()
+    with tempfile.TemporaryDirectory() as socket_directory:
+        socket_path = Path(socket_directory).joinpath('docker.sock')
+        server = multiprocessing.Process(target=serve_fake_docker_api, args=(socket_path, job_time), daemon=True)
+        server.start()
+        while not socket_path.exists():
+            time.sleep(0.01)
+        try:
+            print(f'{"engine":>10}{"jobs":>7}{"workers":>9}{"ok":>7}{"jobs/s":>9}{"cpu ms/job":>12}{"threads":>9}'
+                  f'{"KiB/in-flight job":>19}')
+            for engine in ENGINES:
+                result = run_engine(engine, f'unix://{socket_path}', jobs, workers)
+                print(f'{engine:>10}{jobs:>7}{workers:>9}{result["succeeded"]:>7}{result["jobs/s"]:>9.1f}'
+                      f'{result["cpu ms/job"]:>12.2f}{result["threads"]:>9}{result["KiB/in-flight job"]:>19.1f}')
+        finally:
+            server.terminate()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,507 @@
+#!/usr/bin/env python
+"""Offline benchmark suite of DockerSimManager and the example simulation kernels
+
+Measures the scheduling throughput and per-job overhead of DockerSimManager against the in-process FakeDockerClient
+with configurable job durations, failure rates and log volumes, the makespan of the example sweeps dispatched in
+order or longest predicted first, the throughput of tiny jobs with and without job fusion, the makespan of sweeps with
+stragglers with and without speculative execution, MonteCarloPi.estimate_pi across sample counts and
+sprithering.main across image sizes. Results are written as JSON. Pass the JSON of an earlier commit with -b to
+compare both runs; the script exits with 1 if a benchmark became slower than the tolerance allows.
+"""
+
+import contextlib
+import getopt
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from docker_sim_manager import DockerSimManager, SimJob
+from docker_sim_runtimes import RuntimeHistory, command_parameters
+from docker_sim_sweep import IntUniform, ParameterSweep, chain_sweeps
+from fake_docker import FakeDockerClient, synthetic_job
+
+__author__ = "Michael Wittmann"
+
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+SUITES = ('manager', 'order', 'fusion', 'speculation', 'pi', 'art')
+# container create, start and remove and the start of the simulation's interpreter with its imports, a tenth of
+# typical timings of a local docker daemon and a Python simulation importing numpy and matplotlib
+FUSION_OVERHEADS = {'create_time': 0.005, 'start_time': 0.015, 'remove_time': 0.003, 'process_time': 0.05}
+
+
+class OfflineSimManager(DockerSimManager):
+    def _authenticate_at_container_registry(self):
+        pass
+
+
+def _cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _measure(run, repetitions: int):
+    """
+    Runs a benchmark repetitions times after one warm-up run
+    :param run: function returning a dict of metrics of one repetition
+    :return: (wall times in s, metrics of the repetition with the median wall time)
+    """
+    run()
+    measurements = []
+    for _ in range(repetitions):
+        tic = time.perf_counter()
+        metrics = run()
+        measurements.append((time.perf_counter() - tic, metrics))
+    measurements.sort(key=lambda measurement: measurement[0])
+    return [seconds for seconds, _ in measurements], measurements[len(measurements) // 2][1]
+
+
+def _result(suite: str, params: dict, seconds, metrics: dict) -> dict:
+    return {
+        'suite': suite,
+        'name': f'{suite}/' + ','.join(f'{key}={value}' for key, value in params.items()),
+        'params': params,
+        'seconds': statistics.median(seconds),
+        'seconds_min': min(seconds),
+        'repetitions': len(seconds),
+        'metrics': metrics,
+    }
+
+
+def benchmark_manager(jobs: int, workers: int, job_times, failure_rates, log_sizes, repetitions: int):
+    """
+    Runs jobs through DockerSimManager for every combination of job time, failure rate and log size
+    :return: list of results
+    """
+    results = []
+    for job_time, failure_rate, log_bytes in itertools.product(job_times, failure_rates, log_sizes):
+
+        def run():
+            docker_client = FakeDockerClient(job=synthetic_job(job_time, failure_rate, log_bytes))
+            docker_client.images.pull('fake/sim-image', tag='latest')
+            with tempfile.TemporaryDirectory() as data_directory:
+                manager = OfflineSimManager('fake/sim-image', workers, Path(data_directory),
+                                            docker_client=docker_client, pull_policy='if-not-present')
+                cpu_time = _cpu_time()
+                tic = time.perf_counter()
+                succeeded = sum(result for _, result in manager.stream_computation(
+                    SimJob(f'job{i}', None, command=f'-r {i}') for i in range(jobs)))
+                wall_time = time.perf_counter() - tic
+                summary = manager.telemetry_summary
+                return {
+                    'jobs_per_second': jobs / wall_time,
+                    'failed': jobs - succeeded,
+                    'cpu_ms_per_job': 1000 * (_cpu_time() - cpu_time) / jobs,
+                    # wall time beyond the ideal makespan of the simulated jobs
+                    'overhead_ms_per_job': 1000 * max(0.0, wall_time - jobs * job_time / workers) * workers / jobs,
+                    'manager_overhead_ms_per_job': 1000 * summary['overhead_mean_seconds'],
+                    'latency_p95_seconds': summary['latency_p95_seconds'],
+                    'queue_wait_p95_seconds': summary['queue_wait_p95_seconds'],
+                    'worker_utilization': summary['worker_utilization'],
+                }
+
+        params = {'jobs': jobs, 'workers': workers, 'job_time': job_time, 'failure_rate': failure_rate,
+                  'log_bytes': log_bytes}
+        seconds, metrics = _measure(run, repetitions)
+        results.append(_result('manager', params, seconds, metrics))
+    return results
+
+
+def benchmark_fusion(jobs: int, workers: int, batch_sizes, job_time: float, repetitions: int):
+    """
+    Runs tiny jobs against a FakeDockerClient, which simulates the start of containers and of the simulation
+    process, in one container each and fused into batches
+    :param batch_sizes: values of fuse_jobs, None runs every job in its own container
+    :param job_time: simulated runtime of each job
+    :return: list of results
+    """
+    results = []
+    for batch_size in batch_sizes:
+
+        def run():
+            docker_client = FakeDockerClient(job=synthetic_job(job_time), **FUSION_OVERHEADS)
+            docker_client.images.pull('fake/sim-image', tag='latest')
+            with tempfile.TemporaryDirectory() as data_directory:
+                manager = OfflineSimManager('fake/sim-image', workers, Path(data_directory),
+                                            docker_client=docker_client, pull_policy='if-not-present',
+                                            fuse_jobs=batch_size, fuse_unknown_jobs=True)
+                tic = time.perf_counter()
+                succeeded = sum(result for _, result in manager.stream_computation(
+                    SimJob(f'IT{i}', None, command=f'-o /mnt/data -r {i} -i 100') for i in range(jobs)))
+                wall_time = time.perf_counter() - tic
+                return {
+                    'jobs_per_second': jobs / wall_time,
+                    'failed': jobs - succeeded,
+                    'containers': docker_client.containers.created,
+                    'overhead_ms_per_job': 1000 * manager.telemetry_summary['overhead_mean_seconds'],
+                }
+
+        seconds, metrics = _measure(run, repetitions)
+        results.append(_result('fusion', {'jobs': jobs, 'workers': workers, 'fuse_jobs': batch_size,
+                                          'job_time': job_time}, seconds, metrics))
+    unfused = [result for result in results if result['params']['fuse_jobs'] is None]
+    for result in results:
+        if unfused and result is not unfused[0]:
+            result['metrics']['speedup'] = unfused[0]['seconds'] / result['seconds']
+    return results
+
+
+def benchmark_speculation(jobs: int, workers: int, job_time: float, repetitions: int, straggler_every: int = 20,
+                          slowdown: float = 30.0):
+    """
+    Runs a sweep, in which the first run of every straggler_every-th job is slowdown times slower than its peers, e.g.
+    on an overloaded node, with and without speculative execution
+    :param job_time: simulated runtime of a regular job
+    :return: list of results
+    """
+    def job(command, host_dir):
+        index = int(host_dir.name.split('_')[1][2:])
+        straggler = index % straggler_every == straggler_every - 1 and not host_dir.name.endswith('_speculative')
+        time.sleep(job_time * (slowdown if straggler else 1.0))
+        return 0, b''
+
+    results = []
+    for speculate in (None, 3.0):
+
+        def run():
+            docker_client = FakeDockerClient(job=job)
+            docker_client.images.pull('fake/sim-image', tag='latest')
+            with tempfile.TemporaryDirectory() as data_directory:
+                manager = OfflineSimManager('fake/sim-image', workers, Path(data_directory),
+                                            docker_client=docker_client, pull_policy='if-not-present',
+                                            speculate=speculate)
+                tic = time.perf_counter()
+                succeeded = sum(result for _, result in manager.stream_computation(
+                    SimJob(f'IT{i}', None, command=f'-o /mnt/data -r {i}') for i in range(jobs)))
+                return {
+                    'makespan_seconds': time.perf_counter() - tic,
+                    'failed': jobs - succeeded,
+                    'latency_p95_seconds': manager.telemetry_summary['latency_p95_seconds'],
+                    'speculative_runs': docker_client.containers.created - jobs,
+                }
+
+        seconds, metrics = _measure(run, repetitions)
+        results.append(_result('speculation', {'jobs': jobs, 'workers': workers, 'job_time': job_time,
+                                               'speculate': speculate}, seconds, metrics))
+    results[1]['metrics']['makespan_reduction'] = 1 - results[1]['seconds'] / results[0]['seconds']
+    return results
+
+
+def _art_cost(parameters: dict) -> float:
+    # rendering time grows with the image area, the number of samples and the sprites per image
+    return parameters['-n'] * (parameters['-s'] / 1000) ** 2 * (1 + parameters['-g'] * parameters['-i'] / 300)
+
+
+def _pi_cost(parameters: dict) -> float:
+    return parameters['-i']
+
+
+def _order_workloads():
+    """
+    :return: dict of workload name to (image, cost function, sweeps of the measured run, sweep of the history)
+    """
+    art_command = '-g {grid_size} -i {invaders} -s {img_size} -o /mnt/data -n {samples}'
+    art = [
+        ParameterSweep('-g {grid_size} -i 30 -s 5000 -o /mnt/data -n 50', {'grid_size': range(1, 10)},
+                       name='randomArt_size{grid_size}x{grid_size}'),
+        ParameterSweep('-g 10 -i {invaders} -s 5000 -o /mnt/data -n 50', {'invaders': range(1, 10)},
+                       name='random_Art_invaders_{invaders}'),
+        ParameterSweep('-g 10 -i 30 -s {img_size} -o /mnt/data -n {samples}',
+                       {'img_size': [500, 1000, 2000, 5000], 'samples': [5, 50]},
+                       name='random_Art_{img_size}px_{samples}'),
+    ]
+    art_history = ParameterSweep(art_command, {'grid_size': IntUniform(1, 15), 'invaders': IntUniform(1, 40),
+                                               'img_size': [500, 1000, 2000, 3000], 'samples': [5, 10, 50]},
+                                 'random', samples=30, seed=1)
+    pi = [ParameterSweep('-o /mnt/data -r {random_seed} -i {iterations}',
+                         {'random_seed': range(1, 7), 'iterations': [100, 1000, 10000]},
+                         name='IT{random_seed}_{iterations}')]
+    pi_history = ParameterSweep('-o /mnt/data -r {random_seed} -i {iterations}',
+                                {'random_seed': IntUniform(100, 10 ** 6), 'iterations': [100, 300, 1000, 3000, 10000]},
+                                'random', samples=15, seed=1)
+    return {
+        'art': ('fake/random-art-image', _art_cost, art, art_history),
+        'pi': ('fake/monte-carlo-pi-image', _pi_cost, pi, pi_history),
+    }
+
+
+def benchmark_order(workers: int, work_seconds: float, repetitions: int):
+    """
+    Runs the example sweeps against a FakeDockerClient, whose jobs sleep proportionally to a cost model of their
+    command, once in the order of the sweeps and once longest predicted first. The runtime history of every run is
+    seeded with the runtimes of a random sweep of other parameter points, so the predictions come from the fitted
+    cost model.
+    :param workers: number of parallel workers
+    :param work_seconds: simulated work per worker, i.e. the ideal makespan of each sweep
+    :return: list of results
+    """
+    results = []
+    for workload, (image, cost, sweeps, history_sweep) in _order_workloads().items():
+        costs = [cost(command_parameters(sim_job.command)) for sim_job in chain_sweeps(*sweeps)]
+        scale = work_seconds * workers / sum(costs)
+
+        def job(command, host_dir):
+            time.sleep(scale * cost(command_parameters(command)))
+            return 0, b''
+
+        docker_client = FakeDockerClient(job=job)
+        docker_client.images.pull(image, tag='latest')
+        makespans = {}
+        for job_order in ('fifo', 'lpt'):
+
+            def run():
+                with tempfile.TemporaryDirectory() as data_directory:
+                    history = RuntimeHistory(Path(data_directory).joinpath('docker_sim_runtimes.sqlite'))
+                    for sim_job in history_sweep.jobs():
+                        history.record(f'{image}:latest', sim_job.command,
+                                       scale * cost(command_parameters(sim_job.command)))
+                    manager = OfflineSimManager(image, workers, Path(data_directory), docker_client=docker_client,
+                                                pull_policy='if-not-present', telemetry_format=None,
+                                                stats_interval=None, journal=False, job_order=job_order,
+                                                runtime_history=history.path)
+                    for _ in manager.stream_computation(chain_sweeps(*sweeps)):
+                        pass
+                    return {'makespan_seconds': manager.telemetry_summary['wall_seconds'],
+                            'worker_utilization': manager.telemetry_summary['worker_utilization']}
+
+            seconds, metrics = _measure(run, repetitions)
+            makespans[job_order] = statistics.median(seconds)
+            # no schedule is shorter than the average work per worker or the longest job
+            metrics['makespan_lower_bound_seconds'] = max(work_seconds, scale * max(costs))
+            if job_order == 'lpt':
+                metrics['makespan_reduction'] = 1 - makespans['lpt'] / makespans['fifo']
+            results.append(_result('order', {'workload': workload, 'jobs': len(costs), 'workers': workers,
+                                             'job_order': job_order}, seconds, metrics))
+    return results
+
+
+def benchmark_pi(sample_counts, repetitions: int):
+    """
+    Estimates pi without plot for every sample count
+    :return: list of results
+    """
+    from example_monte_carlo_pi.monte_carlo_pi import MonteCarloPi
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for iterations in sample_counts:
+
+            def run():
+                simulation = MonteCarloPi(iterations=iterations, random_seed=1, output_dir=Path(output_dir),
+                                          plot_samples=0)
+                simulation.estimate_pi()
+                return {'n_samples': simulation.n_samples}
+
+            seconds, metrics = _measure(run, repetitions)
+            metrics['samples_per_second'] = metrics['n_samples'] / statistics.median(seconds)
+            results.append(_result('pi', {'iterations': iterations}, seconds, metrics))
+    return results
+
+
+def benchmark_art(configurations, samples: int, repetitions: int):
+    """
+    Renders and saves samples images with sprithering.main for every (grid size, invaders, image size)
+    :return: list of results
+    """
+    from example_random_art import sprithering
+
+    results = []
+    for size, invaders, imgSize in configurations:
+
+        def run():
+            with tempfile.TemporaryDirectory() as output_path, contextlib.redirect_stdout(io.StringIO()):
+                sprithering.main(size=size, invaders=invaders, imgSize=imgSize, output_path=Path(output_path),
+                                 samples=samples, seed=1)
+                image_bytes = sum(path.stat().st_size for path in Path(output_path).iterdir())
+                return {'bytes_per_image': image_bytes // samples}
+
+        seconds, metrics = _measure(run, repetitions)
+        metrics['images_per_second'] = samples / statistics.median(seconds)
+        results.append(_result('art', {'grid_size': size, 'invaders': invaders, 'img_size': imgSize,
+                                       'samples': samples}, seconds, metrics))
+    return results
+
+
+def environment() -> dict:
+    """
+    :return: description of the machine and code version the benchmarks ran on
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=str(Path(__file__).parent),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+                                universal_newlines=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    Prints the median wall time of every benchmark against a baseline run
+    :param results: results of this run
+    :param baseline: results of the baseline run
+    :param tolerance: allowed relative slowdown
+    :return: names of the benchmarks, which became slower than the tolerance allows
+    """
+    baseline = dict((result['name'], result) for result in baseline)
+    regressions = []
+    print(f'\n{"benchmark":<80}{"baseline [s]":>14}{"current [s]":>13}{"change":>9}')
+    for result in results:
+        reference = baseline.get(result['name'])
+        if reference is None:
+            continue
+        change = result['seconds'] / reference['seconds'] - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(result['name'])
+            flag = '  slower'
+        print(f'{result["name"]:<80}{reference["seconds"]:>14.4f}{result["seconds"]:>13.4f}{change:>+9.1%}{flag}')
+    return regressions
+
+
+def main(argv):
+    suites = list(SUITES)
+    output_file: Path = None
+    baseline_file: Path = None
+    tolerance: float = 0.1
+    repetitions: int = 3
+    jobs: int = 200
+    workers: int = 8
+    job_times = [0.0, 0.02]
+    failure_rates = [0.0, 0.1]
+    log_sizes = [0, 1024 ** 2]
+    sample_counts = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+    art_configurations = [(15, 30, 500), (15, 30, 1000), (15, 30, 3000)]
+    art_samples: int = 2
+    work_seconds: float = 1.0
+    fusion_batch_sizes = [None, 10, 100]
+    usage = ('benchmark_suite.py -s <comma separated suites: manager,order,fusion,speculation,pi,art> -o <result json> '
+             '-b <baseline json> -t <tolerance> -r <repetitions> -n <jobs> -w <workers> -j <comma separated job times> '
+             '-f <comma separated failure rates> -l <comma separated log bytes> -i <comma separated pi iterations> '
+             '-g <comma separated image sizes> -m <simulated work per worker of the order suite> '
+             '-u <comma separated fuse_jobs, 0 for no fusion> --quick')
+
+    try:
+        opts, args = getopt.getopt(argv, 'hs:o:b:t:r:n:w:j:f:l:i:g:m:u:',
+                                   ['suites=', 'output=', 'baseline=', 'tolerance=', 'repetitions=', 'jobs=',
+                                    'workers=', 'job_times=', 'failure_rates=', 'log_bytes=', 'iterations=',
+                                    'img_sizes=', 'work_seconds=', 'fuse_jobs=', 'quick'])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit(0)
+
+        if opt in ('-s', '--suites'):
+            suites = arg.split(',')
+            if not set(suites) <= set(SUITES):
+                print(usage)
+                sys.exit(2)
+
+        if opt in ('-o', '--output'):
+            output_file = Path(arg)
+
+        if opt in ('-b', '--baseline'):
+            baseline_file = Path(arg)
+
+        if opt in ('-t', '--tolerance'):
+            tolerance = float(arg)
+
+        if opt in ('-r', '--repetitions'):
+            repetitions = int(arg)
+
+        if opt in ('-n', '--jobs'):
+            jobs = int(arg)
+
+        if opt in ('-w', '--workers'):
+            workers = int(arg)
+
+        if opt in ('-j', '--job_times'):
+            job_times = [float(value) for value in arg.split(',')]
+
+        if opt in ('-f', '--failure_rates'):
+            failure_rates = [float(value) for value in arg.split(',')]
+
+        if opt in ('-l', '--log_bytes'):
+            log_sizes = [int(value) for value in arg.split(',')]
+
+        if opt in ('-i', '--iterations'):
+            sample_counts = [int(value) for value in arg.split(',')]
+
+        if opt in ('-g', '--img_sizes'):
+            art_configurations = [(15, 30, int(value)) for value in arg.split(',')]
+
+        if opt in ('-m', '--work_seconds'):
+            work_seconds = float(arg)
+
+        if opt in ('-u', '--fuse_jobs'):
+            fusion_batch_sizes = [int(value) or None for value in arg.split(',')]
+
+        if opt == '--quick':
+            repetitions = 1
+            jobs = 50
+            work_seconds = 0.5
+            sample_counts = [10 ** 4, 10 ** 5]
+            art_configurations = [(15, 30, 500)]
+
+    logger.remove()
+    report = environment()
+    if output_file is None:
+        output_file = Path(f'benchmark_{report["commit"] or time.strftime("%Y%m%d-%H%M%S")}.json')
+    results = []
+    print(f'{"benchmark":<80}{"median [s]":>12}{"min [s]":>10}')
+    for suite in suites:
+        if suite == 'manager':
+            suite_results = benchmark_manager(jobs, workers, job_times, failure_rates, log_sizes, repetitions)
+        elif suite == 'order':
+            suite_results = benchmark_order(workers, work_seconds, repetitions)
+        elif suite == 'fusion':
+            suite_results = benchmark_fusion(jobs, workers, fusion_batch_sizes, 0.001, repetitions)
+        elif suite == 'speculation':
+            suite_results = benchmark_speculation(max(jobs // 5, 20), workers, 0.05, repetitions)
+        elif suite == 'pi':
+            suite_results = benchmark_pi(sample_counts, repetitions)
+        else:
+            suite_results = benchmark_art(art_configurations, art_samples, repetitions)
+        for result in suite_results:
+            print(f'{result["name"]:<80}{result["seconds"]:>12.4f}{result["seconds_min"]:>10.4f}')
+        results.extend(suite_results)
+
+    report['results'] = results
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output_file}')
+
+    if baseline_file is not None:
+        with open(baseline_file) as f:
+            baseline = json.load(f)
+        print(f'Baseline: commit {baseline.get("commit")} from {baseline.get("timestamp")}')
+        if compare(results, baseline['results'], tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Benchmark of DockerSimManager's execution modes
+
+Runs the same short jobs once with one container per job and once with the warm container pool against
+the in-process FakeDockerClient and reports jobs per second. Container lifecycle costs of the fake client
+can be set on the command line.
+"""
+
+import getopt
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from docker_sim_manager import DockerSimManager, SimJob
+from fake_docker import FakeDockerClient, sleeping_job
+
+__author__ = "Michael Wittmann"
+
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+
+class OfflineSimManager(DockerSimManager):
+    def _authenticate_at_container_registry(self):
+        pass
+
+
+def jobs_per_second(docker_client, jobs: int, workers: int, warm_containers: bool, jobs_per_container: int):
+    """
+    Runs jobs with a new DockerSimManager
+    :return: jobs per second
+    """
+    with tempfile.TemporaryDirectory() as data_directory:
+        manager = OfflineSimManager('fake/sim-image', workers, Path(data_directory), docker_client=docker_client,
+                                    warm_containers=warm_containers, jobs_per_container=jobs_per_container)
+        tic = time.perf_counter()
+        for sim_job, succeeded in manager.stream_computation(SimJob(f'job{i}', None, command='-o /mnt/data')
+                                                             for i in range(jobs)):
+            pass
+        return jobs / (time.perf_counter() - tic)
+
+
+def main(argv):
+    jobs: int = 200
+    workers: int = 8
+    job_time: float = 0.01
+    lifecycle_time: float = 0.2
+    jobs_per_container: int = 100
+    usage = 'benchmark_warm_pool.py -n <jobs> -w <workers> -j <job_time> -l <container_lifecycle_time> ' \
+            '-r <jobs_per_container>'
+
+    try:
+        opts, args = getopt.getopt(argv, 'hn:w:j:l:r:', ['jobs=', 'workers=', 'job_time=', 'lifecycle_time=',
+                                                         'jobs_per_container='])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit(0)
+
+        if opt in ('-n', '--jobs'):
+            jobs = int(arg)
+
+        if opt in ('-w', '--workers'):
+            workers = int(arg)
+
+        if opt in ('-j', '--job_time'):
+            job_time = float(arg)
+
+        if opt in ('-l', '--lifecycle_time'):
+            lifecycle_time = float(arg)
+
+        if opt in ('-r', '--jobs_per_container'):
+            jobs_per_container = int(arg)
+
+    logger.remove()
+    # split the lifecycle cost roughly like a local docker daemon: create < start, exec is cheap
+    def client():
+        return FakeDockerClient(job=sleeping_job(job_time), create_time=0.3 * lifecycle_time,
+                                start_time=0.5 * lifecycle_time, remove_time=0.2 * lifecycle_time,
+                                exec_time=0.05 * lifecycle_time)
+
+    print(f'{"mode":>16}{"jobs":>8}{"workers":>9}{"jobs/s":>10}{"containers":>12}')
+    for warm_containers in (False, True):
+        docker_client = client()
+        rate = jobs_per_second(docker_client, jobs, workers, warm_containers, jobs_per_container)
+        mode = 'warm pool' if warm_containers else 'per container'
+        print(f'{mode:>16}{jobs:>8}{workers:>9}{rate:>10.1f}{docker_client.containers.created:>12}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
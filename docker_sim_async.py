@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+"""asyncio execution engine for DockerSimManager
+
+Talks to the Docker Engine API over the unix socket (or tcp) with asyncio streams instead of holding one blocking
+thread per running container. Connections are kept alive and reused from a pool, and the number of running
+containers is limited by a semaphore. The event loop runs in a single background thread; coroutines are submitted
+from other threads and return concurrent.futures.Future objects.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import struct
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from docker.errors import DockerException
+from loguru import logger
+
+from docker_sim_retry import TIMEOUT_EXIT_CODE
+from docker_sim_telemetry import JobTelemetry
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+DEFAULT_DOCKER_URL = 'unix:///var/run/docker.sock'
+_STREAM_HEADER = struct.Struct('>BxxxL')
+# seconds the stats sampler waits for a stats sample from the event loop
+_STATS_TIMEOUT = 30
+
+
+class AsyncAPIError(DockerException):
+    def __init__(self, status_code: int, message: str) -> None:
+        """
+        Error response of the Docker Engine API
+        :param status_code: HTTP status code
+        :param message: error message of the daemon
+        """
+        super().__init__(f'{status_code} Server Error: {message}')
+        self.status_code = status_code
+
+
+class AsyncDockerAPI():
+    def __init__(self, base_url: str = None, pool_size: int = 16, api_version: str = None) -> None:
+        """
+        Minimal asynchronous HTTP/1.1 client of the Docker Engine API
+        :param base_url: unix:///path/to/docker.sock or tcp://host:port, Default: $DOCKER_HOST or the local socket
+        :param pool_size: number of idle keep-alive connections kept for reuse
+        :param api_version: API version prefix of all paths, e.g. '1.43'. Default: the daemon's current version
+        """
+        base_url = base_url or os.environ.get('DOCKER_HOST') or DEFAULT_DOCKER_URL
+        url = urlsplit(base_url)
+        if url.scheme in ('unix', 'http+unix'):
+            self._socket_path = url.path
+        elif url.scheme in ('tcp', 'http'):
+            self._socket_path = None
+            self._host = url.hostname
+            self._port = url.port or 2375
+        else:
+            raise ValueError(f'Unsupported docker url {base_url}, use unix:// or tcp://')
+        self._prefix = f'/v{api_version}' if api_version else ''
+        self._pool_size = pool_size
+        self._idle = []
+        self.connections_opened = 0
+
+    async def _connect(self):
+        if self._idle:
+            return self._idle.pop(), True
+        if self._socket_path is not None:
+            connection = await asyncio.open_unix_connection(self._socket_path)
+        else:
+            connection = await asyncio.open_connection(self._host, self._port)
+        self.connections_opened += 1
+        return connection, False
+
+    def _release(self, connection, reusable: bool):
+        if reusable and len(self._idle) < self._pool_size and not connection[1].is_closing():
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def _send(self, method: str, path: str, params=None, body=None):
+        """
+        Sends a request and reads the head of the response. A stale pooled connection is replaced once.
+        :return: (connection, status code, headers)
+        """
+        target = self._prefix + path + (f'?{urlencode(params)}' if params else '')
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+        head = (f'{method} {target} HTTP/1.1\r\nHost: docker\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(data)}\r\n\r\n').encode('latin-1')
+        while True:
+            connection, reused = await self._connect()
+            reader, writer = connection
+            try:
+                writer.write(head + data)
+                await writer.drain()
+                status_line = await reader.readline()
+                if not status_line:
+                    raise ConnectionResetError('Connection closed by the docker daemon')
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                return connection, int(status_line.split()[1]), headers
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+
+    @staticmethod
+    async def _body(reader, status: int, headers: dict):
+        """
+        Reads the body of a response chunk by chunk
+        """
+        if status in (204, 304):
+            return
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return
+                chunk = await reader.readexactly(size)
+                await reader.readline()
+                yield chunk
+        elif 'content-length' in headers:
+            remaining = int(headers['content-length'])
+            while remaining:
+                chunk = await reader.read(min(remaining, 1 << 16))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b'', remaining)
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while True:
+                chunk = await reader.read(1 << 16)
+                if not chunk:
+                    return
+                yield chunk
+
+    @staticmethod
+    def _reusable(headers: dict) -> bool:
+        return headers.get('connection', '').lower() != 'close' and \
+            ('content-length' in headers or headers.get('transfer-encoding', '').lower() == 'chunked')
+
+    @staticmethod
+    def _error(status: int, data: bytes) -> AsyncAPIError:
+        try:
+            message = json.loads(data.decode('utf-8')).get('message', '')
+        except ValueError:
+            message = data.decode('utf-8', errors='replace')
+        return AsyncAPIError(status, message)
+
+    async def request(self, method: str, path: str, params=None, body=None):
+        """
+        Sends a request and reads the complete response
+        :param method: HTTP method
+        :param path: API path without version prefix, e.g. /containers/create
+        :param params: query parameters
+        :param body: JSON body
+        :return: decoded JSON response, None for empty responses
+        :raise AsyncAPIError: for error responses of the daemon
+        """
+        connection, status, headers = await self._send(method, path, params, body)
+        try:
+            data = b''.join([chunk async for chunk in self._body(connection[0], status, headers)])
+        except BaseException:
+            connection[1].close()
+            raise
+        self._release(connection, self._reusable(headers) or status in (204, 304))
+        if status >= 400:
+            raise self._error(status, data)
+        return json.loads(data.decode('utf-8')) if data else None
+
+    async def stream(self, method: str, path: str, params=None):
+        """
+        Sends a request and yields the response body as it arrives. The connection returns to the pool only if the
+        body was read completely.
+        """
+        connection, status, headers = await self._send(method, path, params)
+        complete = False
+        try:
+            if status >= 400:
+                data = b''.join([chunk async for chunk in self._body(connection[0], status, headers)])
+                complete = True
+                raise self._error(status, data)
+            async for chunk in self._body(connection[0], status, headers):
+                yield chunk
+            complete = True
+        finally:
+            if complete:
+                self._release(connection, self._reusable(headers))
+            else:
+                connection[1].close()
+
+    async def create_container(self, name: str, config: dict) -> str:
+        """
+        :param name: container name
+        :param config: container configuration, e.g. docker.types.ContainerConfig
+        :return: id of the created container
+        """
+        return (await self.request('POST', '/containers/create', {'name': name}, config))['Id']
+
+    async def start_container(self, container_id: str) -> None:
+        await self.request('POST', f'/containers/{container_id}/start')
+
+    async def stop_container(self, container_id: str, timeout: int = 10) -> None:
+        await self.request('POST', f'/containers/{container_id}/stop', {'t': timeout})
+
+    async def kill_container(self, container_id: str) -> None:
+        await self.request('POST', f'/containers/{container_id}/kill')
+
+    async def wait_container(self, container_id: str) -> int:
+        """
+        :return: exit code of the container
+        """
+        return (await self.request('POST', f'/containers/{container_id}/wait'))['StatusCode']
+
+    async def remove_container(self, container_id: str, force: bool = True) -> None:
+        await self.request('DELETE', f'/containers/{container_id}', {'force': int(force)})
+
+    async def container_stats(self, container_id: str) -> dict:
+        """
+        :return: a single stats sample of the container
+        """
+        return await self.request('GET', f'/containers/{container_id}/stats', {'stream': 0, 'one-shot': 1})
+
+    async def container_logs(self, container_id: str, follow: bool = True):
+        """
+        Yields the output (stdout and stderr) of a container, which was created without tty
+        :param container_id: container id or name
+        :param follow: keep streaming until the container exits
+        """
+        buffer = bytearray()
+        chunks = self.stream('GET', f'/containers/{container_id}/logs',
+                             {'stdout': 1, 'stderr': 1, 'follow': int(follow)})
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                while len(buffer) >= _STREAM_HEADER.size:
+                    _, size = _STREAM_HEADER.unpack_from(buffer)
+                    if len(buffer) < _STREAM_HEADER.size + size:
+                        break
+                    yield bytes(buffer[_STREAM_HEADER.size:_STREAM_HEADER.size + size])
+                    del buffer[:_STREAM_HEADER.size + size]
+        finally:
+            await chunks.aclose()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for reader, writer in idle:
+            writer.close()
+
+
+class AsyncEngine():
+    def __init__(self, base_url: str = None, max_workers: int = 1, pool_size: int = None) -> None:
+        """
+        Creates an engine running containers concurrently from one event loop thread
+        :param base_url: URL of the docker daemon, Default: $DOCKER_HOST or the local socket
+        :param max_workers: number of containers running at the same time
+        :param pool_size: number of idle keep-alive connections, Default: max_workers
+        """
+        self._base_url = base_url
+        self._max_workers = max_workers
+        self._pool_size = pool_size if pool_size is not None else max_workers
+        self._loop = None
+        self._thread = None
+        self.api = None
+        self.semaphore = None
+
+    def start(self) -> None:
+        """
+        Starts the event loop thread
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name='async-engine')
+        self._thread.start()
+        self.submit(self._setup()).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        if hasattr(self._loop, 'shutdown_default_executor'):
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+        self._loop.close()
+
+    async def _setup(self):
+        self.api = AsyncDockerAPI(self._base_url, pool_size=self._pool_size)
+        self.semaphore = asyncio.Semaphore(self._max_workers)
+
+    def submit(self, coroutine) -> concurrent.futures.Future:
+        """
+        Schedules a coroutine on the engine's event loop, can be called from any thread
+        :return: future of the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def run_container(self, name: str, config: dict, log_writer, minimum_runtime: float = None,
+                            maximum_inactivity_time: float = None, telemetry=None, timeout: float = None) -> int:
+        """
+        Creates and starts a container, streams its output to log_writer until it exits and removes it.
+        A container, which ran for more than minimum_runtime and showed no output for maximum_inactivity_time, is
+        stopped. A container running longer than timeout is killed. Callers should hold the engine's semaphore.
+        :param name: container name
+        :param config: container configuration, e.g. docker.types.ContainerConfig
+        :param log_writer: object with a write(bytes) method
+        :param minimum_runtime: seconds a container may run without any output, None to never stop it
+        :param maximum_inactivity_time: seconds a container may be silent after its last output
+        :param telemetry: JobTelemetry recording the create, run, logs and remove phases, Default: none
+        :param timeout: seconds the container may run, Default: no timeout
+        :return: exit code of the container, TIMEOUT_EXIT_CODE if it was killed after its timeout
+        """
+        telemetry = telemetry if telemetry is not None else JobTelemetry(name)
+        with telemetry.phase('create'):
+            container_id = await self.api.create_container(name, config)
+        watchdog = None
+        killer = None
+        timed_out = False
+        try:
+            with telemetry.phase('create'):
+                await self.api.start_container(container_id)
+            telemetry.container_started(lambda: asyncio.run_coroutine_threadsafe(
+                self.api.container_stats(container_id), self._loop).result(_STATS_TIMEOUT))
+            started = time.time()
+            last_activity = None
+
+            async def watch():
+                while True:
+                    deadline = started + minimum_runtime
+                    if last_activity is not None and maximum_inactivity_time is not None:
+                        deadline = max(deadline, last_activity + maximum_inactivity_time)
+                    if deadline <= time.time():
+                        break
+                    await asyncio.sleep(deadline - time.time())
+                logger.warning(f'Container {name} ran for more than '
+                               f'{minimum_runtime} seconds and showed no log activity for '
+                               f'{maximum_inactivity_time} seconds.'
+                               f'It will be stopped.')
+                try:
+                    await self.api.stop_container(container_id)
+                except (DockerException, OSError) as e:
+                    logger.warning(f'Could not stop container {name}: {e}')
+
+            async def kill():
+                nonlocal timed_out
+                await asyncio.sleep(timeout)
+                timed_out = True
+                logger.warning(f'Container {name} exceeded its timeout of {timeout} seconds. It will be killed.')
+                try:
+                    await self.api.kill_container(container_id)
+                except (DockerException, OSError) as e:
+                    logger.warning(f'Could not kill container {name}: {e}')
+
+            if minimum_runtime is not None:
+                watchdog = asyncio.ensure_future(watch())
+            if timeout is not None:
+                killer = asyncio.ensure_future(kill())
+            with telemetry.phase('run'):
+                async for chunk in self.api.container_logs(container_id):
+                    last_activity = time.time()
+                    with telemetry.phase('logs'):
+                        log_writer.write(chunk)
+                exit_code = await self.api.wait_container(container_id)
+            return TIMEOUT_EXIT_CODE if timed_out and exit_code != 0 else exit_code
+        finally:
+            telemetry.container_stopped()
+            for task in (watchdog, killer):
+                if task is not None:
+                    task.cancel()
+            try:
+                with telemetry.phase('remove'):
+                    await self.api.remove_container(container_id, force=True)
+            except (DockerException, OSError) as e:
+                logger.warning(f'Could not remove container {name}: {e}')
+
+    def close(self) -> None:
+        """
+        Waits for all submitted coroutines, closes the connections and stops the event loop
+        """
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.api.close()
+
+        self.submit(shutdown()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
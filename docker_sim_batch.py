@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""Job fusion for DockerSimManager
+
+Short jobs spend most of their time starting a container and the simulation's interpreter. A JobFuser groups
+compatible short jobs into batches, which run in a single container: the manager writes a batch manifest listing the
+arguments and output directory of every job and starts the simulation image with --batch <manifest>. The simulation
+runs the jobs one after another in one process and writes each job's log and exit status (exit_status.json) into
+the job's own working directory. run_batch implements this side of the contract for the example images, which ship
+this module next to their simulation script; it depends on the standard library only.
+
+Manifest format, paths as seen inside the container:
+{"jobs": [{"name": "IT1", "args": ["-o", "/mnt/jobs/job_IT1", "-r", "1"], "output": "/mnt/jobs/job_IT1"}, ...]}
+"""
+
+import contextlib
+import json
+import shlex
+import time
+import traceback
+from pathlib import Path, PurePosixPath
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+BATCH_OPTION = '--batch'
+BATCH_MANIFEST = 'manifest.json'
+BATCH_STATUS_FILE = 'exit_status.json'
+BATCH_JOBS_MOUNT = '/mnt/jobs'
+
+
+def job_args(command, job_dir: PurePosixPath) -> list:
+    """
+    Rewrites a job's command for a container, which holds the job's working directory at job_dir instead of
+    /mnt/data. Paths in /mnt/data are moved into job_dir.
+    :param command: SimJob.command, a string, a list of arguments or None
+    :param job_dir: the job's working directory inside the container
+    :return: arguments as list
+    """
+    args = shlex.split(command) if isinstance(command, str) else [str(arg) for arg in command or []]
+    return [str(job_dir) + arg[len('/mnt/data'):] if arg == '/mnt/data' or arg.startswith('/mnt/data/') else arg
+            for arg in args]
+
+
+def write_manifest(batch_dir: Path, jobs) -> PurePosixPath:
+    """
+    Writes the manifest of a batch
+    :param batch_dir: working directory of the batch container, mounted at /mnt/data
+    :param jobs: list of (SimJob, the job's working directory relative to the jobs mount)
+    :return: path of the manifest inside the container
+    """
+    entries = []
+    for sim_job, relative_dir in jobs:
+        job_dir = PurePosixPath(BATCH_JOBS_MOUNT).joinpath(*Path(relative_dir).parts)
+        entries.append({'name': sim_job.sim_name, 'args': job_args(sim_job.command, job_dir),
+                        'output': str(job_dir)})
+    with open(batch_dir.joinpath(BATCH_MANIFEST), 'w') as f:
+        json.dump({'jobs': entries}, f, indent=2)
+    return PurePosixPath('/mnt/data', BATCH_MANIFEST)
+
+
+def read_status(working_dir: Path):
+    """
+    Reads the exit status, which the simulation wrote for a job of a batch
+    :param working_dir: the job's working directory on your host's file system
+    :return: (exit code, runtime in seconds), (None, None) if the job did not finish
+    """
+    try:
+        with open(working_dir.joinpath(BATCH_STATUS_FILE)) as f:
+            status = json.load(f)
+        return status['exit_code'], status.get('runtime_seconds')
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
+
+
+def run_batch(manifest_path: Path, run) -> int:
+    """
+    Runs the jobs of a batch manifest one after another in the calling process, so the interpreter starts and the
+    simulation's libraries are imported once for all of them. A job's output goes to log.txt, its exit code and
+    runtime to BATCH_STATUS_FILE in the job's output directory.
+    :param manifest_path: json manifest {"jobs": [{"name": <name>, "args": [<arguments>], "output": <directory>}, ...]},
+        relative output directories are resolved against the manifest's directory
+    :param run: function(args, output_dir) running a single job
+    :return: number of failed jobs
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path) as f:
+        jobs = json.load(f)['jobs']
+    failed = 0
+    for job in jobs:
+        output_dir = manifest_path.parent.joinpath(job['output'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        tic = time.perf_counter()
+        with open(output_dir.joinpath('log.txt'), 'w') as log, contextlib.redirect_stdout(log), \
+                contextlib.redirect_stderr(log):
+            try:
+                run(job['args'], output_dir)
+                exit_code = 0
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+        runtime = time.perf_counter() - tic
+        with open(output_dir.joinpath(BATCH_STATUS_FILE), 'w') as f:
+            json.dump({'exit_code': exit_code, 'runtime_seconds': runtime}, f)
+        print(f'{job.get("name", output_dir.name)}: exit code {exit_code} after {runtime:.3f}s')
+        failed += exit_code != 0
+    return failed
+
+
+class JobFuser():
+    def __init__(self, batch_size: int, max_seconds: float = None, predict=None, bind_templates: bool = False,
+                 fuse_unknown: bool = False) -> None:
+        """
+        Collects short, compatible jobs into batches
+        :param batch_size: maximum number of jobs per batch
+        :param max_seconds: jobs predicted to run longer are not fused, None fuses every job
+        :param predict: function returning the predicted runtime of a SimJob or None
+        :param bind_templates: templates are bind mounted into the job's container, jobs with templates are not fused
+        :param fuse_unknown: fuse jobs without prediction as well. By default they run in their own container, so a
+            long job without history does not hold up the jobs fused with it
+        """
+        self._batch_size = batch_size
+        self._max_seconds = max_seconds
+        self._predict = predict
+        self._fuse_unknown = fuse_unknown
+        self._bind_templates = bind_templates
+        self._pending = []
+        self._key = None
+
+    def accepts(self, sim_job) -> bool:
+        """
+        :return: True if the job may run in a batch
+        """
+        if self._bind_templates and sim_job.templates is not None:
+            return False
+        if self._max_seconds is None or self._predict is None:
+            return True
+        predicted = self._predict(sim_job)
+        if predicted is None:
+            return self._fuse_unknown
+        return predicted <= self._max_seconds
+
+    def add(self, sim_job, telemetry):
+        """
+        Adds an accepted job to the pending batch
+        :param sim_job: SimJob
+        :param telemetry: the job's JobTelemetry
+        :return: list of batches, which are complete now, each a list of (SimJob, JobTelemetry)
+        """
+        batches = []
+        # jobs of one batch share the container's resource limits
+        key = (sim_job.cpus, sim_job.memory)
+        if self._pending and key != self._key:
+            batches.append(self.flush())
+        self._key = key
+        self._pending.append((sim_job, telemetry))
+        if len(self._pending) >= self._batch_size:
+            batches.append(self.flush())
+        return batches
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: number of jobs waiting for their batch to be complete
+        """
+        return len(self._pending)
+
+    def flush(self):
+        """
+        :return: the pending batch, possibly empty
+        """
+        batch, self._pending = self._pending, []
+        return batch
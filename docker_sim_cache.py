@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""Content-addressed result cache for DockerSimManager
+
+Results of successful jobs are stored under a key derived from the image, the job's command and the content of
+its templates. A job with the same key is materialized from the store into its working directory by hardlink
+(or copy, across file systems) instead of running a container. The store is bounded by size with LRU eviction.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from loguru import logger
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+_META_FILE = 'meta.json'
+
+
+def hash_templates(templates) -> str:
+    """
+    Hashes the relative paths and contents of a template file or directory
+    :param templates: file or directory, None for jobs without templates
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    if templates is None:
+        return digest.hexdigest()
+    templates = Path(templates)
+    files = [templates] if templates.is_file() else sorted(p for p in templates.rglob('*') if p.is_file())
+    for file in files:
+        digest.update(file.relative_to(templates).as_posix().encode('utf-8') if file != templates else b'.')
+        digest.update(b'\0')
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache():
+    def __init__(self, cache_directory: Path, max_bytes: int = None) -> None:
+        """
+        Opens or creates a result cache
+        :param cache_directory: directory of the store, may be shared between runs
+        :param max_bytes: maximum size of the store, least recently used results are evicted, None for unlimited
+        """
+        self._directory = Path(cache_directory)
+        self._objects = self._directory.joinpath('objects')
+        self._tmp = self._directory.joinpath('tmp')
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._tmp.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+        for meta_file in self._objects.glob(f'*/*/{_META_FILE}'):
+            try:
+                self._index[meta_file.parent.name] = json.loads(meta_file.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f'Ignoring broken cache entry {meta_file.parent}: {e}')
+
+    @staticmethod
+    def key(image_id: str, command, templates) -> str:
+        """
+        Computes the cache key of a job
+        :param image_id: content-addressed id or digest of the simulation image
+        :param command: the job's command
+        :param templates: the job's template file or directory
+        :return: hex digest
+        """
+        payload = json.dumps([image_id, command, hash_templates(templates)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self._objects.joinpath(key[:2], key)
+
+    def fetch(self, key: str, working_dir: Path) -> bool:
+        """
+        Materializes a cached result into working_dir
+        :param key: cache key
+        :param working_dir: job directory on your host's file system
+        :return: True on a cache hit
+        """
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                self.misses += 1
+                return False
+            meta['last_used'] = time.time()
+        entry = self._entry(key)
+        try:
+            for source in entry.joinpath('files').rglob('*'):
+                target = working_dir.joinpath(source.relative_to(entry.joinpath('files')))
+                if source.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copy2(source, target)
+            entry.joinpath(_META_FILE).write_text(json.dumps(meta))
+        except OSError as e:
+            # entry was evicted or damaged meanwhile, run the job instead
+            logger.warning(f'Could not materialize cached result {key}: {e}')
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+            self.time_saved += meta['runtime']
+        return True
+
+    def store(self, key: str, working_dir: Path, runtime: float) -> None:
+        """
+        Copies the results of a successful job into the store
+        :param key: cache key
+        :param working_dir: job directory on your host's file system
+        :param runtime: seconds it took to compute the result
+        """
+        tmp = self._tmp.joinpath(uuid.uuid4().hex)
+        try:
+            shutil.copytree(working_dir, tmp.joinpath('files'))
+            size = sum(f.stat().st_size for f in tmp.rglob('*') if f.is_file())
+            meta = {'runtime': runtime, 'size': size, 'last_used': time.time()}
+            tmp.joinpath(_META_FILE).write_text(json.dumps(meta))
+            with self._lock:
+                if key in self._index:
+                    return
+                self._entry(key).parent.mkdir(exist_ok=True)
+                tmp.replace(self._entry(key))
+                self._index[key] = meta
+                evicted = self._evict()
+            for entry in evicted:
+                shutil.rmtree(entry, ignore_errors=True)
+        except OSError as e:
+            logger.warning(f'Could not store result {key} in cache: {e}')
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _evict(self):
+        """
+        Removes least recently used entries from the index until the store fits into max_bytes. Must hold _lock.
+        :return: entry directories to delete
+        """
+        if self._max_bytes is None:
+            return []
+        total = sum(meta['size'] for meta in self._index.values())
+        evicted = []
+        for key, meta in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self._max_bytes:
+                break
+            total -= meta['size']
+            del self._index[key]
+            entry = self._entry(key)
+            # move out of the store first, so a concurrent fetch misses instead of reading a partial entry
+            trash = self._tmp.joinpath(uuid.uuid4().hex)
+            try:
+                entry.replace(trash)
+                evicted.append(trash)
+            except OSError:
+                evicted.append(entry)
+        return evicted
+
+    def stats(self) -> dict:
+        """
+        :return: hits, misses, time saved in seconds, number of entries and size of the store in bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'time_saved': self.time_saved,
+                'entries': len(self._index),
+                'bytes': sum(meta['size'] for meta in self._index.values()),
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (f'Result cache: {stats["hits"]} hits, {stats["misses"]} misses, '
+                f'{stats["time_saved"]:.1f} s saved, {stats["entries"]} entries ({stats["bytes"]} bytes)')
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""Docker hosts for DockerSimManager
+
+A DockerHost wraps the client of one docker daemon together with its concurrency limit. The HostPool balances
+jobs across all healthy hosts and, with resource scheduling, places each job on a host, whose cores and memory
+fit the job right now. For daemons, which do not share the data directory with the manager's file
+system, the working directory of a job is transferred as tar archive into and out of the container.
+"""
+
+import collections
+import itertools
+import tarfile
+import tempfile
+import threading
+from pathlib import Path, PurePosixPath
+
+import docker
+from loguru import logger
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+_SPOOL_SIZE = 16 * 1024 ** 2
+
+
+class DockerHost():
+    def __init__(self, docker_client=None, max_workers: int = 1, name: str = None, base_url: str = None,
+                 shared_storage: bool = True) -> None:
+        """
+        Creates a docker host
+        :param docker_client: docker client of the daemon, Default: client for base_url or docker.from_env()
+        :param max_workers: number of parallel jobs on this host
+        :param name: name used in logs, Default: base_url or 'local'
+        :param base_url: URL of the docker daemon, e.g. ssh://user@node1 or tcp://node1:2376
+        :param shared_storage: True if the daemon can bind mount the manager's data_directory. Otherwise job
+            directories are copied into the container before and out of it after each run.
+        """
+        if docker_client is None:
+            docker_client = docker.DockerClient(base_url=base_url) if base_url is not None else docker.from_env()
+        self.docker_client = docker_client
+        self.max_workers = max_workers
+        self.name = name or base_url or 'local'
+        self.shared_storage = shared_storage
+        self.image = None
+        self.resource_scheduler = None
+        self.running = 0
+        self.healthy = True
+
+    def is_alive(self) -> bool:
+        """
+        :return: True if the daemon answers
+        """
+        try:
+            self.docker_client.ping()
+            return True
+        except Exception as e:
+            logger.warning(f'Docker host {self.name} is not reachable: {e}')
+            return False
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class _Request():
+    def __init__(self) -> None:
+        self.bypassed = 0
+
+
+class HostPool():
+    def __init__(self, hosts, max_bypass: int = None) -> None:
+        """
+        Balances jobs across hosts, each host runs at most max_workers jobs at a time
+        :param hosts: list of DockerHosts
+        :param max_bypass: number of times later jobs may start ahead of a waiting job,
+            default: 2 * the number of slots of all hosts
+        """
+        self.hosts = list(hosts)
+        self._max_bypass = max_bypass if max_bypass is not None else 2 * sum(host.max_workers for host in self.hosts)
+        self._waiting = collections.deque()
+        self._condition = threading.Condition()
+
+    def acquire(self, exclude=(), cpus: float = None, memory=None):
+        """
+        Blocks until a healthy host has a free slot and, if it schedules resources, the requested cores and memory
+        free, and takes both. The least loaded of these hosts is chosen. A job, which was bypassed max_bypass times,
+        blocks later jobs until it could start.
+        :param exclude: hosts, which must not be used
+        :param cpus: number of cpus, may be fractional, default: 1
+        :param memory: memory in bytes or docker notation ('2g'), None for no limit
+        :return: (DockerHost, Allocation of the host's ResourceScheduler or None)
+        :raise RuntimeError: if no healthy host is left
+        """
+        request = _Request()
+        with self._condition:
+            self._waiting.append(request)
+            try:
+                while True:
+                    candidates = [host for host in self.hosts if host.healthy and host not in exclude]
+                    if not candidates:
+                        raise RuntimeError('No healthy docker host left')
+                    earlier = list(itertools.takewhile(lambda waiting: waiting is not request, self._waiting))
+                    if not any(waiting.bypassed >= self._max_bypass for waiting in earlier):
+                        free = [host for host in candidates if host.running < host.max_workers]
+                        for host in sorted(free, key=lambda h: h.running / h.max_workers):
+                            allocation = None
+                            if host.resource_scheduler is not None:
+                                allocation = host.resource_scheduler.try_acquire(cpus, memory)
+                                if allocation is None:
+                                    continue
+                            host.running += 1
+                            for waiting in earlier:
+                                waiting.bypassed += 1
+                            return host, allocation
+                    self._condition.wait()
+            finally:
+                self._waiting.remove(request)
+                self._condition.notify_all()
+
+    def release(self, host: DockerHost, allocation=None) -> None:
+        """
+        Returns the slot and the resources of a finished job
+        :param host: host of the job
+        :param allocation: Allocation returned by acquire
+        """
+        with self._condition:
+            if allocation is not None:
+                host.resource_scheduler.release(allocation)
+            host.running -= 1
+            self._condition.notify_all()
+
+    def mark_failed(self, host: DockerHost) -> None:
+        """
+        Removes a host from scheduling
+        """
+        with self._condition:
+            if host.healthy:
+                logger.error(f'Docker host {host.name} failed, its jobs are rescheduled on other hosts')
+            host.healthy = False
+            self._condition.notify_all()
+
+
+def tar_directory(directory: Path, arcname: str):
+    """
+    Packs a directory into a tar archive, spooled to disk for large directories
+    :param directory: directory to pack
+    :param arcname: name of the directory inside the archive
+    :return: file object positioned at the start of the archive
+    """
+    archive = tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE)
+    with tarfile.open(fileobj=archive, mode='w') as tar:
+        tar.add(str(directory), arcname=arcname)
+    archive.seek(0)
+    return archive
+
+
+def extract_directory(chunks, target: Path, exclude=()) -> None:
+    """
+    Extracts the contents of a directory archive (as returned by get_archive) into target. The top level directory
+    of the archive is stripped; links and paths leaving target are skipped.
+    :param chunks: iterable of bytes forming a tar archive
+    :param target: directory on the host
+    :param exclude: names of top level entries, which are not extracted (e.g. log files written by the manager)
+    """
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE) as archive:
+        for chunk in chunks:
+            archive.write(chunk)
+        archive.seek(0)
+        with tarfile.open(fileobj=archive, mode='r') as tar:
+            for member in tar:
+                parts = PurePosixPath(member.name).parts[1:]
+                if not parts or '..' in parts or not (member.isfile() or member.isdir()):
+                    continue
+                if any(parts[0].startswith(name) for name in exclude):
+                    continue
+                path = target.joinpath(*parts)
+                if member.isdir():
+                    path.mkdir(parents=True, exist_ok=True)
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with tar.extractfile(member) as source, open(path, 'wb') as f:
+                    for block in iter(lambda: source.read(1 << 20), b''):
+                        f.write(block)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Crash-safe job journal for DockerSimManager
+
+Records the state transitions, exit codes and timings of all jobs in a SQLite database inside the data
+directory, so an interrupted computation can be resumed.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    command TEXT,
+    state TEXT NOT NULL,
+    exit_code INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    queued_at REAL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS transitions (
+    name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    exit_code INTEGER,
+    time REAL NOT NULL
+);
+"""
+
+
+def _command_key(command):
+    """
+    :param command: SimJob.command, a string, a list of arguments or None
+    :return: the command as it is stored in the journal, lists of arguments are stored as JSON
+    """
+    if command is None or isinstance(command, str):
+        return command
+    return json.dumps(list(command))
+
+
+class JobJournal():
+    def __init__(self, path: Path) -> None:
+        """
+        Opens or creates a journal. Every transition is committed immediately (WAL mode), so the journal
+        survives a crash of the manager process.
+        :param path: path of the SQLite database
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+
+    def record(self, name: str, state: str, command=None, exit_code: int = None) -> None:
+        """
+        Records a state transition of a job
+        :param name: the job's sim_name
+        :param state: QUEUED, RUNNING, SUCCEEDED or FAILED
+        :param command: the job's command, stored when the job is queued
+        :param exit_code: exit code of the container, if known
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            if state == QUEUED:
+                self._connection.execute(
+                    'INSERT INTO jobs (name, command, state, queued_at) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(name) DO UPDATE SET command=excluded.command, state=excluded.state, '
+                    'queued_at=excluded.queued_at',
+                    (name, _command_key(command), state, now))
+            elif state == RUNNING:
+                self._connection.execute(
+                    'UPDATE jobs SET state=?, started_at=?, finished_at=NULL, exit_code=NULL, attempts=attempts+1 '
+                    'WHERE name=?', (state, now, name))
+            else:
+                self._connection.execute('UPDATE jobs SET state=?, exit_code=?, finished_at=? WHERE name=?',
+                                         (state, exit_code, now, name))
+            self._connection.execute('INSERT INTO transitions (name, state, exit_code, time) VALUES (?, ?, ?, ?)',
+                                     (name, state, exit_code, now))
+
+    def job(self, name: str):
+        """
+        :param name: the job's sim_name
+        :return: dict with the columns of the job, None if the job is unknown
+        """
+        with self._lock:
+            cursor = self._connection.execute('SELECT * FROM jobs WHERE name=?', (name,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip((column[0] for column in cursor.description), row))
+
+    def is_finished(self, name: str, command) -> bool:
+        """
+        :param name: the job's sim_name
+        :param command: the job's current command
+        :return: True if the job succeeded with the same command before
+        """
+        job = self.job(name)
+        return job is not None and job['state'] == SUCCEEDED and job['command'] == _command_key(command)
+
+    def counts(self) -> dict:
+        """
+        :return: number of jobs per state
+        """
+        with self._lock:
+            return dict(self._connection.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""Streaming log files for DockerSimManager
+
+Writes container output chunk by chunk to disk, optionally compressed with gzip or zstd, and bounded either by
+a size cap or by rotation. Memory usage does not depend on the amount of log output.
+"""
+
+import gzip
+from pathlib import Path
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+LOG_COMPRESSIONS = (None, 'gzip', 'zstd')
+_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _open_log_file(path: Path, compression):
+    """
+    Opens a binary log file for writing
+    :param path: file path including the compression suffix
+    :param compression: None, 'gzip' or 'zstd'
+    :return: writable binary file object
+    """
+    if compression is None:
+        return open(path, 'wb')
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd log compression requires the zstandard package: pip install zstandard")
+    return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'), closefd=True)
+
+
+class LogWriter():
+    def __init__(self,
+                 directory: Path,
+                 file_name: str = 'log.txt',
+                 compression: str = None,
+                 max_bytes: int = None,
+                 backup_count: int = 0
+                 ) -> None:
+        """
+        Creates a log file in directory. With max_bytes and backup_count=0, output beyond max_bytes is dropped and
+        a note is appended. With backup_count > 0 the file is rotated to <file_name>.1 ... <file_name>.<backup_count>
+        instead, like logging.handlers.RotatingFileHandler.
+        :param directory: directory of the log file
+        :param file_name: name of the log file, the compression suffix is appended
+        :param compression: None, 'gzip' or 'zstd'
+        :param max_bytes: maximum number of uncompressed bytes per file, None for unlimited
+        :param backup_count: number of rotated files to keep
+        """
+        if compression not in LOG_COMPRESSIONS:
+            raise ValueError(f'Unknown log compression {compression}, choose one of {LOG_COMPRESSIONS}')
+        self.path = Path(directory).joinpath(file_name + _SUFFIXES[compression])
+        self._compression = compression
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._file = _open_log_file(self.path, compression)
+        self._written = 0
+        self.bytes_total = 0
+        self.bytes_dropped = 0
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Writes a chunk of output
+        :param chunk: raw container output
+        """
+        self.bytes_total += len(chunk)
+        while chunk:
+            if self._max_bytes is None:
+                self._file.write(chunk)
+                return
+            free = self._max_bytes - self._written
+            if free <= 0:
+                if self._backup_count <= 0:
+                    self.bytes_dropped += len(chunk)
+                    return
+                self._rotate()
+                continue
+            self._file.write(chunk[:free])
+            self._written += min(free, len(chunk))
+            chunk = chunk[free:]
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self._backup_count - 1, 0, -1):
+            source = self.path.with_name(f'{self.path.name}.{i}')
+            if source.exists():
+                source.replace(self.path.with_name(f'{self.path.name}.{i + 1}'))
+        self.path.replace(self.path.with_name(f'{self.path.name}.1'))
+        self._file = _open_log_file(self.path, self._compression)
+        self._written = 0
+
+    def close(self) -> None:
+        if self.bytes_dropped:
+            self._file.write(f'\n[log truncated: {self.bytes_dropped} bytes dropped]\n'.encode('utf-8'))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
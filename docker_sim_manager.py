@@ -7,21 +7,41 @@ error handling and generalization of methods and classes. Feel free to use this
 starting point.
 """
 
-import datetime
+import asyncio
+import contextlib
+import itertools
+import json
+import queue
 import shutil
 import threading
 import time
 from pathlib import Path
+from typing import Iterable, Iterator, Tuple
 import concurrent.futures
 import platform
-import dateutil
 import os
 import docker
-from docker.errors import DockerException, NotFound, APIError
-from docker.types import Mount, LogConfig
+from docker.constants import DEFAULT_DOCKER_API_VERSION
+from docker.errors import APIError, DockerException, NotFound
+from docker.types import Mount, LogConfig, HostConfig, ContainerConfig
 from halo import Halo
 from loguru import logger
 from getpass import getpass
+from requests.exceptions import ConnectionError as DaemonConnectionError
+from docker_sim_async import AsyncEngine
+from docker_sim_batch import JobFuser, read_status, write_manifest, BATCH_OPTION, BATCH_JOBS_MOUNT
+from docker_sim_cache import ResultCache
+from docker_sim_hosts import DockerHost, HostPool, tar_directory, extract_directory
+from docker_sim_journal import JobJournal, QUEUED, RUNNING, SUCCEEDED, FAILED
+from docker_sim_logs import LogWriter, LOG_COMPRESSIONS
+from docker_sim_monitor import ContainerMonitor
+from docker_sim_resources import Allocation, ResourceScheduler
+from docker_sim_results import ResultAggregator, check_result_format, RESULT_FORMATS
+from docker_sim_retry import RetryPolicy, StragglerDetector, TIMEOUT_EXIT_CODE
+from docker_sim_runtimes import RuntimeHistory, longest_first, JOB_ORDERS
+from docker_sim_telemetry import JobTelemetry, Telemetry, container_stats, TELEMETRY_FORMATS
+from docker_sim_templates import stage_templates, template_mounts, TEMPLATE_STAGINGS
+from docker_sim_pool import WarmContainerPool, POOL_LABEL
 
 __author__ = "Michael Wittmann and Maximilian Speicher"
 __copyright__ = "Copyright 2020, Michael Wittmann and Maximilian Speicher"
@@ -32,18 +52,30 @@ __maintainer__ = "Michael Wittmann"
 __email__ = "michael.wittmann@tum.de"
 __status__ = "Example"
 
+DATA_DIRECTORY_LABEL = 'docker_sim.data_directory'
+ENGINES = ('threads', 'asyncio')
+PULL_POLICIES = ('always', 'if-not-present', 'never')
+SPECULATIVE_SUFFIX = '_speculative'
+
 
 class SimJob():
-    def __init__(self, sim_Name, templates:Path, command=None) -> None:
+    def __init__(self, sim_Name, templates:Path, command=None, cpus:float = None, memory = None,
+                 timeout:float = None) -> None:
         """
         Creates a distinct job
         :param sim_Name: Simulation name (must be unique)
-        :param templates: files to be copied from your host to the container
+        :param templates: file or directory on your host, staged into the job's working directory (/mnt/data)
         :param command: command to be appended at containers entry point
+        :param cpus: number of cpus the job needs, may be fractional. Used with resource scheduling, Default: 1
+        :param memory: memory the job needs in bytes or docker notation (e.g. '2g'). Used with resource scheduling
+        :param timeout: seconds the job's container may run before it is killed, Default: the manager's job_timeout
         """
         self.templates = templates
         self.sim_name = sim_Name
         self.command = command
+        self.cpus = cpus
+        self.memory = memory
+        self.timeout = timeout
 
     def __str__(self) -> str:
         return self.sim_name
@@ -54,7 +86,37 @@ class DockerSimManager():
                  docker_container_url:str,
                  max_workers:int,
                  data_directory:Path,
-                 docker_repo_tag= 'latest'
+                 docker_repo_tag= 'latest',
+                 warm_containers:bool = False,
+                 jobs_per_container:int = 100,
+                 docker_client = None,
+                 log_compression:str = None,
+                 log_max_bytes:int = None,
+                 log_backup_count:int = 0,
+                 cache_directory:Path = None,
+                 cache_max_bytes:int = None,
+                 journal:bool = True,
+                 schedule_resources:bool = False,
+                 hosts:list = None,
+                 engine:str = 'threads',
+                 docker_url:str = None,
+                 pull_policy:str = 'always',
+                 template_staging:str = 'reflink',
+                 telemetry_format:str = 'csv',
+                 prometheus_textfile:Path = None,
+                 stats_interval:float = 1.0,
+                 aggregate_results:str = None,
+                 result_file:str = 'result.json',
+                 job_order:str = 'fifo',
+                 order_window:int = None,
+                 runtime_history:Path = None,
+                 fuse_jobs:int = None,
+                 fuse_max_seconds:float = 1.0,
+                 fuse_unknown_jobs:bool = False,
+                 job_timeout:float = None,
+                 max_retries:int = 3,
+                 retry_backoff:float = 1.0,
+                 speculate:float = None
                  ) -> None:
         """
 
@@ -62,60 +124,772 @@ class DockerSimManager():
         :param max_workers: number of parallel workers
         :param data_directory: path to the output directory on your host
         :param docker_repo_tag: container tag, Default: latest
+        :param warm_containers: run jobs via exec in max_workers long-lived containers instead of one container per job
+        :param jobs_per_container: number of jobs after which a warm container is replaced
+        :param docker_client: docker client to use, Default: docker.from_env()
+        :param log_compression: compression of the log files: None, 'gzip' or 'zstd'
+        :param log_max_bytes: maximum uncompressed size of a log file, Default: unlimited
+        :param log_backup_count: number of rotated log files to keep. With 0, output beyond log_max_bytes is dropped
+        :param cache_directory: directory of a result cache. Jobs with the same image, command and templates as a
+            cached result are restored from it instead of being run. Default: no cache
+        :param cache_max_bytes: maximum size of the result cache, Default: unlimited
+        :param journal: record job states in data_directory/docker_sim_journal.sqlite, required to resume
+        :param schedule_resources: pack jobs by their cpus/memory requests against the docker host's cores and memory
+            and enforce them with container limits on disjoint cores. max_workers stays the upper bound of parallel jobs
+        :param hosts: list of DockerHosts to balance jobs across, each with its own max_workers. max_workers still
+            bounds the total number of parallel jobs. Default: a single host using docker_client
+        :param engine: 'threads' runs every job in a worker thread using the docker SDK. 'asyncio' runs all containers
+            from one event loop, which talks to the Docker Engine API at docker_url, so hundreds of concurrent jobs
+            do not need hundreds of threads. Only available for a single host without warm containers or resource
+            scheduling
+        :param docker_url: URL of the docker daemon used by the asyncio engine, unix:// or tcp://.
+            Default: $DOCKER_HOST or unix:///var/run/docker.sock
+        :param pull_policy: 'always' pulls the image unless the local image has the registry's current digest,
+            'if-not-present' pulls only if there is no local image, 'never' uses the local image only.
+            The registry login happens only when a registry is actually contacted and refuses anonymous access.
+        :param template_staging: how SimJob.templates are provided in the working directory: 'bind' mounts them
+            read-only into the container, 'hardlink' links and 'reflink' clones them copy-on-write, falling back to
+            'copy' where the file system does not support it. Staged templates are removed after the run.
+        :param telemetry_format: format of the per-run telemetry table data_directory/docker_sim_telemetry_<start>.<format>
+            with phase durations and container stats of every job: 'csv', 'parquet' (requires pyarrow) or None
+        :param prometheus_textfile: file to write the summary of each run to in the Prometheus text format, e.g. for
+            node_exporter's textfile collector, Default: none
+        :param stats_interval: seconds between two docker stats samples of a running container, None disables sampling
+        :param aggregate_results: collect the result_file of every finished job into data_directory/docker_sim_results
+            with this format: 'npz' (requires numpy), 'parquet' (requires pyarrow) or None. Estimates of the records
+            are combined, weighted by their n_samples
+        :param result_file: name of the machine-readable result record, which simulations write to /mnt/data
+        :param job_order: 'fifo' dispatches jobs in the order they were added, 'lpt' dispatches the jobs with the
+            longest predicted runtime first, so no long job starts when the other workers are about to run idle.
+            Runtimes are predicted from the runtime history, jobs without history keep their order
+        :param order_window: number of jobs read ahead and ordered together with 'lpt', Default: all jobs, which are
+            queued or passed to the computation
+        :param runtime_history: SQLite database recording the runtime of the last successful runs by image and
+            command, may be shared between data directories. Default: data_directory/docker_sim_runtimes.sqlite with
+            'lpt' or fuse_jobs, otherwise no runtimes are recorded
+        :param fuse_jobs: run up to fuse_jobs short jobs in one container, which the simulation image runs one after
+            another from a batch manifest (--batch <manifest>). Each job's log and exit status are written into its
+            own working directory. Requires docker hosts with shared storage and the threads engine without warm
+            containers. Default: every job runs in its own container
+        :param fuse_max_seconds: jobs with a predicted runtime above fuse_max_seconds are not fused
+        :param fuse_unknown_jobs: fuse jobs, whose runtime can not be predicted from the runtime history, as well.
+            By default they run in their own container, which records their runtime for later computations
+        :param job_timeout: seconds a job's container may run before it is killed and the job fails with exit code
+            124, for jobs without their own timeout. Default: no timeout
+        :param max_retries: number of times a run is repeated after a transient error of the docker daemon (server
+            errors, timeouts, lost connections to a daemon, which is still alive)
+        :param retry_backoff: seconds to wait before the first retry, doubled with every further retry
+        :param speculate: once no more jobs are waiting, run a duplicate of every job, which has run speculate times as
+            long as the median of the finished jobs, on an idle worker and keep the result of the run finishing first.
+            Requires the threads engine without warm containers. Default: no speculative execution
         """
+        startup = time.monotonic()
+        if log_compression not in LOG_COMPRESSIONS:
+            raise ValueError(f'Unknown log compression {log_compression}, choose one of {LOG_COMPRESSIONS}')
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown engine {engine}, choose one of {ENGINES}')
+        if pull_policy not in PULL_POLICIES:
+            raise ValueError(f'Unknown pull policy {pull_policy}, choose one of {PULL_POLICIES}')
+        if telemetry_format not in TELEMETRY_FORMATS:
+            raise ValueError(f'Unknown telemetry format {telemetry_format}, choose one of {TELEMETRY_FORMATS}')
+        if aggregate_results not in RESULT_FORMATS:
+            raise ValueError(f'Unknown result format {aggregate_results}, choose one of {RESULT_FORMATS}')
+        if aggregate_results is not None:
+            check_result_format(aggregate_results)
+        if job_order not in JOB_ORDERS:
+            raise ValueError(f'Unknown job order {job_order}, choose one of {JOB_ORDERS}')
+        if template_staging not in TEMPLATE_STAGINGS:
+            raise ValueError(f'Unknown template staging {template_staging}, choose one of {TEMPLATE_STAGINGS}')
+        if template_staging == 'bind' and (warm_containers or
+                                           (hosts is not None and not all(host.shared_storage for host in hosts))):
+            raise ValueError('Bind mounted templates require docker hosts with shared storage and no warm containers')
+        if engine == 'asyncio' and (warm_containers or schedule_resources or
+                                    (hosts is not None and (len(hosts) > 1 or not hosts[0].shared_storage))):
+            raise ValueError('The asyncio engine supports a single docker host with shared storage only, '
+                             'without warm containers or resource scheduling')
+        if hosts is None:
+            hosts = [DockerHost(docker_client if docker_client is not None else docker.from_env(),
+                                max_workers=max_workers)]
+        if fuse_jobs is not None and (engine != 'threads' or warm_containers or
+                                      not all(host.shared_storage for host in hosts)):
+            raise ValueError('Job fusion requires docker hosts with shared storage and the threads engine '
+                             'without warm containers')
+        if speculate is not None and (engine != 'threads' or warm_containers):
+            raise ValueError('Speculative execution requires the threads engine without warm containers')
+        if speculate is not None and speculate <= 1:
+            raise ValueError('speculate must be greater than 1')
+        if warm_containers and (len(hosts) > 1 or not hosts[0].shared_storage):
+            raise ValueError('Warm containers require a single docker host with shared storage')
+        self._engine = engine
+        self._docker_url = docker_url
+        self._template_staging = template_staging
+        self._telemetry_format = telemetry_format
+        self._prometheus_textfile = prometheus_textfile
+        self._stats_interval = stats_interval
+        self._telemetry = None
+        self.telemetry_summary = None
+        self._aggregate_results = aggregate_results
+        self._result_file = result_file
+        self._result_aggregator = None
+        self.result_summary = None
+        self._async_engine = None
         self._data_directory = data_directory
-        self._max_workers = max_workers
-        self._thread_pool_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers)
+        self._max_workers = min(max_workers, sum(host.max_workers for host in hosts))
         self._container_prefix = 'DockerSim'
-        self._docker_client = docker.from_env()
-        self._authenticate_at_container_registry()
-        with Halo(text='Pulling latest docker_sim image', spinner='dots'):
-            self._docker_image = self._docker_client.images.pull(
-                repository=docker_container_url,
-                tag=docker_repo_tag
-            )
+        self._hosts = hosts
+        self._host_pool = HostPool(hosts)
+        self._docker_client = hosts[0].docker_client
+        self._docker_container_url = docker_container_url
+        self._docker_repo_tag = docker_repo_tag
+        self._pull_policy = pull_policy
+        self._authenticated = False
+        self._authentication_lock = threading.Lock()
+        self.startup_timings = {}
+        tic = time.monotonic()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+            for host, image in zip(hosts, executor.map(self._resolve_image, hosts)):
+                host.image = image
+        self.startup_timings['image'] = time.monotonic() - tic
+        self._docker_image = hosts[0].image
         self._io_lock = threading.Lock()
-        self._monitoring_frequency = 300
         self._minimum_runtime = 300
         self._maximum_inactivity_time = 30 * 60
         self.job_list = []
+        self._job_queue = queue.Queue()
+        # done when jobs were added to _job_queue, wakes a computation waiting for running jobs
+        self._queue_signal = concurrent.futures.Future()
+        self._queue_signal_lock = threading.Lock()
+        self._streaming = False
+        self._warm_containers = warm_containers
+        self._jobs_per_container = jobs_per_container
+        self._container_pool = None
+        # ContainerMonitor of each monitored host
+        self._monitors = {}
+        self._log_compression = log_compression
+        self._log_max_bytes = log_max_bytes
+        self._log_backup_count = log_backup_count
+        self._result_cache = None
+        if cache_directory is not None:
+            self._result_cache = ResultCache(cache_directory, max_bytes=cache_max_bytes)
+        self._journal = None
+        if journal:
+            self._data_directory.mkdir(parents=True, exist_ok=True)
+            self._journal = JobJournal(self._data_directory.joinpath('docker_sim_journal.sqlite'))
+        self._resume = False
+        self._orphans = {}
+        self._job_order = job_order
+        self._order_window = order_window
+        self._fuse_jobs = fuse_jobs
+        self._fuse_max_seconds = fuse_max_seconds
+        self._fuse_unknown_jobs = fuse_unknown_jobs
+        self._job_timeout = job_timeout
+        self._retry_policy = RetryPolicy(max_retries=max_retries, backoff=retry_backoff)
+        self._speculate = speculate
+        self._speculative_copies = {}
+        # container names of runs, which lost their race against a speculative copy or the original
+        self._cancelled_runs = set()
+        self._cancellation = threading.Condition()
+        # the history is only kept, where it is used for predictions
+        self._runtime_history = None
+        if job_order == 'lpt' or fuse_jobs is not None or runtime_history is not None:
+            self._runtime_history = RuntimeHistory(runtime_history if runtime_history is not None
+                                                   else self._data_directory.joinpath('docker_sim_runtimes.sqlite'))
+        self._schedule_resources = schedule_resources
+        if schedule_resources:
+            if warm_containers:
+                raise ValueError('Resource scheduling can not be combined with warm containers')
+            for host in hosts:
+                host.resource_scheduler = ResourceScheduler.from_docker_host(host.docker_client)
+        self.startup_timings['total'] = time.monotonic() - startup
+        logger.info('Startup took {:.2f}s ({})'.format(self.startup_timings['total'], ', '.join(
+            f'{step} {seconds:.2f}s' for step, seconds in self.startup_timings.items() if step != 'total')))
 
 
     def add_sim_job(self, job:SimJob)->None:
         """
-        Adds a simulation job into the queue
+        Adds a simulation job into the queue. While a computation is running, the job is handed to it directly.
         :param job: simulation job to be added
         """
-        self.job_list.append(job)
+        if self._streaming:
+            self._job_queue.put(job)
+            self._signal_job_queue()
+        else:
+            self.job_list.append(job)
+
+    def close_job_queue(self) -> None:
+        """
+        Signals a running computation started with wait_for_jobs=True that no more jobs will be added.
+        """
+        self._job_queue.put(None)
+        self._signal_job_queue()
+
+    def _signal_job_queue(self) -> None:
+        with self._queue_signal_lock:
+            if not self._queue_signal.done():
+                self._queue_signal.set_result(None)
+
+    def _reset_job_queue_signal(self) -> concurrent.futures.Future:
+        """
+        :return: future, which is done once jobs are added to the queue after this call
+        """
+        with self._queue_signal_lock:
+            if self._queue_signal.done():
+                self._queue_signal = concurrent.futures.Future()
+            return self._queue_signal
+
+    def _drain_job_queue(self) -> list:
+        """
+        Empties the queue of jobs added during a computation
+        :return: the jobs left in the queue, without close_job_queue signals
+        """
+        jobs = []
+        while True:
+            try:
+                sim_job = self._job_queue.get_nowait()
+            except queue.Empty:
+                return jobs
+            if sim_job is not None:
+                jobs.append(sim_job)
 
 
 
-    def start_computation(self):
+    def start_computation(self, resume:bool = False, jobs:Iterable[SimJob] = None):
         """
         Starts computation of all jobs inside the queue.
         Jobs must be added before calling this function
+        :param resume: skip jobs, which already succeeded according to the journal, and adopt their running containers
+        :param jobs: iterable or generator of SimJobs, e.g. a ParameterSweep's jobs(), processed after the queue
+        """
+        for sim_job, succeeded in self.stream_computation(jobs=jobs, resume=resume):
+            logger.info(f'Run {sim_job} did finish')
+
+    def stream_computation(self, jobs:Iterable[SimJob] = None, buffer_size:int = None,
+                           wait_for_jobs:bool = False, resume:bool = False) -> Iterator[Tuple[SimJob, bool]]:
+        """
+        Processes jobs as a stream and yields their results as they complete.
+        Jobs are taken lazily from job_list, then from jobs, and from add_sim_job calls made while the
+        computation is running. At most max_workers + buffer_size jobs are in flight, so memory stays flat
+        regardless of the number of jobs.
+        :param jobs: iterable or generator of SimJobs, consumed lazily
+        :param buffer_size: number of jobs submitted in addition to the running ones, default: max_workers
+        :param wait_for_jobs: keep waiting for jobs added with add_sim_job until close_job_queue is called
+        :param resume: skip jobs, which already succeeded according to the journal, and adopt their running containers.
+            Without resume, leftover containers of this data_directory are removed.
+        :return: iterator of (SimJob, True if processing succeeded)
+        """
+        if resume and self._journal is None:
+            raise ValueError('resume requires a DockerSimManager with journal=True')
+        if buffer_size is None:
+            buffer_size = self._max_workers
+        # jobs left in the queue by an earlier computation are run, its close_job_queue signals are dropped
+        job_list, self.job_list = self.job_list + self._drain_job_queue(), []
+        source = itertools.chain(job_list, jobs if jobs is not None else [])
+        del job_list
+        model = None
+        if self._job_order == 'lpt' or self._fuse_jobs is not None:
+            model = self._runtime_history.model(self._history_image)
+        if self._job_order == 'lpt':
+            logger.info(f'Ordering jobs by their predicted runtime from the history of {len(model.exact)} commands')
+            source = longest_first(source, lambda sim_job: model.predict(sim_job.command), window=self._order_window)
+        fuser = None
+        if self._fuse_jobs is not None:
+            fuser = JobFuser(self._fuse_jobs, self._fuse_max_seconds,
+                             predict=lambda sim_job: model.predict(sim_job.command, fallback=False),
+                             bind_templates=self._template_staging == 'bind', fuse_unknown=self._fuse_unknown_jobs)
+        detector = StragglerDetector(self._speculate) if self._speculate is not None else None
+        # single jobs in flight with their telemetry and jobs racing against their speculative copy, by sim_name
+        running = {}
+        races = {}
+        self._streaming = True
+        source_exhausted = False
+        queue_closed = not wait_for_jobs
+        in_flight = {}
+        finished = []
+        self._resume = resume
+
+        table_path = None
+        if self._telemetry_format is not None:
+            start = time.strftime('%Y%m%d-%H%M%S', time.localtime())
+            table_path = self._data_directory.joinpath(f'docker_sim_telemetry_{start}.{self._telemetry_format}')
+        self._telemetry = Telemetry(stats_interval=self._stats_interval, table_path=table_path,
+                                    table_format=self._telemetry_format)
+        self._telemetry.start()
+        if self._aggregate_results is not None:
+            self._data_directory.mkdir(parents=True, exist_ok=True)
+            self._result_aggregator = ResultAggregator(
+                self._data_directory.joinpath(f'docker_sim_results.{self._aggregate_results}'),
+                self._aggregate_results, result_file=self._result_file)
+        self._handle_orphan_containers()
+        if self._engine == 'threads':
+            # the asyncio engine stops inactive containers itself while it streams their logs
+            self.start_monitoring_thread()
+        if self._warm_containers:
+            self._container_pool = WarmContainerPool(
+                docker_client=self._docker_client,
+                docker_image=self._docker_image,
+                data_directory=self._data_directory,
+                size=self._max_workers,
+                jobs_per_container=self._jobs_per_container,
+                name_prefix=f'{self._container_prefix}Pool',
+                labels={DATA_DIRECTORY_LABEL: str(self._data_directory.resolve())},
+                user=None if platform.system() == "Windows" else os.getuid()
+            )
+        try:
+            with self._executor() as submit:
+                while True:
+                    # reset before the queue is read, so jobs added from now on wake the wait below
+                    queue_signal = self._reset_job_queue_signal()
+                    source_idle = False
+                    while len(in_flight) < self._max_workers + buffer_size:
+                        sim_job = None
+                        if not source_exhausted:
+                            sim_job = next(source, None)
+                            source_exhausted = sim_job is None
+                        if sim_job is None:
+                            sim_job, queue_closed = self._next_queued_job(
+                                block=(source_exhausted and not in_flight and not queue_closed
+                                       and not (fuser is not None and fuser.pending)),
+                                queue_closed=queue_closed)
+                        if sim_job is None:
+                            source_idle = True
+                            break
+                        if resume and self._journal.is_finished(sim_job.sim_name, sim_job.command):
+                            logger.info(f'Run {sim_job} already finished, skipping it')
+                            finished.append((sim_job, True))
+                            continue
+                        if self._schedule_resources and len(self._hosts_too_small(sim_job)) == len(self._hosts):
+                            logger.error(f'Can not schedule {sim_job}: its cpus/memory request exceeds every host')
+                            finished.append((sim_job, False))
+                            continue
+                        if self._journal is not None:
+                            self._journal.record(sim_job.sim_name, QUEUED, command=sim_job.command)
+                        telemetry = self._telemetry.job(sim_job.sim_name)
+                        if fuser is not None and fuser.accepts(sim_job):
+                            for batch in fuser.add(sim_job, telemetry):
+                                in_flight[submit(batch, None)] = batch
+                            continue
+                        in_flight[submit(sim_job, telemetry)] = sim_job
+                        if detector is not None:
+                            running[sim_job.sim_name] = (sim_job, telemetry)
+
+                    if source_idle and fuser is not None and fuser.pending:
+                        # no more jobs right now, run the incomplete batch instead of waiting for it to fill up
+                        batch = fuser.flush()
+                        in_flight[submit(batch, None)] = batch
+
+                    while finished:
+                        sim_job, succeeded = finished.pop(0)
+                        self._collect_result(sim_job, succeeded)
+                        yield sim_job, succeeded
+
+                    if not in_flight:
+                        if source_exhausted and queue_closed and self._job_queue.empty():
+                            return
+                        continue
+
+                    timeout = None
+                    if (detector is not None and source_exhausted and queue_closed and self._job_queue.empty()
+                            and not (fuser is not None and fuser.pending)):
+                        timeout = self._speculate_stragglers(detector, running, races, in_flight, submit)
+                    done, _ = concurrent.futures.wait(list(in_flight) + ([] if queue_closed else [queue_signal]),
+                                                      timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        if future is queue_signal:
+                            continue
+                        sim_jobs = in_flight.pop(future)
+                        if isinstance(sim_jobs, SimJob):
+                            sim_jobs = [(sim_jobs, None)]
+                        try:
+                            results = future.result()
+                        except Exception as e:
+                            logger.error(f'Error while processing {", ".join(str(j) for j, _ in sim_jobs)}: {e}')
+                            results = [False] * len(sim_jobs)
+                        if isinstance(results, bool):
+                            results = [results]
+                        for (sim_job, _), succeeded in zip(sim_jobs, results):
+                            if detector is not None:
+                                sim_job, succeeded = self._settle_speculation(sim_job, succeeded, detector, running,
+                                                                              races)
+                                if sim_job is None:
+                                    continue
+                            self._telemetry.complete(sim_job.sim_name)
+                            self._collect_result(sim_job, succeeded)
+                            yield sim_job, succeeded
+        finally:
+            self._streaming = False
+            self.stop_monitoring_thread()
+            if self._container_pool is not None:
+                self._container_pool.close()
+                self._container_pool = None
+            if self._result_cache is not None:
+                logger.info(self._result_cache.report())
+            for host, container in self._orphans.values():
+                self._remove_container(container)
+            self._orphans = {}
+            self._report_telemetry()
+            self._report_results()
+
+    def _speculate_stragglers(self, detector:StragglerDetector, running:dict, races:dict, in_flight:dict, submit):
         """
-        self.start_monitoring_thread()
-        with self._thread_pool_executor as executor:
-            futures = {executor.submit(self._process_sim_job, sim_job): sim_job
-                       for sim_job in self.job_list}
-            for future in concurrent.futures.as_completed(futures):
-                logger.info(f'Run {futures[future]} did finish')
+        Starts a speculative copy of every straggler on an idle worker, once no more jobs are waiting. The copy runs
+        with its own container and working directory, the run finishing first successfully wins.
+        :param detector: StragglerDetector of the computation
+        :param running: dict of sim_name to (SimJob, JobTelemetry) of the single jobs in flight
+        :param races: dict of sim_name to the race of a job against its copy, updated with the started copies
+        :param in_flight: dict of futures to their jobs, updated with the started copies
+        :param submit: function submitting a SimJob with its JobTelemetry to the executor
+        :return: seconds until the next running job becomes a straggler, None if there is nothing to wait for
+        """
+        now = time.time()
+        idle = self._max_workers - len(in_flight)
+        next_deadline = None
+        for sim_job, telemetry in sorted(running.values(), key=lambda item: item[1].started_at or now):
+            if sim_job.sim_name in races:
+                continue
+            started_at = telemetry.started_at if telemetry.started_at is not None else now
+            deadline = detector.deadline(started_at)
+            if deadline is None:
+                return None
+            if deadline > now:
+                next_deadline = deadline if next_deadline is None else min(next_deadline, deadline)
+                continue
+            if idle <= 0:
+                continue
+            copy = SimJob(f'{sim_job.sim_name}{SPECULATIVE_SUFFIX}', sim_job.templates, command=sim_job.command,
+                          cpus=sim_job.cpus, memory=sim_job.memory, timeout=sim_job.timeout)
+            logger.info(f'Run {sim_job} is running for {now - started_at:.1f}s, more than {detector.factor} times '
+                        f'the median runtime of the finished jobs. Starting a speculative copy')
+            shutil.rmtree(self._working_dir(copy), ignore_errors=True)
+            self._speculative_copies[copy.sim_name] = sim_job
+            races[sim_job.sim_name] = {'copy': copy, 'telemetry': telemetry, 'winner': None, 'done': set()}
+            in_flight[submit(copy, JobTelemetry(copy.sim_name))] = copy
+            idle -= 1
+        if next_deadline is None or idle <= 0:
+            return None
+        return max(0.0, next_deadline - now)
+
+    def _settle_speculation(self, sim_job:SimJob, succeeded:bool, detector:StragglerDetector, running:dict,
+                            races:dict):
+        """
+        Accounts a finished run for speculative execution. When a job or its copy succeeds first, the other run is
+        cancelled: its container is killed or, if it did not start yet, never started. The job is finished once both
+        runs returned.
+        :param sim_job: the finished SimJob or speculative copy
+        :param succeeded: True if the run succeeded
+        :param detector: StragglerDetector of the computation, receives the runtimes of finished jobs
+        :param running: dict of sim_name to (SimJob, JobTelemetry) of the single jobs in flight
+        :param races: dict of sim_name to the race of a job against its copy
+        :return: (SimJob, succeeded) of the finished job, (None, None) while the other run of a race is running
+        """
+        original = self._speculative_copies.get(sim_job.sim_name, sim_job)
+        race = races.get(original.sim_name)
+        if race is None:
+            _, telemetry = running.pop(sim_job.sim_name, (None, None))
+            if succeeded and telemetry is not None and telemetry.started_at is not None:
+                detector.add(telemetry.finished_at - telemetry.started_at)
+            return sim_job, succeeded
+        copy = race['copy']
+        race['done'].add(sim_job.sim_name)
+        if succeeded and race['winner'] is None:
+            race['winner'] = sim_job
+            other = copy if sim_job is original else original
+            if other.sim_name not in race['done']:
+                logger.info(f'Run {sim_job} finished first, cancelling run {other}')
+                # cancel first, a run starting its container meanwhile kills it itself
+                with self._cancellation:
+                    self._cancelled_runs.add(f'{self._container_prefix}_{other.sim_name}')
+                    self._cancellation.notify_all()
+                self._kill_container(f'{self._container_prefix}_{other.sim_name}')
+        if len(race['done']) < 2:
+            return None, None
+        del races[original.sim_name]
+        del self._speculative_copies[copy.sim_name]
+        with self._cancellation:
+            for run in (original, copy):
+                self._cancelled_runs.discard(f'{self._container_prefix}_{run.sim_name}')
+        running.pop(original.sim_name, None)
+        if race['winner'] is copy:
+            self._adopt_speculative_result(original, copy, race['telemetry'])
+        else:
+            shutil.rmtree(self._working_dir(copy), ignore_errors=True)
+        return original, race['winner'] is not None
+
+    def _adopt_speculative_result(self, sim_job:SimJob, copy:SimJob, telemetry:JobTelemetry):
+        """
+        Replaces the results of a job by the results of its speculative copy, which finished first
+        :param sim_job: SimJob, whose run was killed
+        :param copy: the job's speculative copy
+        :param telemetry: the job's JobTelemetry
+        """
+        working_dir = self._working_dir(sim_job)
+        shutil.rmtree(working_dir, ignore_errors=True)
+        self._working_dir(copy).rename(working_dir)
+        self._record(sim_job, SUCCEEDED, exit_code=0)
+        telemetry.finish(0, True)
+        logger.info(f'Run {sim_job} finished by its speculative copy')
+
+    @property
+    def _history_image(self) -> str:
+        """
+        :return: key of the simulation image in the runtime history
+        """
+        return f'{self._docker_container_url}:{self._docker_repo_tag}'
+
+    def _collect_result(self, sim_job:SimJob, succeeded:bool):
+        """
+        Adds the result record of a finished job to the aggregated results
+        """
+        if self._result_aggregator is not None:
+            self._result_aggregator.add(sim_job.sim_name, self._working_dir(sim_job), succeeded)
+
+    def _report_results(self):
+        """
+        Writes the aggregated results of the finished computation and logs the combined estimates
+        """
+        aggregator, self._result_aggregator = self._result_aggregator, None
+        if aggregator is None:
+            return
+        self.result_summary = aggregator.summary()
+        try:
+            aggregator.write()
+            with open(self._data_directory.joinpath('docker_sim_results_summary.json'), 'w') as f:
+                json.dump(self.result_summary, f, indent=2)
+        except OSError as e:
+            logger.warning(f'Can not write aggregated results: {e}')
+            return
+        logger.info(f"Aggregated {self.result_summary['records']} result records into {aggregator.path}")
+        for name, estimate in self.result_summary['estimates'].items():
+            standard_error = '' if estimate['standard_error'] is None else f" ± {estimate['standard_error']:.3e}"
+            logger.info(f"Combined {name} estimate: {estimate['estimate']:.10f}{standard_error} "
+                        f"from {estimate['n_samples']} samples of {estimate['jobs']} jobs")
+
+    def _report_telemetry(self):
+        """
+        Logs the summary of the finished computation and closes its telemetry table
+        """
+        telemetry, self._telemetry = self._telemetry, None
+        telemetry.stop()
+        self.telemetry_summary = telemetry.summary(self._max_workers)
+        if not self.telemetry_summary['jobs']:
+            return
+        logger.info(f'Telemetry: {Telemetry.format_summary(self.telemetry_summary)}')
+        if telemetry.table_path is not None:
+            logger.info(f'Telemetry written to {telemetry.table_path}')
+        try:
+            if self._prometheus_textfile is not None:
+                telemetry.write_prometheus(self._prometheus_textfile, self.telemetry_summary)
+        except OSError as e:
+            logger.warning(f'Can not write telemetry: {e}')
+
+    def _next_queued_job(self, block:bool, queue_closed:bool):
+        """
+        Takes the next job added with add_sim_job during a running computation
+        :param block: wait until a job is added or the queue is closed
+        :param queue_closed: True if close_job_queue was already received
+        :return: (SimJob or None, queue_closed)
+        """
+        try:
+            sim_job = self._job_queue.get(block=block)
+        except queue.Empty:
+            return None, queue_closed
+        if sim_job is None:
+            return None, True
+        return sim_job, queue_closed
 
 
-    def _process_sim_job(self, sim_job: SimJob)->None:
+    @contextlib.contextmanager
+    def _executor(self):
+        """
+        Provides the configured execution engine
+        :return: context manager yielding a function, which submits a SimJob with its JobTelemetry, or a batch of
+            fused jobs, and returns its future
+        """
+        if self._engine == 'asyncio':
+            self._async_engine = AsyncEngine(self._docker_url, max_workers=self._max_workers)
+            self._async_engine.start()
+            try:
+                yield lambda sim_job, telemetry: self._async_engine.submit(
+                    self._process_sim_job_async(sim_job, telemetry))
+            finally:
+                self._async_engine.close()
+                self._async_engine = None
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                # a list of jobs is a batch of fused jobs, each with its telemetry
+                yield lambda sim_job, telemetry: executor.submit(
+                    self._process_job_batch if isinstance(sim_job, list) else self._process_sim_job, sim_job, telemetry)
+
+    def _process_sim_job(self, sim_job: SimJob, telemetry:JobTelemetry = None)->None:
         """
         Triggers processing steps for a single job.
         1. _init_simulation
         2. _run_docker_container
         3. _cleanup_sim_objects
         :param sim_job: SimJob to be processed
+        :param telemetry: JobTelemetry recording the job's phases, Default: none
+        :return: True if processing succeeded, False otherwise.
+        """
+        telemetry = telemetry if telemetry is not None else JobTelemetry(sim_job.sim_name)
+        telemetry.start()
+        container_name = f'{self._container_prefix}_{sim_job.sim_name}'
+        with telemetry.phase('init'):
+            succeeded, working_dir, file_objects, cache_key = self._prepare_sim_job(sim_job, container_name)
+        if succeeded is not None:
+            telemetry.finish(0 if succeeded else None, succeeded)
+            return succeeded
+        if self._container_pool is not None:
+            start = time.monotonic()
+            with telemetry.phase('run'):
+                exit_code = self._run_in_warm_container(container_name=sim_job.sim_name, working_dir=working_dir,
+                                                        command=sim_job.command, timeout=self._timeout(sim_job))
+            runtime = time.monotonic() - start
+        else:
+            exit_code, runtime = self._run_on_hosts(sim_job, container_name=container_name, working_dir=working_dir,
+                                                    telemetry=telemetry, timeout=self._timeout(sim_job))
+        with telemetry.phase('cleanup'):
+            succeeded = self._finish_sim_job(sim_job, exit_code, runtime, working_dir, file_objects, cache_key)
+        telemetry.finish(exit_code, succeeded)
+        return succeeded
+
+    def _process_job_batch(self, batch:list, telemetry:JobTelemetry = None) -> list:
+        """
+        Processing steps of _process_sim_job for a batch of fused jobs. The jobs are prepared and finished one by one,
+        but run in a single container, which works through a manifest of their arguments and working directories.
+        Container overhead is attributed to the jobs of the batch in equal parts.
+        :param batch: list of (SimJob, JobTelemetry)
+        :param telemetry: unused, every job of the batch carries its own telemetry
+        :return: list with True for every job, whose processing succeeded
+        """
+        results = [None] * len(batch)
+        prepared = []
+        for i, (sim_job, job_telemetry) in enumerate(batch):
+            job_telemetry.start()
+            with job_telemetry.phase('init'):
+                succeeded, working_dir, file_objects, cache_key = self._prepare_sim_job(
+                    sim_job, f'{self._container_prefix}_{sim_job.sim_name}')
+            if succeeded is not None:
+                job_telemetry.finish(0 if succeeded else None, succeeded)
+                results[i] = succeeded
+            else:
+                prepared.append((i, working_dir, file_objects, cache_key))
+        if not prepared:
+            return results
+
+        first_job = batch[prepared[0][0]][0]
+        batch_dir = self._data_directory.joinpath(f'batch_{first_job.sim_name}')
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        manifest = write_manifest(batch_dir, [(batch[i][0], working_dir.relative_to(self._data_directory))
+                                              for i, working_dir, _, _ in prepared])
+        batch_telemetry = JobTelemetry(batch_dir.name)
+        # the batch may run as long as its jobs together, if every job has a timeout
+        timeouts = [self._timeout(batch[i][0]) for i, _, _, _ in prepared]
+        exit_code, runtime = self._run_on_hosts(
+            first_job, container_name=f'{self._container_prefix}Batch_{first_job.sim_name}', working_dir=batch_dir,
+            telemetry=batch_telemetry, command=[BATCH_OPTION, str(manifest)],
+            mounts=[Mount(target=BATCH_JOBS_MOUNT, source=str(self._data_directory.resolve()), type='bind')],
+            timeout=None if None in timeouts else sum(timeouts))
+
+        for i, working_dir, file_objects, cache_key in prepared:
+            sim_job, job_telemetry = batch[i]
+            job_exit_code, job_runtime = read_status(working_dir)
+            if job_exit_code is None:
+                logger.warning(f'Run {sim_job} did not finish in {batch_dir.name} (exit code {exit_code})')
+            if job_runtime is None:
+                job_runtime = runtime / len(prepared)
+            job_telemetry.host = batch_telemetry.host
+            for phase in ('schedule', 'create', 'logs', 'remove'):
+                job_telemetry.phases[phase] += batch_telemetry.phases[phase] / len(prepared)
+            job_telemetry.phases['run'] += job_runtime
+            with job_telemetry.phase('cleanup'):
+                self._encode_batch_log(working_dir)
+                results[i] = self._finish_sim_job(sim_job, job_exit_code, job_runtime, working_dir, file_objects,
+                                                  cache_key)
+            job_telemetry.finish(job_exit_code, results[i])
+        # the manifest and the batch's log are kept only to investigate failed jobs
+        if all(results[i] for i, _, _, _ in prepared):
+            shutil.rmtree(batch_dir, ignore_errors=True)
+        else:
+            logger.info(f'Keeping {batch_dir.name} with the manifest and log of a batch with failed jobs')
+        return results
+
+    def _encode_batch_log(self, working_dir:Path):
+        """
+        Applies log compression and size limits to the log, which the simulation wrote for a job of a batch
+        :param working_dir: the job's working directory on your host's file system
+        """
+        path = working_dir.joinpath('log.txt')
+        if (self._log_compression is None and self._log_max_bytes is None) or not path.exists():
+            return
+        raw_log = path.with_name('log.txt.batch')
+        path.replace(raw_log)
+        with self._log_writer(working_dir) as log_writer, open(raw_log, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                log_writer.write(chunk)
+        raw_log.unlink()
+
+    async def _process_sim_job_async(self, sim_job: SimJob, telemetry:JobTelemetry = None) -> bool:
+        """
+        Processing steps of _process_sim_job for the asyncio engine. Preparation and cleanup run in the event
+        loop's default executor, the container itself does not occupy a thread.
+        :param sim_job: SimJob to be processed
+        :param telemetry: JobTelemetry recording the job's phases, Default: none
         :return: True if processing succeeded, False otherwise.
         """
+        loop = asyncio.get_event_loop()
+        telemetry = telemetry if telemetry is not None else JobTelemetry(sim_job.sim_name)
+        container_name = f'{self._container_prefix}_{sim_job.sim_name}'
+        async with self._async_engine.semaphore:
+            telemetry.start()
+            telemetry.host = self._hosts[0]
+            with telemetry.phase('init'):
+                succeeded, working_dir, file_objects, cache_key = await loop.run_in_executor(
+                    None, self._prepare_sim_job, sim_job, container_name)
+            if succeeded is not None:
+                telemetry.finish(0 if succeeded else None, succeeded)
+                return succeeded
+            start = time.monotonic()
+            exit_code = await self._run_docker_container_async(container_name=container_name,
+                                                               working_dir=working_dir, command=sim_job.command,
+                                                               mounts=self._template_mounts(sim_job),
+                                                               telemetry=telemetry, timeout=self._timeout(sim_job))
+            runtime = time.monotonic() - start
+            with telemetry.phase('cleanup'):
+                succeeded = await loop.run_in_executor(None, self._finish_sim_job, sim_job, exit_code, runtime,
+                                                       working_dir, file_objects, cache_key)
+            telemetry.finish(exit_code, succeeded)
+            return succeeded
+
+    def _prepare_sim_job(self, sim_job: SimJob, container_name: str):
+        """
+        Prepares a job for its run: adopts a container of an interrupted run, restores cached results and
+        initializes the simulation.
+        :param sim_job: SimJob to be processed
+        :param container_name: the container's name
+        :return: (succeeded, working_dir, file_objects, cache_key). succeeded is None if the job must be run,
+            otherwise the job is already finished.
+        """
+        orphan = self._orphans.pop(container_name, None)
+        if orphan is not None:
+            return self._adopt_container(sim_job, container_name, host=orphan[0]), None, None, None
+        if self._resume:
+            self._remove_stale_working_dir(sim_job)
+
+        cache_key = None
+        if self._result_cache is not None:
+            cache_key = ResultCache.key(self._docker_image.id, sim_job.command, sim_job.templates)
+            # results of an earlier run into the same data_directory are replaced by the cached or a new result
+            self._remove_working_dir(sim_job)
+            if self._result_cache.fetch(cache_key, self._working_dir(sim_job)):
+                logger.info(f'Run {sim_job} restored from result cache')
+                self._record(sim_job, SUCCEEDED, exit_code=0)
+                return True, None, None, None
+            # a partially restored result
+            self._remove_working_dir(sim_job)
+
         sim_paths = self._init_simulation(sim_job=sim_job)
         if sim_paths is None:
             logger.error(f'Error during initialization for simulation {sim_job}')
-            return False
+            return False, None, None, None
 
         try:
             (
@@ -125,118 +899,665 @@ class DockerSimManager():
         except:
             try:
                 working_dir=sim_paths
+                file_objects = []
             except:
                 logger.error(f'Error during initialization for simulation {str(sim_job)}')
-                return False
+                return False, None, None, None
 
-        self._run_docker_container(container_name=sim_job.sim_name, working_dir=working_dir, command=sim_job.command)
+        self._record(sim_job, RUNNING)
+        return None, working_dir, file_objects, cache_key
+
+    def _finish_sim_job(self, sim_job: SimJob, exit_code, runtime: float, working_dir, file_objects, cache_key) -> bool:
+        """
+        Records the result of a run, stores it in the result cache and cleans up
+        :param sim_job: SimJob, which was run
+        :param exit_code: the container's exit code, None if it could not be run
+        :param runtime: runtime of the container in seconds
+        :param working_dir: working directory on your host's file system
+        :param file_objects: file objects returned by _init_simulation
+        :param cache_key: key of the job in the result cache, None without cache
+        :return: True if the run succeeded
+        """
+        succeeded = exit_code == 0
+        self._record(sim_job, SUCCEEDED if succeeded else FAILED, exit_code=exit_code)
         self.cleanup_sim_objects(sim_job=sim_job, file_objects=file_objects)
-        return True
+        if succeeded and cache_key is not None:
+            self._result_cache.store(cache_key, working_dir, runtime=runtime)
+        if succeeded and self._runtime_history is not None:
+            self._runtime_history.record(self._history_image, sim_job.command, runtime)
+        return succeeded
+
+    def _run_on_hosts(self, sim_job:SimJob, container_name, working_dir, telemetry:JobTelemetry = None,
+                      command=None, mounts:list = None, timeout:float = None):
+        """
+        Runs the simulation on the least loaded healthy host. If the host's daemon fails, the host is taken out of
+        scheduling and the job is run again on another host. Runs, whose container could not be created or started
+        because of a transient error of a daemon, which is still alive, are repeated after a backoff according to the
+        retry policy. Connections to a started container, which break, are reattached instead.
+        :param sim_job: SimJob to be processed
+        :param container_name: the container's name
+        :param working_dir: working directory on your host's file system
+        :param telemetry: JobTelemetry recording the job's phases, Default: none
+        :param command: container command, Default: the job's command
+        :param mounts: additional mounts, Default: the job's bind mounted templates
+        :param timeout: seconds the container may run before it is killed, Default: no timeout
+        :return: (the container's exit code or None, runtime in seconds)
+        """
+        telemetry = telemetry if telemetry is not None else JobTelemetry(sim_job.sim_name)
+        failed_hosts = set()
+        retries = 0
+        while True:
+            with telemetry.phase('schedule'):
+                # with resource scheduling, only hosts with the job's cpus and memory free right now are chosen
+                host, allocation = self._host_pool.acquire(exclude=failed_hosts | self._hosts_too_small(sim_job),
+                                                           cpus=sim_job.cpus, memory=sim_job.memory)
+            telemetry.host = host
+            error = None
+            start = time.monotonic()
+            try:
+                if container_name in self._cancelled_runs:
+                    logger.info(f'Run {container_name} was cancelled before it started')
+                    return None, 0.0
+                exit_code = self._run_docker_container(
+                    container_name=container_name, working_dir=working_dir,
+                    command=command if command is not None else sim_job.command, allocation=allocation, host=host,
+                    mounts=mounts if mounts is not None else self._template_mounts(sim_job), telemetry=telemetry,
+                    timeout=timeout)
+            except Exception as e:
+                if not self._retry_policy.is_transient(e):
+                    raise
+                logger.warning(f'Transient error on docker host {host} during run {container_name}: {e}')
+                exit_code = None
+                error = e
+            finally:
+                self._host_pool.release(host, allocation)
+            runtime = time.monotonic() - start
+            if exit_code is None and not host.is_alive():
+                self._host_pool.mark_failed(host)
+                failed_hosts.add(host)
+                logger.warning(f'Rescheduling run {container_name}')
+                continue
+            if error is not None:
+                if retries >= self._retry_policy.max_retries:
+                    logger.error(f'Run {container_name} failed after {retries} retries: {error}')
+                    return None, runtime
+                retries += 1
+                delay = self._retry_policy.delay(retries)
+                logger.warning(f'Retrying run {container_name} in {delay:.1f}s '
+                               f'(retry {retries} of {self._retry_policy.max_retries})')
+                self._remove_container_by_name(host, container_name)
+                # a cancelled run stops backing off
+                with self._cancellation:
+                    self._cancellation.wait_for(lambda: container_name in self._cancelled_runs, timeout=delay)
+                continue
+            return exit_code, runtime
+
+    def _template_mounts(self, sim_job:SimJob) -> list:
+        """
+        :param sim_job: SimJob to be processed
+        :return: read-only mounts of the job's templates with template_staging='bind', otherwise []
+        """
+        if self._template_staging != 'bind':
+            return []
+        return template_mounts(sim_job.templates)
+
+    def _hosts_too_small(self, sim_job:SimJob) -> set:
+        """
+        :param sim_job: SimJob to be processed
+        :return: hosts, whose resources can never satisfy the job's cpus/memory request
+        """
+        too_small = set()
+        for host in self._hosts:
+            if host.resource_scheduler is None:
+                continue
+            try:
+                host.resource_scheduler.validate(sim_job.cpus, sim_job.memory)
+            except ValueError:
+                too_small.add(host)
+        return too_small
+
+    def _record(self, sim_job:SimJob, state:str, exit_code:int = None):
+        """
+        Records a state transition of sim_job in the journal
+        """
+        # speculative copies are recorded by their original job only
+        if self._journal is not None and sim_job.sim_name not in self._speculative_copies:
+            self._journal.record(sim_job.sim_name, state, exit_code=exit_code)
+
+    def _working_dir(self, sim_job:SimJob) -> Path:
+        """
+        :param sim_job: SimJob to be processed
+        :return: Path to working directory on your host's filesystem for this SimJob
+        """
+        return self._data_directory.joinpath(f'job_{sim_job.sim_name}')
+
+    def _remove_working_dir(self, sim_job:SimJob):
+        """
+        Removes the working directory of a job, e.g. with the results of an earlier run
+        :param sim_job: SimJob to be processed
+        """
+        working_dir = self._working_dir(sim_job)
+        if working_dir.is_dir():
+            shutil.rmtree(working_dir)
+
+    def _remove_stale_working_dir(self, sim_job:SimJob):
+        """
+        Removes the working directory of a job, which was started by an earlier, interrupted run according to the journal
+        :param sim_job: SimJob to be processed
+        """
+        job = self._journal.job(sim_job.sim_name)
+        working_dir = self._working_dir(sim_job)
+        if job is not None and job['started_at'] is not None and working_dir.is_dir():
+            logger.info(f'Removing results of unfinished run {sim_job}')
+            shutil.rmtree(working_dir)
+
+    def _adopt_container(self, sim_job:SimJob, container_name:str, host:DockerHost) -> bool:
+        """
+        Waits for a container of an interrupted run, which is still running, instead of starting the job again
+        :param sim_job: SimJob to be processed
+        :param container_name: the container's name
+        :param host: the docker host running the container
+        :return: True if the container exited with exit code 0
+        """
+        logger.info(f'Adopting running container {container_name}')
+        working_dir = self._working_dir(sim_job)
+        working_dir.mkdir(parents=True, exist_ok=True)
+        self._record(sim_job, RUNNING)
+        exit_code = None
+        try:
+            exit_code = self.write_container_logs_and_remove_it(container_name=container_name, working_dir=working_dir,
+                                                                host=host)
+        except (DockerException, DaemonConnectionError) as e:
+            logger.warning(f'Error in run {container_name}: {e}.')
+        self._record(sim_job, SUCCEEDED if exit_code == 0 else FAILED, exit_code=exit_code)
+        return exit_code == 0
+
+    def _handle_orphan_containers(self):
+        """
+        Finds containers left over by an earlier run for this data_directory. When resuming, running job containers
+        are adopted by their jobs, all others are removed.
+        """
+        self._orphans = {}
+        for host in self._hosts:
+            if not host.healthy:
+                continue
+            try:
+                containers = host.docker_client.containers.list(
+                    all=True, filters={'label': f'{DATA_DIRECTORY_LABEL}={self._data_directory.resolve()}'})
+            except (DockerException, DaemonConnectionError) as e:
+                logger.warning(f'Can not list containers on docker host {host}: {e}')
+                continue
+            for container in containers:
+                if not container.name.startswith(self._container_prefix):
+                    continue
+                if (self._resume and container.status == 'running' and POOL_LABEL not in container.labels
+                        and not container.name.startswith(f'{self._container_prefix}Batch_')):
+                    self._orphans[container.name] = (host, container)
+                else:
+                    logger.warning(f'Removing leftover container {container.name} on docker host {host}')
+                    self._remove_container(container)
+
+    def _remove_container_by_name(self, host:DockerHost, container_name:str):
+        """
+        Removes a container left over by a failed attempt of a run, if it exists
+        :param host: docker host of the attempt
+        :param container_name: the container's name
+        """
+        try:
+            self._remove_container(host.docker_client.containers.get(container_name))
+        except (DockerException, DaemonConnectionError):
+            pass
+
+    def _kill_container(self, container_name:str):
+        """
+        Kills the container of a running job on whichever host runs it
+        :param container_name: the container's name
+        """
+        for host in self._hosts:
+            if not host.healthy:
+                continue
+            try:
+                host.docker_client.containers.get(container_name).kill()
+                return
+            except NotFound:
+                continue
+            except (DockerException, DaemonConnectionError) as e:
+                logger.warning(f'Could not kill container {container_name} on docker host {host}: {e}')
+
+    def _timeout(self, sim_job:SimJob):
+        """
+        :param sim_job: SimJob to be processed
+        :return: seconds the job's container may run, None without timeout
+        """
+        return sim_job.timeout if sim_job.timeout is not None else self._job_timeout
+
+    @staticmethod
+    def _remove_container(container):
+        try:
+            container.remove(force=True)
+        except (DockerException, DaemonConnectionError) as e:
+            logger.warning(f'Could not remove container {container.name}: {e}')
 
     def _init_simulation(self, sim_job):
         """
         Initialize simulation. May be overridden with custom function.
         - Create output folders
-        - Copy file templates
+        - Stage file templates
         - ...
         :param sim_job: SimJob to be processed
-        :return: Path to working directory on your host's filesystem for this SimJob
+        :return: Path to working directory on your host's filesystem for this SimJob, followed by the staged
+            templates, which are removed after the run
         """
         # prepare your data for your scenario here
-        output_folder_name = f'job_{sim_job.sim_name}'
-        working_dir = self._data_directory.joinpath(output_folder_name)
+        working_dir = self._working_dir(sim_job)
         try:
             with self._io_lock:
                 working_dir.mkdir(exist_ok=False, parents=True)
-                # if you need additional files in your simulation e.g. config files, data, add them here example_monte_carlo_pi here
-            return working_dir
+            # templates are staged outside of _io_lock, so jobs stage their inputs concurrently
+            staged_templates = stage_templates(sim_job.templates, working_dir, self._template_staging)
+            # if you need additional files in your simulation e.g. config files, data, add them here example_monte_carlo_pi here
+            return (working_dir, *staged_templates)
         except Exception as e:
             logger.warning(e)
             return None
         pass
 
 
-    def _run_docker_container(self, container_name, working_dir, command):
+    def _run_docker_container(self, container_name, working_dir, command, allocation:Allocation = None,
+                              host:DockerHost = None, mounts:list = None, telemetry:JobTelemetry = None,
+                              timeout:float = None):
         """
         Triggers the simulation run in a separate Docker container.
         :param container_name: the container's name
         :param working_dir: working directory on your host's file system
         :param command: container command (eg. name of script, cli arguments ...) Must match to your docker entry point.
+        :param allocation: cores, cpu quota and memory limit of the container, Default: unlimited
+        :param host: docker host to run the container on, Default: the first host
+        :param mounts: additional mounts, e.g. bind mounted templates
+        :param telemetry: JobTelemetry recording the create, run, logs and remove phases, Default: none
+        :param timeout: seconds the container may run before it is killed, Default: no timeout
+        :return: the container's exit code, None if it could not be run
+        :raise DockerException: if the container could not be created or started because of a transient error
         """
+        host = host if host is not None else self._hosts[0]
+        mounts = mounts or []
+        telemetry = telemetry if telemetry is not None else JobTelemetry(container_name)
+        exit_code = None
+        transient_error = None
+        limits = {} if allocation is None else allocation.container_kwargs()
         try:
-            system_platform = platform.system()
-            if system_platform == "Windows":
-                self._docker_client.containers.run(
-                    image=self._docker_image,
-                    command=command,
-                    mounts=[Mount(
-                        target='/mnt/data',
-                        source=str(working_dir.resolve()),
-                        type='bind'
-                    )],
-                    #working_dir='/simulation',
-                    name=container_name,
-                    environment={
-                        # If you need add your environment variables here
-                    },
-                    log_config=LogConfig(type=LogConfig.types.JSON, config={
-                        'max-size': '500m',
-                        'max-file': '3'
-                    })
-                )
-            else:
-                user_id = os.getuid()
-                self._docker_client.containers.run(
-                    image=self._docker_image,
-                    command=command,
-                    mounts=[Mount(
-                        target='/mnt/data',
-                        source=str(working_dir.resolve()),
-                        type='bind'
-                    )],
-                    working_dir='/mnt/data',
-                    name=container_name,
-                    environment={
-                        # If you need add your environment variables here
-                    },
-                    log_config=LogConfig(type=LogConfig.types.JSON, config={
-                        'max-size': '500m',
-                        'max-file': '3'
-                    }),
-                    user=user_id
-                )
+            with telemetry.phase('create'):
+                system_platform = platform.system()
+                if not host.shared_storage:
+                    container = host.docker_client.containers.create(
+                        image=host.image,
+                        command=command,
+                        working_dir='/mnt/data',
+                        name=container_name,
+                        labels={DATA_DIRECTORY_LABEL: str(self._data_directory.resolve())},
+                        environment={
+                            # If you need add your environment variables here
+                        },
+                        log_config=LogConfig(type=LogConfig.types.JSON, config={
+                            'max-size': '500m',
+                            'max-file': '3'
+                        }),
+                        **limits
+                    )
+                    with tar_directory(working_dir, arcname='data') as archive:
+                        container.put_archive('/mnt', archive)
+                    container.start()
+                elif system_platform == "Windows":
+                    host.docker_client.containers.run(
+                        image=host.image,
+                        command=command,
+                        mounts=[Mount(
+                            target='/mnt/data',
+                            source=str(working_dir.resolve()),
+                            type='bind'
+                        )] + mounts,
+                        #working_dir='/simulation',
+                        name=container_name,
+                        labels={DATA_DIRECTORY_LABEL: str(self._data_directory.resolve())},
+                        environment={
+                            # If you need add your environment variables here
+                        },
+                        log_config=LogConfig(type=LogConfig.types.JSON, config={
+                            'max-size': '500m',
+                            'max-file': '3'
+                        }),
+                        detach=True,
+                        **limits
+                    )
+                else:
+                    user_id = os.getuid()
+                    host.docker_client.containers.run(
+                        image=host.image,
+                        command=command,
+                        mounts=[Mount(
+                            target='/mnt/data',
+                            source=str(working_dir.resolve()),
+                            type='bind'
+                        )] + mounts,
+                        working_dir='/mnt/data',
+                        name=container_name,
+                        labels={DATA_DIRECTORY_LABEL: str(self._data_directory.resolve())},
+                        environment={
+                            # If you need add your environment variables here
+                        },
+                        log_config=LogConfig(type=LogConfig.types.JSON, config={
+                            'max-size': '500m',
+                            'max-file': '3'
+                        }),
+                        user=user_id,
+                        detach=True,
+                        **limits
+                    )
         except DockerException as e:
-            logger.warning('Error in run {container_name}: {e}.')
+            if self._retry_policy.is_transient(e):
+                # a container, which was created but not started, is removed before the run is repeated
+                transient_error = e
+            else:
+                logger.warning(f'Error in run {container_name}: {e}.')
         finally:
-            try:
-                self.write_container_logs_and_remove_it(
-                    container_name=container_name,
-                    working_dir=working_dir
-                )
-            except NotFound:
-                logger.warning(f'Can not save logs for {container_name}, because container does not exist')
+            if transient_error is None:
+                try:
+                    exit_code = self.write_container_logs_and_remove_it(
+                        container_name=container_name,
+                        working_dir=working_dir,
+                        host=host,
+                        telemetry=telemetry,
+                        timeout=timeout
+                    )
+                except NotFound:
+                    logger.warning(f'Can not save logs for {container_name}, because container does not exist')
+                except (DockerException, DaemonConnectionError) as e:
+                    # the container started, its run is not repeated
+                    logger.warning(f'Lost run {container_name}: {e}.')
+        if transient_error is not None:
+            raise transient_error
+        if exit_code not in (None, 0):
+            logger.warning(f'Run {container_name} exited with exit code {exit_code}.')
+        return exit_code
+
 
+    def _run_in_warm_container(self, container_name, working_dir, command, timeout:float = None):
+        """
+        Runs the simulation inside a warm container of the pool and writes its output to log.txt
+        :param container_name: name of the simulation run
+        :param working_dir: working directory on your host's file system
+        :param command: container command (eg. name of script, cli arguments ...) Must match to your docker entry point.
+        :param timeout: seconds the job may run before its container is killed, Default: no timeout
+        :return: the command's exit code, None if it could not be run
+        """
+        try:
+            with self._log_writer(working_dir) as log_writer:
+                exit_code = self._container_pool.run(working_dir=working_dir, command=command,
+                                                     output=log_writer.write, timeout=timeout)
+        except DockerException as e:
+            logger.warning(f'Error in run {container_name}: {e}.')
+            return None
+        if exit_code != 0:
+            logger.warning(f'Run {container_name} exited with exit code {exit_code}.')
+        return exit_code
+
+    async def _run_docker_container_async(self, container_name, working_dir, command, mounts:list = None,
+                                          telemetry:JobTelemetry = None, timeout:float = None):
+        """
+        Triggers the simulation run in a separate Docker container with the asyncio engine. Runs failing with a
+        transient error of the daemon are repeated after a backoff according to the retry policy.
+        :param container_name: the container's name
+        :param working_dir: working directory on your host's file system
+        :param command: container command (eg. name of script, cli arguments ...) Must match to your docker entry point.
+        :param mounts: additional mounts, e.g. bind mounted templates
+        :param telemetry: JobTelemetry recording the create, run, logs and remove phases, Default: none
+        :param timeout: seconds the container may run before it is killed, Default: no timeout
+        :return: the container's exit code, None if it could not be run
+        """
+        windows = platform.system() == "Windows"
+        host_config = HostConfig(
+            version=DEFAULT_DOCKER_API_VERSION,
+            mounts=[Mount(target='/mnt/data', source=str(working_dir.resolve()), type='bind')] + (mounts or []),
+            log_config=LogConfig(type=LogConfig.types.JSON, config={
+                'max-size': '500m',
+                'max-file': '3'
+            })
+        )
+        config = ContainerConfig(
+            version=DEFAULT_DOCKER_API_VERSION,
+            image=self._docker_image.id,
+            command=command,
+            working_dir=None if windows else '/mnt/data',
+            user=None if windows else os.getuid(),
+            labels={DATA_DIRECTORY_LABEL: str(self._data_directory.resolve())},
+            host_config=host_config
+        )
+        retries = 0
+        while True:
+            try:
+                with self._log_writer(working_dir) as log_writer:
+                    return await self._async_engine.run_container(
+                        container_name, config, log_writer,
+                        minimum_runtime=self._minimum_runtime,
+                        maximum_inactivity_time=self._maximum_inactivity_time,
+                        telemetry=telemetry,
+                        timeout=timeout
+                    )
+            except (DockerException, OSError) as e:
+                if not self._retry_policy.is_transient(e) or retries >= self._retry_policy.max_retries:
+                    logger.warning(f'Error in run {container_name}: {e}.')
+                    return None
+                retries += 1
+                delay = self._retry_policy.delay(retries)
+                logger.warning(f'Transient error in run {container_name}: {e}. Retrying in {delay:.1f}s '
+                               f'(retry {retries} of {self._retry_policy.max_retries})')
+                try:
+                    await self._async_engine.api.remove_container(container_name, force=True)
+                except (DockerException, OSError):
+                    pass
+                await asyncio.sleep(delay)
 
     def start_monitoring_thread(self):
         """
-        Start a monitoring thread, which observes running docker containers.
+        Start monitoring threads, which observe running docker containers on every host. Inactive containers get
+        stopped after self._maximum_inactivity_time
         """
-        monitoring_thread = threading.Thread(target=self._monitor_containers,
-                                             args=(self._container_prefix,),
-                                             daemon=True,
-                                             name='monitoring')
-        monitoring_thread.start()
+        self._monitors = {}
+        for host in self._hosts:
+            if not host.healthy:
+                continue
+            monitor = ContainerMonitor(docker_client=host.docker_client,
+                                       container_prefix=self._container_prefix,
+                                       minimum_runtime=self._minimum_runtime,
+                                       maximum_inactivity_time=self._maximum_inactivity_time,
+                                       ignore_label=POOL_LABEL)
+            try:
+                monitor.start()
+            except (DockerException, DaemonConnectionError) as e:
+                logger.warning(f'Can not monitor docker host {host}: {e}')
+                monitor.stop()
+                continue
+            self._monitors[host] = monitor
 
-    def write_container_logs_and_remove_it(self, container_name, working_dir):
+    def stop_monitoring_thread(self):
+        """
+        Stop the monitoring threads started with start_monitoring_thread
         """
-        Write container logs and remove the container from your docker server
+        for monitor in self._monitors.values():
+            monitor.stop()
+        self._monitors = {}
+
+    def write_container_logs_and_remove_it(self, container_name, working_dir, host:DockerHost = None,
+                                           telemetry:JobTelemetry = None, timeout:float = None):
+        """
+        Stream the container's logs to disk until it exits and remove the container from your docker server.
+        On hosts without shared storage, the container's /mnt/data is copied back into working_dir before.
         :param container_name: The container's name, which shall be removed
         :param working_dir: path, where logfiles shall be written to
+        :param host: docker host running the container, Default: the first host
+        :param telemetry: JobTelemetry recording the run, logs and remove phases and the container's stats,
+            Default: none
+        :param timeout: seconds the container may run before it is killed, Default: no timeout
+        :return: the container's exit code, TIMEOUT_EXIT_CODE if it was killed after its timeout
+        """
+        host = host if host is not None else self._hosts[0]
+        telemetry = telemetry if telemetry is not None else JobTelemetry(container_name)
+        container = host.docker_client.containers.get(container_name)
+        telemetry.container_started(lambda: container_stats(host.docker_client, container.id))
+        timed_out = threading.Event()
+        if container_name in self._cancelled_runs:
+            # the run was cancelled while its container was started
+            try:
+                container.kill()
+            except (DockerException, DaemonConnectionError) as e:
+                logger.warning(f'Could not kill container {container_name}: {e}')
+
+        def kill():
+            timed_out.set()
+            logger.warning(f'Run {container_name} exceeded its timeout of {timeout} seconds. It will be killed.')
+            try:
+                container.kill()
+            except (DockerException, DaemonConnectionError) as e:
+                logger.warning(f'Could not kill container {container_name}: {e}')
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, kill)
+            timer.daemon = True
+            timer.start()
+        try:
+            with telemetry.phase('run'):
+                with self._log_writer(working_dir) as log_writer:
+                    exit_code = self._follow_container(container, log_writer, telemetry,
+                                                       monitor=self._monitors.get(host))
+            if timer is not None:
+                timer.cancel()
+            if not host.shared_storage:
+                with telemetry.phase('cleanup'):
+                    chunks, _ = container.get_archive('/mnt/data')
+                    extract_directory(chunks, working_dir, exclude=(log_writer.path.name,))
+            return TIMEOUT_EXIT_CODE if timed_out.is_set() and exit_code != 0 else exit_code
+        finally:
+            if timer is not None:
+                timer.cancel()
+            telemetry.container_stopped()
+            with telemetry.phase('remove'):
+                container.remove(force=True)
+
+    def _follow_container(self, container, log_writer:LogWriter, telemetry:JobTelemetry,
+                          monitor:ContainerMonitor = None) -> int:
+        """
+        Streams the logs of a running container until it exits. If the connection to the daemon breaks with a
+        transient error, the log stream is reattached according to the retry policy. The container keeps running
+        meanwhile: the reattached stream starts at the beginning of the log, bytes already written are skipped.
+        :param container: the running container
+        :param log_writer: LogWriter of the run
+        :param telemetry: JobTelemetry recording the logs phase
+        :param monitor: ContainerMonitor of the container's host, receives the container's log activity
+        :return: the container's exit code
+        :raise DockerException: if the container could not be followed, also after the retries
+        """
+        written = 0
+        retries = 0
+        while True:
+            skip = written
+            try:
+                for chunk in container.logs(stream=True, follow=True):
+                    if skip >= len(chunk):
+                        skip -= len(chunk)
+                        continue
+                    chunk, skip = chunk[skip:], 0
+                    with telemetry.phase('logs'):
+                        log_writer.write(chunk)
+                    written += len(chunk)
+                    if monitor is not None:
+                        monitor.report_activity(container.name)
+                return container.wait().get('StatusCode')
+            except Exception as e:
+                if not self._retry_policy.is_transient(e) or retries >= self._retry_policy.max_retries:
+                    raise
+                retries += 1
+                delay = self._retry_policy.delay(retries)
+                logger.warning(f'Lost connection to container {container.name}: {e}. Reattaching in {delay:.1f}s '
+                               f'(retry {retries} of {self._retry_policy.max_retries})')
+                time.sleep(delay)
+
+    def _log_writer(self, working_dir):
+        """
+        Creates the log file of a simulation run
+        :param working_dir: path, where logfiles shall be written to
+        :return: LogWriter
         """
-        container = self._docker_client.containers.get(container_name)
-        with open(working_dir.joinpath('log.txt'), 'w') as f:
-            f.write(container.logs().decode('utf-8'))
-        container.remove()
+        return LogWriter(directory=working_dir,
+                         compression=self._log_compression,
+                         max_bytes=self._log_max_bytes,
+                         backup_count=self._log_backup_count)
+
+    def _resolve_image(self, host:DockerHost):
+        """
+        Provides the simulation image on a host according to the pull policy
+        :param host: docker host
+        :return: docker image
+        """
+        name = f'{self._docker_container_url}:{self._docker_repo_tag}'
+        try:
+            local_image = host.docker_client.images.get(name)
+        except NotFound:
+            local_image = None
+        if self._pull_policy == 'never':
+            if local_image is None:
+                raise RuntimeError(f'Image {name} is not present on docker host {host} and pull_policy is never')
+            return local_image
+        if local_image is not None and self._pull_policy == 'if-not-present':
+            return local_image
+        if local_image is not None:
+            try:
+                digest = self._with_registry_authentication(
+                    lambda: host.docker_client.images.get_registry_data(name)).id
+            except (DockerException, DaemonConnectionError) as e:
+                logger.warning(f'Can not check {name} at the registry, using the local image on docker host {host}: {e}')
+                return local_image
+            if any(repo_digest.endswith(f'@{digest}') for repo_digest in local_image.attrs.get('RepoDigests', [])):
+                logger.info(f'Image {name} on docker host {host} is up to date')
+                return local_image
+        with Halo(text=f'Pulling latest docker_sim image on {host}', spinner='dots'):
+            return self._with_registry_authentication(lambda: host.docker_client.images.pull(
+                repository=self._docker_container_url,
+                tag=self._docker_repo_tag
+            ))
+
+    def _with_registry_authentication(self, request):
+        """
+        Runs a registry request anonymously (or with stored credentials) first and authenticates at the container
+        registry only if the request is refused for missing credentials
+        :param request: function contacting the registry
+        :return: result of request
+        """
+        try:
+            return request()
+        except APIError as e:
+            if not self._refused_by_registry(e):
+                raise
+            with self._authentication_lock:
+                if not self._authenticated:
+                    tic = time.monotonic()
+                    self._authenticate_at_container_registry()
+                    self._authenticated = True
+                    self.startup_timings['authentication'] = time.monotonic() - tic
+            return request()
+
+    @staticmethod
+    def _refused_by_registry(error:APIError) -> bool:
+        """
+        :param error: error of a registry request
+        :return: True if the registry refused the request for missing credentials. The daemon forwards some refusals
+            as server errors, so the explanation is checked as well. Other errors, like an unreachable registry or
+            a missing tag, are not solved by a login.
+        """
+        if error.status_code in (401, 403):
+            return True
+        explanation = f'{error.explanation or ""} {error}'.lower()
+        return 'denied' in explanation or 'unauthorized' in explanation
 
     def _authenticate_at_container_registry(self):
         """
@@ -251,44 +1572,17 @@ class DockerSimManager():
             username = input('Enter username for container registry: ')
         if password is None:
             password = getpass('Enter password for container registry: ')
-        login_result = self._docker_client.login(
-            registry='ghcr.io',
-            username=username,
-            password=password,
-            reauth=True
-        )
-        if login_result['Status'] != 'Login Succeeded':
-            raise RuntimeError("Could not authenticate at GitHub container registry")
-        else:
-            logger.info("Successfully authenticated at GitHub container registry.")
-
-    def _monitor_containers(self, container_prefix):
-        """
-        Monitors all running docker containers. Inactive containers get killed after self._maximum_inactivity_time
-        :param container_prefix: The containers prefix used for all containers in this simulation
-        """
-        while True:
-            containers = self._docker_client.containers.list()
-            for container in containers:
-                try:
-                    if container_prefix in container.name:
-                        container_start = dateutil.parser.isoparse(container.attrs['State']['StartedAt'])
-                        now = datetime.datetime.now(datetime.timezone.utc)
-                        uptime = (now - container_start).total_seconds()
-
-                        logs = container.logs(since=int(time.time() - self._maximum_inactivity_time))
-
-                        if uptime > self._minimum_runtime and not logs:
-                            logger.warning(f'Container {container.name} ran for more than '
-                                           f'{self._minimum_runtime} seconds and showed no log activity for '
-                                           f'{self._maximum_inactivity_time} seconds.'
-                                           f'It will be stopped.')
-                            container.stop()
-                except APIError as e:
-                    logger.warning(f'Error during thread monitoring: {str(e)}')
-
-            time.sleep(self._monitoring_frequency)
-
+        for host in self._hosts:
+            login_result = host.docker_client.login(
+                registry='ghcr.io',
+                username=username,
+                password=password,
+                reauth=True
+            )
+            if login_result['Status'] != 'Login Succeeded':
+                raise RuntimeError(f"Could not authenticate at GitHub container registry on docker host {host}")
+            else:
+                logger.info(f"Successfully authenticated at GitHub container registry on docker host {host}.")
 
     @staticmethod
     def cleanup_sim_objects(sim_job:SimJob, file_objects):
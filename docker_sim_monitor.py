@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""Event-driven container monitoring for DockerSimManager
+
+Follows the docker events stream to learn, when simulation containers start and exit. The time of a container's
+last log output is reported by the code, which streams the container's logs anyway, so every log is read from the
+daemon only once. Containers, which show no activity for too long, are stopped as soon as their deadline passes.
+"""
+
+import threading
+import time
+
+from dateutil.parser import isoparse
+from docker.errors import DockerException
+from loguru import logger
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+
+class _ContainerState():
+    def __init__(self, container_id: str, name: str, started: float, last_activity=None) -> None:
+        self.container_id = container_id
+        self.name = name
+        self.started = started
+        self.last_activity = last_activity
+        self.stopping = False
+
+
+class ContainerMonitor():
+    def __init__(self,
+                 docker_client,
+                 container_prefix: str,
+                 minimum_runtime: float,
+                 maximum_inactivity_time: float,
+                 ignore_label: str = None
+                 ) -> None:
+        """
+        Creates a monitor for all containers whose name contains container_prefix. A container gets stopped,
+        if it ran for more than minimum_runtime and showed no log activity for maximum_inactivity_time. Log activity
+        is reported with report_activity.
+        :param docker_client: docker client
+        :param container_prefix: The containers prefix used for all containers in this simulation
+        :param minimum_runtime: seconds a container may run without any log output
+        :param maximum_inactivity_time: seconds a container may be silent after its last log output
+        :param ignore_label: containers carrying this label are not monitored
+        """
+        self._docker_client = docker_client
+        self._container_prefix = container_prefix
+        self._minimum_runtime = minimum_runtime
+        self._maximum_inactivity_time = maximum_inactivity_time
+        self._ignore_label = ignore_label
+        self._containers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._event_stream = None
+        self._threads = []
+
+    def start(self):
+        """
+        Subscribes to the docker events, adopts already running containers and starts the watchdog.
+        """
+        self._event_stream = self._docker_client.events(decode=True, filters={'type': 'container'})
+        for container in self._docker_client.containers.list(filters={'name': self._container_prefix}):
+            if self._is_monitored(container.name, container.labels):
+                started = isoparse(container.attrs['State']['StartedAt']).timestamp()
+                # adopted containers get a full inactivity period, their log history is not read
+                self._track(container.id, container.name, started, last_activity=time.time())
+        for target, name in ((self._follow_events, 'monitoring-events'), (self._watch, 'monitoring')):
+            thread = threading.Thread(target=target, daemon=True, name=name)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        """
+        Stops monitoring and waits for the monitoring threads to finish
+        :param timeout: seconds to wait for each thread
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        self._close(self._event_stream)
+        with self._lock:
+            self._containers.clear()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def report_activity(self, name: str) -> None:
+        """
+        Records log output of a monitored container, containers, which are not monitored, are ignored
+        :param name: container name
+        """
+        # called for every chunk of log output: no lock, and no wakeup, because the deadline only moves later
+        state = self._containers.get(name)
+        if state is not None:
+            state.last_activity = time.time()
+
+    def last_activity(self, name: str):
+        """
+        :param name: container name
+        :return: timestamp of the last log output of a monitored container, None if there was none
+        """
+        with self._lock:
+            state = self._containers.get(name)
+            return None if state is None else state.last_activity
+
+    def _is_monitored(self, name: str, labels) -> bool:
+        return self._container_prefix in name and (self._ignore_label is None or self._ignore_label not in labels)
+
+    @staticmethod
+    def _close(stream):
+        if stream is None:
+            return
+        try:
+            stream.close()
+        except Exception as e:
+            logger.debug(f'Could not close stream: {e}')
+
+    def _follow_events(self):
+        try:
+            for event in self._event_stream:
+                if self._stopped.is_set():
+                    return
+                attributes = event.get('Actor', {}).get('Attributes', {})
+                name = attributes.get('name', '')
+                if not self._is_monitored(name, attributes):
+                    continue
+                action = event.get('Action', event.get('status'))
+                if action == 'start':
+                    self._track(event.get('id'), name, event.get('timeNano', time.time() * 1e9) / 1e9)
+                elif action in ('die', 'destroy'):
+                    self._untrack(name)
+        except DockerException as e:
+            if not self._stopped.is_set():
+                logger.warning(f'Error during container monitoring: {str(e)}')
+
+    def _track(self, container_id: str, name: str, started: float, last_activity=None):
+        state = _ContainerState(container_id, name, started, last_activity)
+        with self._lock:
+            if self._stopped.is_set() or name in self._containers:
+                return
+            self._containers[name] = state
+        self._wakeup.set()
+
+    def _untrack(self, name: str):
+        with self._lock:
+            state = self._containers.pop(name, None)
+        if state is not None:
+            self._wakeup.set()
+
+    def _deadline(self, state: _ContainerState) -> float:
+        deadline = state.started + self._minimum_runtime
+        if state.last_activity is not None:
+            deadline = max(deadline, state.last_activity + self._maximum_inactivity_time)
+        return deadline
+
+    def _watch(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            now = time.time()
+            with self._lock:
+                waiting = [state for state in self._containers.values() if not state.stopping]
+                due = [state for state in waiting if self._deadline(state) <= now]
+                for state in due:
+                    state.stopping = True
+                deadlines = [self._deadline(state) for state in waiting if not state.stopping]
+            for state in due:
+                self._stop_container(state)
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+            self._wakeup.wait(timeout)
+
+    def _stop_container(self, state: _ContainerState):
+        logger.warning(f'Container {state.name} ran for more than '
+                       f'{self._minimum_runtime} seconds and showed no log activity for '
+                       f'{self._maximum_inactivity_time} seconds.'
+                       f'It will be stopped.')
+        try:
+            self._docker_client.containers.get(state.name).stop()
+        except DockerException as e:
+            logger.warning(f'Error during container monitoring: {str(e)}')
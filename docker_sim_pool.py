@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+"""Warm container pool for DockerSimManager
+
+Keeps a fixed number of long-lived containers of the simulation image running and dispatches simulation
+commands into them with exec, so short jobs do not pay for a full container create/start/remove cycle.
+"""
+
+import itertools
+import queue
+import threading
+from pathlib import Path, PurePosixPath
+
+from docker.errors import DockerException
+from docker.types import Mount
+from loguru import logger
+
+from docker_sim_batch import job_args
+from docker_sim_retry import TIMEOUT_EXIT_CODE
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+POOL_LABEL = 'docker_sim.pool'
+
+
+class WarmContainerPool():
+    def __init__(self,
+                 docker_client,
+                 docker_image,
+                 data_directory: Path,
+                 size: int,
+                 jobs_per_container: int = 100,
+                 name_prefix: str = 'DockerSimPool',
+                 user=None,
+                 keepalive_command=('sleep', 'infinity'),
+                 mount_point: str = '/mnt/pool',
+                 labels: dict = None
+                 ) -> None:
+        """
+        Creates a pool of up to size containers. Containers are started on first use.
+        :param docker_client: docker client
+        :param docker_image: simulation image
+        :param data_directory: path to the output directory on your host, mounted at mount_point
+        :param size: maximum number of running containers
+        :param jobs_per_container: number of jobs after which a container is replaced
+        :param name_prefix: prefix of the container names
+        :param user: user to run the jobs as, None for the image's default user
+        :param keepalive_command: entrypoint keeping an idle container running
+        :param mount_point: path of data_directory inside the containers
+        :param labels: additional container labels
+        """
+        self._docker_client = docker_client
+        self._docker_image = docker_image
+        self._data_directory = data_directory
+        self._jobs_per_container = jobs_per_container
+        self._name_prefix = name_prefix
+        self._user = user
+        self._keepalive_command = list(keepalive_command)
+        self._mount_point = PurePosixPath(mount_point)
+        self._labels = dict(labels or {})
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._container_ids = itertools.count()
+        self._jobs_done = {}
+        self._lock = threading.Lock()
+        self.containers_started = 0
+        self.containers_recycled = 0
+        self._entrypoint = self._image_entrypoint(docker_image)
+
+    @staticmethod
+    def _image_entrypoint(docker_image):
+        """
+        Reads the image's entrypoint. Relative paths are resolved against the image's working directory,
+        because jobs are executed in their own working directory.
+        :param docker_image: simulation image
+        :return: entrypoint as list
+        """
+        config = docker_image.attrs.get('Config') or {}
+        entrypoint = config.get('Entrypoint') or []
+        working_dir = PurePosixPath(config.get('WorkingDir') or '/')
+        return [str(working_dir.joinpath(arg)) if arg.startswith('./') else arg for arg in entrypoint]
+
+    def job_command(self, job_dir: PurePosixPath, command) -> list:
+        """
+        Builds the exec command of a job. As in per-container mode the job's directory is addressed as /mnt/data.
+        :param job_dir: job directory inside the container
+        :param command: command appended to the image's entrypoint
+        :return: exec command as list
+        """
+        return self._entrypoint + job_args(command, job_dir)
+
+    def run(self, working_dir: Path, command, output, timeout: float = None) -> int:
+        """
+        Executes a job in one of the pool's containers. The job's output is streamed to output chunk by chunk.
+        :param working_dir: job directory on your host's file system, must be inside data_directory
+        :param command: command appended to the image's entrypoint
+        :param output: callable receiving the output chunks
+        :param timeout: seconds the job may run. An exec can not be killed on its own, so the whole container is
+            killed and replaced. Default: no timeout
+        :return: exit code, TIMEOUT_EXIT_CODE if the job exceeded its timeout
+        """
+        job_dir = self._mount_point.joinpath(*working_dir.relative_to(self._data_directory).parts)
+        self._slots.acquire()
+        try:
+            container = self._acquire_container()
+            exit_code = None
+            timer = None
+            timed_out = threading.Event()
+            if timeout is not None:
+                timer = threading.Timer(timeout, self._kill_container, (container, timed_out))
+                timer.daemon = True
+                timer.start()
+            try:
+                api = self._docker_client.api
+                exec_kwargs = {'workdir': str(job_dir)}
+                if self._user is not None:
+                    exec_kwargs['user'] = str(self._user)
+                exec_id = api.exec_create(container.id, self.job_command(job_dir, command), **exec_kwargs)['Id']
+                for chunk in api.exec_start(exec_id, stream=True):
+                    output(chunk)
+                exit_code = api.exec_inspect(exec_id)['ExitCode']
+                if timed_out.is_set() and exit_code != 0:
+                    exit_code = TIMEOUT_EXIT_CODE
+                return exit_code
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                self._release_container(container, failed=exit_code != 0 or timed_out.is_set())
+        finally:
+            self._slots.release()
+
+    def _acquire_container(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._start_container()
+
+    def _start_container(self):
+        name = f'{self._name_prefix}_{next(self._container_ids)}'
+        container = self._docker_client.containers.run(
+            image=self._docker_image,
+            entrypoint=self._keepalive_command,
+            mounts=[Mount(
+                target=str(self._mount_point),
+                source=str(self._data_directory.resolve()),
+                type='bind'
+            )],
+            name=name,
+            labels=dict(self._labels, **{POOL_LABEL: name}),
+            detach=True
+        )
+        with self._lock:
+            self._jobs_done[container.name] = 0
+            self.containers_started += 1
+        return container
+
+    def _release_container(self, container, failed: bool):
+        """
+        Returns a container to the pool, or replaces it after a failure or jobs_per_container jobs
+        """
+        with self._lock:
+            self._jobs_done[container.name] += 1
+            recycle = failed or self._jobs_done[container.name] >= self._jobs_per_container
+            if recycle:
+                del self._jobs_done[container.name]
+                self.containers_recycled += 1
+        if recycle:
+            self._remove_container(container)
+        else:
+            self._idle.put(container)
+
+    @staticmethod
+    def _kill_container(container, timed_out: threading.Event):
+        """
+        Kills a container, whose job exceeded its timeout
+        """
+        timed_out.set()
+        logger.warning(f'A job in pool container {container.name} exceeded its timeout. The container will be killed.')
+        try:
+            container.kill()
+        except DockerException as e:
+            logger.warning(f'Could not kill pool container {container.name}: {e}')
+
+    @staticmethod
+    def _remove_container(container):
+        try:
+            container.remove(force=True)
+        except DockerException as e:
+            logger.warning(f'Could not remove pool container {container.name}: {e}')
+
+    def close(self):
+        """
+        Removes all idle containers of the pool
+        """
+        while True:
+            try:
+                container = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._jobs_done.pop(container.name, None)
+            self._remove_container(container)
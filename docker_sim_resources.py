@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""Resource-aware scheduling for DockerSimManager
+
+Packs jobs with CPU and memory requests against the cores and memory of the docker host. Every running job gets a
+disjoint set of cores, which is enforced together with its CPU quota and memory limit by the container runtime.
+"""
+
+import math
+import threading
+from typing import Sequence
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+_MEMORY_UNITS = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+
+def parse_memory(memory) -> int:
+    """
+    Converts a memory size in docker notation into bytes
+    :param memory: int (bytes) or str like '512m', '2g'
+    :return: bytes, None if memory is None
+    """
+    if memory is None or isinstance(memory, int):
+        return memory
+    memory = str(memory).strip().lower()
+    unit = memory[-1] if memory[-1] in _MEMORY_UNITS else 'b'
+    number = memory[:-1] if memory[-1] in _MEMORY_UNITS else memory
+    return int(float(number) * _MEMORY_UNITS[unit])
+
+
+class Allocation():
+    def __init__(self, cores: Sequence[int], cpus: float, memory: int) -> None:
+        """
+        Resources granted to a single job
+        :param cores: cores reserved exclusively for the job
+        :param cpus: CPU quota of the job
+        :param memory: memory limit in bytes, None for unlimited
+        """
+        self.cores = list(cores)
+        self.cpus = cpus
+        self.memory = memory
+
+    def container_kwargs(self) -> dict:
+        """
+        :return: keyword arguments for containers.run enforcing this allocation
+        """
+        kwargs = {
+            'nano_cpus': int(self.cpus * 1e9),
+            'cpuset_cpus': ','.join(str(core) for core in self.cores),
+        }
+        if self.memory is not None:
+            kwargs['mem_limit'] = self.memory
+        return kwargs
+
+
+class _Ticket():
+    def __init__(self, cores: int, cpus: float, memory: int) -> None:
+        self.cores = cores
+        self.cpus = cpus
+        self.memory = memory
+
+
+class ResourceScheduler():
+    def __init__(self, cores: Sequence[int], memory: int = None) -> None:
+        """
+        Creates a scheduler for the given cores and memory. Waiting for free resources and the order of waiting
+        jobs are up to the caller, see HostPool.acquire.
+        :param cores: ids of the cores jobs may run on
+        :param memory: memory available for jobs in bytes, None to ignore memory requests when packing
+        """
+        self._free_cores = sorted(cores)
+        self._total_cores = len(self._free_cores)
+        self._total_memory = memory
+        self._free_memory = memory
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_docker_host(cls, docker_client):
+        """
+        Creates a scheduler for all cores and memory of the docker host
+        :param docker_client: docker client
+        :return: ResourceScheduler
+        """
+        info = docker_client.info()
+        return cls(cores=range(info['NCPU']), memory=info.get('MemTotal'))
+
+    def validate(self, cpus: float = None, memory=None):
+        """
+        Checks that a request can ever be satisfied by this host
+        :raise ValueError: if the request exceeds the host's resources
+        """
+        cpus = 1 if cpus is None else cpus
+        memory = parse_memory(memory)
+        if cpus <= 0 or math.ceil(cpus) > self._total_cores:
+            raise ValueError(f'Request of {cpus} cpus can not be satisfied by {self._total_cores} cores')
+        if memory is not None and self._total_memory is not None and memory > self._total_memory:
+            raise ValueError(f'Request of {memory} bytes exceeds the available {self._total_memory} bytes')
+
+    def try_acquire(self, cpus: float = None, memory=None):
+        """
+        Reserves the requested resources, if they are free right now
+        :param cpus: number of cpus, may be fractional, default: 1
+        :param memory: memory in bytes or docker notation ('2g'), None for no limit
+        :return: Allocation, None if the request does not fit now
+        """
+        self.validate(cpus, memory)
+        cpus = 1 if cpus is None else cpus
+        ticket = _Ticket(math.ceil(cpus), cpus, parse_memory(memory))
+        with self._lock:
+            if not self._fits(ticket):
+                return None
+            return self._allocate(ticket)
+
+    def release(self, allocation: Allocation) -> None:
+        """
+        Returns the resources of a finished job
+        """
+        with self._lock:
+            self._free_cores = sorted(self._free_cores + allocation.cores)
+            if self._free_memory is not None and allocation.memory is not None:
+                self._free_memory += allocation.memory
+
+    def _fits(self, ticket: _Ticket) -> bool:
+        if ticket.cores > len(self._free_cores):
+            return False
+        return self._free_memory is None or ticket.memory is None or ticket.memory <= self._free_memory
+
+    def _allocate(self, ticket: _Ticket) -> Allocation:
+        """
+        Reserves the resources of a ticket, which fits. Must hold _lock.
+        """
+        allocation = Allocation(self._take_cores(ticket.cores), ticket.cpus, ticket.memory)
+        if self._free_memory is not None and ticket.memory is not None:
+            self._free_memory -= ticket.memory
+        return allocation
+
+    def _take_cores(self, count: int):
+        """
+        Takes count free cores, preferring adjacent core ids
+        """
+        free = self._free_cores
+        for start in range(len(free) - count + 1):
+            if free[start + count - 1] - free[start] == count - 1:
+                cores = free[start:start + count]
+                break
+        else:
+            cores = free[:count]
+        self._free_cores = [core for core in free if core not in cores]
+        return cores
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""Result aggregation for DockerSimManager
+
+Simulations write a small machine-readable record (result.json) into their working directory. The ResultAggregator
+reads the record of every job once, as the job finishes, collects them column by column and writes one columnar
+file for the whole sweep. Estimates (fields named <name>_estimate) are merged across jobs, weighted by the jobs'
+n_samples.
+"""
+
+import json
+import math
+import threading
+from pathlib import Path
+
+from loguru import logger
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+RESULT_FORMATS = (None, 'npz', 'parquet')
+_ESTIMATE_SUFFIX = '_estimate'
+
+
+def check_result_format(file_format: str):
+    """
+    :param file_format: 'npz' or 'parquet'
+    :return: numpy or pyarrow.parquet
+    :raise ValueError: for unknown formats
+    :raise ImportError: if the package required by the format is not installed
+    """
+    if file_format not in RESULT_FORMATS or file_format is None:
+        raise ValueError(f'Unknown result format {file_format}, choose one of {RESULT_FORMATS[1:]}')
+    try:
+        if file_format == 'npz':
+            import numpy
+            return numpy
+        import pyarrow.parquet
+        return pyarrow.parquet
+    except ImportError:
+        package = 'numpy' if file_format == 'npz' else 'pyarrow'
+        raise ImportError(f'{file_format} results require the {package} package: pip install {package}')
+
+
+class _WeightedEstimate():
+    def __init__(self) -> None:
+        """
+        Sample-weighted mean of the estimates of several jobs. Each job's estimate is the mean of its samples, so
+        the combined estimate is the mean over all samples. Standard errors combine as independent means.
+        """
+        self.jobs = 0
+        self.n_samples = 0
+        self.weighted_sum = 0.0
+        self.variance_sum = 0.0
+        self.standard_errors = True
+
+    def add(self, estimate: float, n_samples: int, standard_error: float = None) -> None:
+        self.jobs += 1
+        self.n_samples += n_samples
+        self.weighted_sum += n_samples * estimate
+        if standard_error is None:
+            self.standard_errors = False
+        else:
+            self.variance_sum += (n_samples * standard_error) ** 2
+
+    def result(self) -> dict:
+        return {
+            'estimate': self.weighted_sum / self.n_samples,
+            'standard_error': math.sqrt(self.variance_sum) / self.n_samples if self.standard_errors else None,
+            'n_samples': self.n_samples,
+            'jobs': self.jobs,
+        }
+
+
+class ResultAggregator():
+    def __init__(self, path: Path, file_format: str = 'npz', result_file: str = 'result.json') -> None:
+        """
+        Collects the result records of a computation
+        :param path: columnar output file
+        :param file_format: 'npz' (requires numpy) or 'parquet' (requires pyarrow)
+        :param result_file: name of the record inside each job's working directory
+        """
+        self._writer = check_result_format(file_format)
+        self.path = Path(path)
+        self._file_format = file_format
+        self._result_file = result_file
+        self._columns = {}
+        self._rows = 0
+        self._estimates = {}
+        self._lock = threading.Lock()
+
+    def add(self, job: str, working_dir: Path, succeeded: bool) -> bool:
+        """
+        Reads the record of a finished job. Lists and dicts are stored as json strings, estimates of succeeded jobs
+        are merged.
+        :param job: the job's sim_name
+        :param working_dir: the job's working directory
+        :param succeeded: True if the job succeeded
+        :return: True if the job wrote a record
+        """
+        try:
+            with open(Path(working_dir).joinpath(self._result_file)) as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f'Can not read the result of run {job}: {e}')
+            return False
+        row = {'job': job, 'succeeded': succeeded}
+        for key, value in record.items():
+            row[key] = json.dumps(value) if isinstance(value, (list, dict)) else value
+        with self._lock:
+            for key in row:
+                if key not in self._columns:
+                    self._columns[key] = [None] * self._rows
+            for key, column in self._columns.items():
+                column.append(row.get(key))
+            self._rows += 1
+            if succeeded:
+                self._merge_estimates(record)
+        return True
+
+    def _merge_estimates(self, record: dict) -> None:
+        n_samples = record.get('n_samples')
+        if not isinstance(n_samples, (int, float)) or not n_samples:
+            return
+        for key, value in record.items():
+            if key.endswith(_ESTIMATE_SUFFIX) and isinstance(value, (int, float)) and math.isfinite(value):
+                name = key[:-len(_ESTIMATE_SUFFIX)]
+                self._estimates.setdefault(name, _WeightedEstimate()).add(value, n_samples,
+                                                                           record.get('standard_error'))
+
+    def summary(self) -> dict:
+        """
+        :return: number of records and the combined estimates, e.g. {'records': 19, 'estimates': {'pi': {...}}}
+        """
+        with self._lock:
+            return {
+                'records': self._rows,
+                'estimates': dict((name, estimate.result()) for name, estimate in self._estimates.items()),
+            }
+
+    def _column_array(self, values):
+        numpy = self._writer
+        present = [value for value in values if value is not None]
+        if present and all(isinstance(value, bool) for value in present) and len(present) == len(values):
+            return numpy.array(values, dtype=bool)
+        if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+            if len(present) == len(values) and all(isinstance(value, int) for value in present):
+                return numpy.array(values, dtype=numpy.int64)
+            return numpy.array([math.nan if value is None else value for value in values], dtype=numpy.float64)
+        return numpy.array(['' if value is None else str(value) for value in values], dtype=str)
+
+    def write(self) -> Path:
+        """
+        Writes all records collected so far as one table with a row per job
+        :return: path of the written file
+        """
+        with self._lock:
+            columns = dict((key, list(values)) for key, values in self._columns.items())
+        if self._file_format == 'npz':
+            with open(self.path, 'wb') as f:
+                self._writer.savez(f, **dict((key, self._column_array(values)) for key, values in columns.items()))
+        else:
+            import pyarrow
+            self._writer.write_table(pyarrow.table(columns), str(self.path))
+        return self.path
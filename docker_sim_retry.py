@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Retries of transient docker errors and speculative execution of stragglers for DockerSimManager
+
+A RetryPolicy decides, which errors of the docker daemon are worth another attempt (server errors, timeouts and
+lost connections to a daemon, which is still alive) and how long to back off before it: exponentially growing delays
+with random jitter, so jobs failing together do not hit a recovering daemon together again.
+
+A StragglerDetector tells, when a running job has taken far longer than the median of the jobs finished before it.
+Once no more jobs are waiting, the manager runs a duplicate of such a straggler on an idle worker and keeps the result
+of whichever run finishes first.
+"""
+
+import random
+import statistics
+import threading
+
+from docker.errors import APIError
+from requests.exceptions import ConnectionError as DaemonConnectionError, Timeout as DaemonTimeout
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+# exit code of a run, which was killed after exceeding its timeout, as reported by GNU timeout
+TIMEOUT_EXIT_CODE = 124
+
+
+class RetryPolicy():
+    def __init__(self, max_retries: int = 3, backoff: float = 1.0, max_backoff: float = 60.0, seed: int = None) -> None:
+        """
+        Retries of runs, which failed because of a transient error of the docker daemon
+        :param max_retries: number of retries of a run, 0 disables retries
+        :param backoff: delay before the first retry in seconds, doubled with every further retry
+        :param max_backoff: upper bound of the delay in seconds
+        :param seed: seed of the jitter, Default: random
+        """
+        if max_retries < 0 or backoff < 0:
+            raise ValueError('max_retries and backoff must not be negative')
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        """
+        :param error: exception raised while creating, running or removing a container
+        :return: True for errors, which may disappear when the run is repeated: server errors (5xx) of the daemon,
+            timeouts and broken connections. Client errors like a missing image or an invalid command are permanent.
+        """
+        if isinstance(error, (DaemonConnectionError, DaemonTimeout, ConnectionError, TimeoutError)):
+            return True
+        if isinstance(error, APIError):
+            return error.is_server_error()
+        # errors of the asyncio engine carry the HTTP status code of the daemon's response
+        status_code = getattr(error, 'status_code', None)
+        return isinstance(status_code, int) and 500 <= status_code < 600
+
+    def delay(self, attempt: int) -> float:
+        """
+        :param attempt: number of the retry, starting at 1
+        :return: seconds to wait before the retry, between half and the full exponential backoff
+        """
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        with self._lock:
+            return ceiling / 2 + self._random.uniform(0, ceiling / 2)
+
+
+class StragglerDetector():
+    def __init__(self, factor: float, min_peers: int = 3) -> None:
+        """
+        Detects jobs, which run far longer than their peers
+        :param factor: a job is a straggler after running factor times the median runtime of the finished jobs
+        :param min_peers: number of finished jobs required, before any job is considered a straggler
+        """
+        if factor <= 1:
+            raise ValueError('The straggler factor must be greater than 1')
+        self.factor = factor
+        self.min_peers = min_peers
+        self._runtimes = []
+
+    def add(self, seconds: float) -> None:
+        """
+        Adds the runtime of a finished job
+        """
+        self._runtimes.append(seconds)
+
+    @property
+    def threshold(self):
+        """
+        :return: seconds after which a running job is a straggler, None while too few jobs finished
+        """
+        if len(self._runtimes) < self.min_peers:
+            return None
+        return self.factor * statistics.median(self._runtimes)
+
+    def deadline(self, started_at: float):
+        """
+        :param started_at: time at which a job started
+        :return: time at which the job becomes a straggler, None while too few jobs finished
+        """
+        threshold = self.threshold
+        return None if threshold is None else started_at + threshold
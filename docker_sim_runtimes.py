@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""Runtime history and longest-first job ordering for DockerSimManager
+
+The runtimes of the last successful container runs are recorded in a SQLite database, keyed by the image and the
+job's command. From the history a RuntimeModel predicts the runtime of a job: the median of the last runs of the same
+command, otherwise a power law of the command's numeric parameters (e.g. -i, -s, -n, -g), fitted by least squares
+on the logarithms, otherwise the median runtime of the image. Dispatching jobs longest predicted first (LPT) keeps
+a long job from starting last while all other workers are already idle.
+"""
+
+import collections
+import heapq
+import itertools
+import math
+import shlex
+import sqlite3
+import statistics
+import threading
+import time
+from pathlib import Path
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+JOB_ORDERS = ('fifo', 'lpt')
+_RECENT_RUNS = 10
+_MIN_RUNTIME = 1e-3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runtimes (
+    image TEXT NOT NULL,
+    command TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runtimes_command ON runtimes (image, command);
+"""
+
+
+def command_line(command) -> str:
+    """
+    :param command: SimJob.command, a string, a list of arguments or None
+    :return: the command as a single string
+    """
+    if command is None:
+        return ''
+    if isinstance(command, str):
+        return command
+    return ' '.join(str(argument) for argument in command)
+
+
+def command_parameters(command) -> dict:
+    """
+    Extracts the numeric parameters of a command, e.g. '-g 10 -i 30 -o /mnt/data' -> {'-g': 10.0, '-i': 30.0}
+    :param command: SimJob.command, a string, a list of arguments or None
+    :return: dict of option to value
+    """
+    try:
+        arguments = shlex.split(command) if isinstance(command, str) else [str(a) for a in command or []]
+    except ValueError:
+        arguments = command.split()
+    parameters = {}
+    for option, value in zip(arguments, arguments[1:] + ['']):
+        if option.startswith('-') and '=' in option:
+            option, value = option.split('=', 1)
+        if not option.startswith('-') or _is_number(option):
+            continue
+        try:
+            parameters[option] = float(value)
+        except ValueError:
+            continue
+    return parameters
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _solve(matrix, vector):
+    """
+    Solves a small linear system by Gaussian elimination with partial pivoting
+    :return: solution as list
+    """
+    size = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(rows[row][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        if rows[column][column] == 0:
+            continue
+        for row in range(column + 1, size):
+            factor = rows[row][column] / rows[column][column]
+            for k in range(column, size + 1):
+                rows[row][k] -= factor * rows[column][k]
+    solution = [0.0] * size
+    for row in reversed(range(size)):
+        if rows[row][row] != 0:
+            solution[row] = (rows[row][size] - sum(rows[row][k] * solution[k]
+                                                   for k in range(row + 1, size))) / rows[row][row]
+    return solution
+
+
+class RuntimeModel():
+    def __init__(self, runtimes: dict) -> None:
+        """
+        Runtime predictions of one image
+        :param runtimes: dict of command line to the list of its recorded runtimes in seconds, oldest first
+        """
+        self.exact = dict((command, statistics.median(seconds)) for command, seconds in runtimes.items())
+        self.fallback = statistics.median(self.exact.values()) if self.exact else None
+        self.options = []
+        self.coefficients = []
+        self.intercept = None
+        self._fit()
+
+    @staticmethod
+    def _feature(value: float) -> float:
+        return math.log1p(abs(value))
+
+    def _fit(self) -> None:
+        """
+        Fits log(runtime) = intercept + sum(coefficient * log(1 + |value|)) over the options of the recorded commands.
+        A small ridge term keeps options, which never changed, at a coefficient of zero.
+        """
+        if len(self.exact) < 3:
+            return
+        samples = [(command_parameters(command), math.log(max(seconds, _MIN_RUNTIME)))
+                   for command, seconds in self.exact.items()]
+        self.options = sorted(set(itertools.chain.from_iterable(parameters for parameters, _ in samples)))
+        rows = [[self._feature(parameters.get(option, 0.0)) for option in self.options] for parameters, _ in samples]
+        targets = [target for _, target in samples]
+        means = [statistics.mean(column) for column in zip(*rows)] if self.options else []
+        target_mean = statistics.mean(targets)
+        centered = [[value - mean for value, mean in zip(row, means)] for row in rows]
+        normal = [[sum(row[i] * row[j] for row in centered) for j in range(len(self.options))]
+                  for i in range(len(self.options))]
+        ridge = 1e-6 * max([normal[i][i] for i in range(len(self.options))] + [1.0])
+        for i in range(len(self.options)):
+            normal[i][i] += ridge
+        right = [sum(row[i] * (target - target_mean) for row, target in zip(centered, targets))
+                 for i in range(len(self.options))]
+        self.coefficients = _solve(normal, right)
+        self.intercept = target_mean - sum(c * mean for c, mean in zip(self.coefficients, means))
+
+    def predict(self, command, fallback: bool = True):
+        """
+        :param command: SimJob.command
+        :param fallback: predict the median runtime of the image, if neither the command nor a fitted model is known
+        :return: predicted runtime in seconds, None without any history of the image
+        """
+        line = command_line(command)
+        if line in self.exact:
+            return self.exact[line]
+        if self.intercept is None:
+            return self.fallback if fallback else None
+        parameters = command_parameters(command)
+        return math.exp(self.intercept + sum(c * self._feature(parameters.get(option, 0.0))
+                                             for option, c in zip(self.options, self.coefficients)))
+
+
+class RuntimeHistory():
+    def __init__(self, path: Path) -> None:
+        """
+        Opens or creates a runtime history, which may be shared between data directories
+        :param path: path of the SQLite database
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+
+    def record(self, image: str, command, seconds: float) -> None:
+        """
+        Records the runtime of a successful run. Only the last runs of each command are kept.
+        :param image: name of the simulation image
+        :param command: the job's command
+        :param seconds: runtime of the container
+        """
+        line = command_line(command)
+        with self._lock, self._connection:
+            self._connection.execute('INSERT INTO runtimes (image, command, seconds, recorded_at) VALUES (?, ?, ?, ?)',
+                                     (image, line, seconds, time.time()))
+            self._connection.execute(
+                'DELETE FROM runtimes WHERE image=? AND command=? AND rowid NOT IN (SELECT rowid FROM runtimes '
+                'WHERE image=? AND command=? ORDER BY recorded_at DESC, rowid DESC LIMIT ?)',
+                (image, line, image, line, _RECENT_RUNS))
+
+    def model(self, image: str) -> RuntimeModel:
+        """
+        :param image: name of the simulation image
+        :return: RuntimeModel fitted to the recent runs of every command of the image
+        """
+        runtimes = collections.defaultdict(lambda: collections.deque(maxlen=_RECENT_RUNS))
+        with self._lock:
+            for command, seconds in self._connection.execute(
+                    'SELECT command, seconds FROM runtimes WHERE image=? ORDER BY recorded_at', (image,)):
+                runtimes[command].append(seconds)
+        return RuntimeModel(dict((command, list(seconds)) for command, seconds in runtimes.items()))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def longest_first(jobs, predict, window: int = None):
+    """
+    Reorders jobs by their predicted runtime, longest first. Jobs without prediction keep their order.
+    :param jobs: iterable of SimJobs
+    :param predict: function returning the predicted runtime of a SimJob or None
+    :param window: number of jobs read ahead and ordered together, None reads all jobs before the first is returned
+    :return: iterator of SimJobs
+    """
+    heap = []
+    counter = itertools.count()
+    for sim_job in jobs:
+        heapq.heappush(heap, (-(predict(sim_job) or 0.0), next(counter), sim_job))
+        if window is not None and len(heap) >= window:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+"""Parameter sweeps for DockerSimManager
+
+A ParameterSweep generates SimJobs lazily from a declarative spec: a command template and named parameters, which
+are combined on a grid, drawn at random or by Latin hypercube sampling. Every point of a sweep is computed from its
+index alone, so a sweep of millions of points starts instantly, needs constant memory and can be split into shards,
+which independent manager processes run without coordination. Points are assigned to shards by the hash of their
+command, so a command, which several points render, is run by one shard only.
+"""
+
+import collections
+import functools
+import hashlib
+import itertools
+import math
+import operator
+import string
+from typing import Iterator
+
+from loguru import logger
+
+from docker_sim_manager import SimJob
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+SWEEP_STRATEGIES = ('grid', 'random', 'lhs')
+_FEISTEL_ROUNDS = 4
+_MASK64 = (1 << 64) - 1
+
+
+class Uniform():
+    def __init__(self, low: float, high: float) -> None:
+        """
+        Continuous uniform distribution on [low, high)
+        """
+        self.low = low
+        self.high = high
+
+    def ppf(self, u: float):
+        """
+        :param u: quantile in [0, 1)
+        :return: value of the distribution at quantile u
+        """
+        return self.low + u * (self.high - self.low)
+
+
+class LogUniform(Uniform):
+    def __init__(self, low: float, high: float) -> None:
+        """
+        Distribution, whose logarithm is uniform on [log(low), log(high)), e.g. for sample counts or step sizes
+        """
+        if low <= 0:
+            raise ValueError('LogUniform requires low > 0')
+        super().__init__(low, high)
+
+    def ppf(self, u: float):
+        return math.exp(math.log(self.low) + u * (math.log(self.high) - math.log(self.low)))
+
+
+class IntUniform(Uniform):
+    def __init__(self, low: int, high: int) -> None:
+        """
+        Discrete uniform distribution on the integers low, ..., high (inclusive)
+        """
+        super().__init__(low, high)
+
+    def ppf(self, u: float):
+        return self.low + min(int(u * (self.high - self.low + 1)), self.high - self.low)
+
+
+class Choice():
+    def __init__(self, values) -> None:
+        """
+        Uniform choice from a list of values
+        """
+        self.values = tuple(values)
+        if not self.values:
+            raise ValueError('Choice requires at least one value')
+
+    def ppf(self, u: float):
+        return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
+
+
+def _hash(*parts) -> int:
+    """
+    :return: stable 64 bit hash of the parts' string representations
+    """
+    digest = hashlib.blake2b(':'.join(str(part) for part in parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _mix(value: int) -> int:
+    """
+    :return: 64 bit integer hash of value (splitmix64 finalizer), much cheaper than a hashlib digest per draw
+    """
+    value = (value + 0x9e3779b97f4a7c15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return value ^ (value >> 31)
+
+
+def _uniform(key: int, index: int) -> float:
+    """
+    :return: quantile in [0, 1), determined by key and index
+    """
+    return (_mix(key ^ _mix(index)) >> 11) * 2.0 ** -53
+
+
+def _permute(index: int, n: int, key: int) -> int:
+    """
+    Maps index to its position in a pseudo-random permutation of range(n), without storing the permutation.
+    A balanced Feistel network permutes the smallest power of four covering n; cycle walking maps values outside
+    of range(n) back into it.
+    :param index: value in range(n)
+    :param n: size of the permutation
+    :param key: 64 bit key selecting the permutation
+    :return: permuted value in range(n)
+    """
+    half_bits = max(1, ((n - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    round_keys = [_mix(key + round_number) for round_number in range(_FEISTEL_ROUNDS)]
+    value = index
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_key in round_keys:
+            left, right = right, left ^ (_mix(round_key ^ right) & mask)
+        value = (left << half_bits) | right
+        if value < n:
+            return value
+
+
+class ParameterSweep():
+    def __init__(self, command: str, parameters: dict, strategy: str = 'grid', samples: int = None, seed: int = 0,
+                 name: str = 'sweep{index}', templates=None, cpus: float = None, memory=None,
+                 deduplicate: bool = True, dedup_window: int = 1 << 20) -> None:
+        """
+        Creates a parameter sweep
+        :param command: command template, formatted with the parameters of each point, e.g. '-i {iterations} -r {seed}'
+        :param parameters: dict of parameter name to values. 'grid' takes lists or ranges, 'random' and 'lhs'
+            take Uniform, LogUniform, IntUniform or Choice; lists and ranges are used as Choice
+        :param strategy: 'grid' (every combination, the last parameter varies fastest), 'random' (samples independent
+            points) or 'lhs' (samples points of a Latin hypercube: each parameter's range is split into samples
+            strata and every stratum is hit exactly once)
+        :param samples: number of points for 'random' and 'lhs'
+        :param seed: seed of 'random' and 'lhs'. All shards of a sweep must use the same seed
+        :param name: template of the job names, formatted with the parameters and the point's index
+        :param templates: templates of every SimJob
+        :param cpus: cpus request of every SimJob
+        :param memory: memory request of every SimJob
+        :param deduplicate: skip points, whose command was already generated. Grid values, which format to the same
+            command, are removed up front. For 'random' and 'lhs' the 64 bit hashes of the last generated commands
+            are kept, per shard
+        :param dedup_window: number of distinct commands remembered for deduplication of 'random' and 'lhs', older
+            ones are forgotten, so memory stays bounded. Repeated commands come from discrete distributions with few
+            values, which fit into the window. None remembers every command
+        """
+        if strategy not in SWEEP_STRATEGIES:
+            raise ValueError(f'Unknown sweep strategy {strategy}, choose one of {SWEEP_STRATEGIES}')
+        if strategy != 'grid' and (samples is None or samples < 0):
+            raise ValueError(f'The {strategy} strategy requires the number of samples')
+        fields = self._fields(command)
+        unused = [parameter for parameter in parameters if parameter not in fields]
+        if unused:
+            raise ValueError(f'Parameters {unused} do not appear in the command, their values would repeat commands')
+        self.command = command
+        self.strategy = strategy
+        self.seed = seed
+        self.name = name
+        self.templates = templates
+        self.cpus = cpus
+        self.memory = memory
+        self.deduplicate = deduplicate
+        self.dedup_window = dedup_window
+        self.duplicates = 0
+        self._names = list(parameters)
+        if strategy == 'grid':
+            self._axes = [self._grid_axis(parameter, values, fields[parameter] if deduplicate else ())
+                          for parameter, values in parameters.items()]
+            self._size = functools.reduce(operator.mul, (len(axis) for axis in self._axes), 1)
+        else:
+            self._distributions = [values if hasattr(values, 'ppf') else Choice(values)
+                                   for values in parameters.values()]
+            self._size = samples
+            # independent keys of the jitter (or the random draws) and of the permutation of every dimension
+            self._keys = [(_hash(seed, 'uniform', dimension), _hash(seed, 'permutation', dimension))
+                          for dimension in range(len(self._distributions))]
+
+    @staticmethod
+    def _fields(command: str) -> dict:
+        """
+        :return: dict of the parameter names in the command template to their format specs
+        """
+        fields = {}
+        for _, field, format_spec, _ in string.Formatter().parse(command):
+            if field:
+                fields.setdefault(field.split('.')[0].split('[')[0], []).append(format_spec or '')
+        return fields
+
+    @staticmethod
+    def _grid_axis(parameter: str, values, format_specs) -> tuple:
+        """
+        :return: values of a grid axis without values, which render the same command as an earlier value
+        """
+        if hasattr(values, 'ppf'):
+            raise ValueError(f'Grid sweeps take lists or ranges, not distributions (parameter {parameter})')
+        if isinstance(values, range) or not format_specs:
+            return values if isinstance(values, range) else tuple(values)
+        axis = {}
+        for value in values:
+            axis.setdefault(tuple(format(value, spec) for spec in format_specs), value)
+        axis = tuple(axis.values())
+        if len(axis) < len(values):
+            logger.warning(f'Skipping {len(values) - len(axis)} duplicate values of parameter {parameter}')
+        return axis
+
+    def __len__(self) -> int:
+        """
+        :return: number of points of the sweep, including duplicates, which are skipped
+        """
+        return self._size
+
+    def point(self, index: int) -> dict:
+        """
+        :param index: index of the point in range(len(self))
+        :return: dict of parameter name to value
+        """
+        if not 0 <= index < self._size:
+            raise IndexError(f'Point {index} is outside of the sweep with {self._size} points')
+        if self.strategy == 'grid':
+            values = []
+            for axis in reversed(self._axes):
+                index, position = divmod(index, len(axis))
+                values.append(axis[position])
+            return dict(zip(self._names, reversed(values)))
+        if self.strategy == 'random':
+            quantiles = [_uniform(uniform_key, index) for uniform_key, _ in self._keys]
+        else:
+            quantiles = [(_permute(index, self._size, permutation_key) + _uniform(uniform_key, index)) / self._size
+                         for uniform_key, permutation_key in self._keys]
+        return dict((name, distribution.ppf(u))
+                    for name, distribution, u in zip(self._names, self._distributions, quantiles))
+
+    def jobs(self, shard: int = 0, num_shards: int = 1) -> Iterator[SimJob]:
+        """
+        Generates the SimJobs of a shard lazily. Shard k of n contains the points, whose command hashes to k modulo
+        n. Every shard computes all points of the sweep, but yields only its own.
+        :param shard: index of the shard in range(num_shards)
+        :param num_shards: number of shards the sweep is split into
+        :return: iterator of SimJobs
+        """
+        if not 0 <= shard < num_shards:
+            raise ValueError(f'Shard {shard} is outside of range({num_shards})')
+        seen = set()
+        # hashes in the order they were seen, to forget the oldest once the window is full
+        window = collections.deque()
+        track = self.deduplicate and self.strategy != 'grid'
+        for index in range(self._size):
+            parameters = self.point(index)
+            command = self.command.format(**parameters)
+            key = _hash(command) if track or num_shards > 1 else None
+            if num_shards > 1 and key % num_shards != shard:
+                continue
+            if track:
+                if key in seen:
+                    self.duplicates += 1
+                    logger.debug(f'Skipping duplicate point {index} of the sweep: {command}')
+                    continue
+                seen.add(key)
+                if self.dedup_window is not None:
+                    window.append(key)
+                    if len(window) > self.dedup_window:
+                        seen.discard(window.popleft())
+            yield SimJob(self.name.format(index=index, **parameters), self.templates, command=command,
+                         cpus=self.cpus, memory=self.memory)
+
+
+def chain_sweeps(*sweeps, shard: int = 0, num_shards: int = 1) -> Iterator[SimJob]:
+    """
+    Generates the SimJobs of several sweeps one after another
+    :param sweeps: ParameterSweeps, their job names must not overlap
+    :param shard: index of the shard in range(num_shards), applied to every sweep
+    :param num_shards: number of shards each sweep is split into
+    :return: iterator of SimJobs
+    """
+    return itertools.chain.from_iterable(sweep.jobs(shard, num_shards) for sweep in sweeps)
@@ -0,0 +1,482 @@
+#!/usr/bin/env python
+"""Per-job telemetry for DockerSimManager
+
+Records the duration of each processing phase of a job and samples the resource usage of its container
+(docker stats). The record of a finished job is appended to a CSV or Parquet table and folded into bounded
+aggregates, which summarize the computation by throughput, job latency, queue wait and manager overhead and are
+optionally exported as Prometheus textfile.
+"""
+
+import collections
+import contextlib
+import csv
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+TELEMETRY_FORMATS = (None, 'csv', 'parquet')
+# queue: submitted until a worker picks the job up, schedule: waiting for a host or resources,
+# run: container start until exit including log capture, logs: writing log output (part of run)
+PHASES = ('queue', 'init', 'schedule', 'create', 'run', 'logs', 'remove', 'cleanup')
+# phases, in which a worker is busy without a container doing work
+OVERHEAD_PHASES = ('init', 'create', 'remove', 'cleanup')
+STATS = ('cpu_seconds', 'memory_peak_bytes', 'block_read_bytes', 'block_write_bytes', 'network_rx_bytes',
+         'network_tx_bytes', 'stats_samples')
+
+COLUMNS = (('name', 'host', 'succeeded', 'exit_code', 'queued_at', 'started_at', 'finished_at', 'latency_seconds')
+           + tuple(f'{phase}_seconds' for phase in PHASES) + STATS)
+# number of job latencies and queue waits kept for the percentiles of the summary
+RESERVOIR_SIZE = 10000
+
+
+def percentile(values, q: float):
+    """
+    :param values: numbers
+    :param q: percentile between 0 and 100
+    :return: linearly interpolated percentile, nan for no values
+    """
+    values = sorted(values)
+    if not values:
+        return math.nan
+    position = (len(values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def container_stats(docker_client, container) -> dict:
+    """
+    Takes a single stats sample of a container without waiting for a second sample
+    :param docker_client: docker client of the container's host
+    :param container: container name or id
+    :return: decoded response of the docker stats endpoint
+    """
+    try:
+        return docker_client.api.stats(container, stream=False, one_shot=True)
+    except TypeError:
+        # docker SDK < 5 does not know one_shot
+        return docker_client.api.stats(container, stream=False)
+
+
+class Reservoir():
+    def __init__(self, size: int = RESERVOIR_SIZE, seed: int = 0) -> None:
+        """
+        Uniform random sample of a stream of values with bounded memory (reservoir sampling). Holds all values as
+        long as there are at most size of them, so percentiles are exact for computations of up to size jobs.
+        :param size: maximum number of kept values
+        :param seed: seed of the sampling
+        """
+        self._size = size
+        self._random = random.Random(seed)
+        self.count = 0
+        self.values = []
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if len(self.values) < self._size:
+            self.values.append(value)
+            return
+        index = self._random.randrange(self.count)
+        if index < self._size:
+            self.values[index] = value
+
+
+class TelemetryTable():
+    def __init__(self, path: Path, file_format: str = 'csv', batch_size: int = 1000) -> None:
+        """
+        Telemetry table, which is written row by row while the computation runs
+        :param path: output file
+        :param file_format: 'csv' or 'parquet' (requires pyarrow)
+        :param batch_size: rows per Parquet row group, buffered until the group is written
+        """
+        self.path = Path(path)
+        self.rows = 0
+        self._file_format = file_format
+        self._batch_size = batch_size
+        self._batch = []
+        if file_format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("parquet telemetry requires the pyarrow package: pip install pyarrow")
+            self._pyarrow = pyarrow
+            types = {'name': pyarrow.string(), 'host': pyarrow.string(), 'succeeded': pyarrow.bool_(),
+                     'exit_code': pyarrow.int64(), 'cpu_seconds': pyarrow.float64()}
+            types.update((column, pyarrow.int64()) for column in STATS if column not in types)
+            self._schema = pyarrow.schema([(column, types.get(column, pyarrow.float64())) for column in COLUMNS])
+            self._writer = pyarrow.parquet.ParquetWriter(str(self.path), self._schema)
+        else:
+            self._file = open(self.path, 'w', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+            self._writer.writeheader()
+
+    def write(self, row: dict) -> None:
+        """
+        :param row: JobTelemetry.row() of a finished job
+        """
+        self.rows += 1
+        if self._file_format != 'parquet':
+            self._writer.writerow(row)
+            return
+        self._batch.append(row)
+        if len(self._batch) >= self._batch_size:
+            self._write_batch()
+
+    def _write_batch(self) -> None:
+        columns = dict((column, [row[column] for row in self._batch]) for column in COLUMNS)
+        self._writer.write_table(self._pyarrow.Table.from_pydict(columns, schema=self._schema))
+        self._batch = []
+
+    def close(self) -> None:
+        if self._file_format == 'parquet':
+            if self._batch:
+                self._write_batch()
+            self._writer.close()
+        else:
+            self._file.close()
+
+
+class JobTelemetry():
+    def __init__(self, name: str, sampler=None) -> None:
+        """
+        Telemetry of a single job
+        :param name: the job's sim_name
+        :param sampler: StatsSampler of the computation, None to skip container stats
+        """
+        self.name = name
+        self.host = None
+        self.exit_code = None
+        self.succeeded = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.phases = collections.OrderedDict((phase, 0.0) for phase in PHASES)
+        self.stats = dict.fromkeys(STATS, 0)
+        self._sampler = sampler
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Adds the duration of the with block to a phase
+        :param name: one of PHASES
+        """
+        tic = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.monotonic() - tic
+
+    def start(self) -> None:
+        """
+        Marks the start of processing by a worker
+        """
+        self.started_at = time.time()
+        self.phases['queue'] = self.started_at - self.queued_at
+
+    def finish(self, exit_code, succeeded: bool) -> None:
+        self.exit_code = exit_code
+        self.succeeded = succeeded
+        self.finished_at = time.time()
+
+    def container_started(self, stats) -> None:
+        """
+        Starts sampling the stats of the job's container
+        :param stats: function returning a stats sample of the container, e.g. calling container_stats
+        """
+        if self._sampler is not None:
+            self._sampler.track(self, stats)
+
+    def container_stopped(self) -> None:
+        if self._sampler is not None:
+            self._sampler.untrack(self)
+
+    def add_stats(self, stats: dict) -> None:
+        """
+        Updates the resource usage from a docker stats sample. Counters are cumulative, so the maximum is kept.
+        :param stats: decoded response of the docker stats endpoint
+        """
+        cpu = stats.get('cpu_stats', {}).get('cpu_usage', {}).get('total_usage')
+        memory = stats.get('memory_stats', {})
+        blkio = stats.get('blkio_stats', {}).get('io_service_bytes_recursive') or []
+        networks = (stats.get('networks') or {}).values()
+        values = {
+            'cpu_seconds': (cpu or 0) / 1e9,
+            'memory_peak_bytes': max(memory.get('max_usage', 0), memory.get('usage', 0)),
+            'block_read_bytes': sum(entry.get('value', 0) for entry in blkio if entry.get('op', '').lower() == 'read'),
+            'block_write_bytes': sum(entry.get('value', 0) for entry in blkio
+                                     if entry.get('op', '').lower() == 'write'),
+            'network_rx_bytes': sum(network.get('rx_bytes', 0) for network in networks),
+            'network_tx_bytes': sum(network.get('tx_bytes', 0) for network in networks),
+        }
+        for key, value in values.items():
+            self.stats[key] = max(self.stats[key], value)
+        self.stats['stats_samples'] += 1
+
+    @property
+    def latency(self) -> float:
+        return self.finished_at - self.queued_at if self.finished_at is not None else math.nan
+
+    @property
+    def overhead(self) -> float:
+        return sum(self.phases[phase] for phase in OVERHEAD_PHASES)
+
+    def row(self) -> dict:
+        """
+        :return: flat record for the telemetry table
+        """
+        row = collections.OrderedDict([
+            ('name', self.name),
+            ('host', None if self.host is None else str(self.host)),
+            ('succeeded', self.succeeded),
+            ('exit_code', self.exit_code),
+            ('queued_at', self.queued_at),
+            ('started_at', self.started_at),
+            ('finished_at', self.finished_at),
+            ('latency_seconds', self.latency),
+        ])
+        row.update((f'{phase}_seconds', seconds) for phase, seconds in self.phases.items())
+        row.update(self.stats)
+        return row
+
+
+class StatsSampler():
+    def __init__(self, interval: float = 1.0) -> None:
+        """
+        Samples docker stats of all tracked containers in one background thread
+        :param interval: seconds between two samples of a container
+        """
+        self._interval = interval
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample, daemon=True, name='telemetry-stats')
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(self._interval + 5)
+
+    def track(self, telemetry: JobTelemetry, stats) -> None:
+        with self._lock:
+            self._tracked[telemetry] = stats
+
+    def untrack(self, telemetry: JobTelemetry) -> None:
+        with self._lock:
+            self._tracked.pop(telemetry, None)
+
+    def _sample(self):
+        while not self._stopped.is_set():
+            tic = time.monotonic()
+            with self._lock:
+                tracked = list(self._tracked.items())
+            for telemetry, stats in tracked:
+                if self._stopped.is_set():
+                    return
+                try:
+                    sample = stats()
+                except Exception as e:
+                    logger.debug(f'Can not sample stats of {telemetry.name}: {e}')
+                    continue
+                with self._lock:
+                    if telemetry in self._tracked:
+                        telemetry.add_stats(sample)
+            self._stopped.wait(max(0.0, self._interval - (time.monotonic() - tic)))
+
+
+class Telemetry():
+    def __init__(self, stats_interval: float = 1.0, table_path: Path = None, table_format: str = 'csv') -> None:
+        """
+        Collects the telemetry of all jobs of a computation. Only jobs in flight are held, the record of a finished
+        job is written to the table and folded into the summary's aggregates.
+        :param stats_interval: seconds between two stats samples of a container, None to disable sampling
+        :param table_path: telemetry table with one row per finished job, created with the first row,
+            None to write no table
+        :param table_format: 'csv' or 'parquet' (requires pyarrow)
+        """
+        self._sampler = StatsSampler(stats_interval) if stats_interval is not None else None
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.finished_at = None
+        self.table_path = table_path
+        self._table_format = table_format
+        self._table = None
+        # JobTelemetry of the jobs in flight, by sim_name
+        self._open = {}
+        self._jobs = 0
+        self._succeeded = 0
+        self._queue_wait_sum = 0.0
+        self._overhead_sum = 0.0
+        self._busy_sum = 0.0
+        self._phase_sums = dict.fromkeys(PHASES, 0.0)
+        self._latencies = Reservoir()
+        self._queue_waits = Reservoir()
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        if self._sampler is not None:
+            self._sampler.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling, accounts finished jobs, which were not completed yet, and closes the table
+        """
+        self.finished_at = time.time()
+        if self._sampler is not None:
+            self._sampler.stop()
+        with self._lock:
+            for name in list(self._open):
+                for telemetry in self._open.pop(name):
+                    if telemetry.finished_at is not None:
+                        self._account(telemetry)
+            if self._table is not None:
+                try:
+                    self._table.close()
+                except OSError as e:
+                    logger.warning(f'Can not write telemetry: {e}')
+                self._table = None
+
+    def job(self, name: str) -> JobTelemetry:
+        """
+        Creates the telemetry of a job, which is submitted now
+        :param name: the job's sim_name
+        :return: JobTelemetry
+        """
+        telemetry = JobTelemetry(name, sampler=self._sampler)
+        with self._lock:
+            self._open.setdefault(name, []).append(telemetry)
+        return telemetry
+
+    def complete(self, name: str) -> None:
+        """
+        Accounts a job, whose result is final, and releases its telemetry. A job killed in favour of its speculative
+        copy is finished twice, so jobs are accounted when their result is handed out instead of in finish.
+        :param name: the job's sim_name, jobs without telemetry are ignored
+        """
+        with self._lock:
+            pending = self._open.get(name)
+            if not pending:
+                return
+            telemetry = pending.pop(0)
+            if not pending:
+                del self._open[name]
+            if telemetry.finished_at is not None:
+                self._account(telemetry)
+
+    def _account(self, job: JobTelemetry) -> None:
+        """
+        Folds a finished job into the aggregates and appends its row to the table. Must hold _lock.
+        """
+        self._jobs += 1
+        self._succeeded += 1 if job.succeeded else 0
+        self._queue_wait_sum += job.phases['queue']
+        self._overhead_sum += job.overhead
+        self._busy_sum += job.latency - job.phases['queue'] - job.phases['schedule']
+        for phase, seconds in job.phases.items():
+            self._phase_sums[phase] += seconds
+        self._latencies.add(job.latency)
+        self._queue_waits.add(job.phases['queue'])
+        if self.table_path is None:
+            return
+        try:
+            if self._table is None:
+                self._table = TelemetryTable(self.table_path, self._table_format)
+            self._table.write(job.row())
+        except (OSError, ImportError) as e:
+            logger.warning(f'Can not write telemetry: {e}')
+            self.table_path = None
+
+    def summary(self, max_workers: int) -> dict:
+        """
+        :param max_workers: number of parallel workers of the computation
+        :return: throughput, latency percentiles, queue wait, manager overhead and worker utilization
+        """
+        with self._lock:
+            jobs = self._jobs
+            wall_time = (self.finished_at or time.time()) - self.started_at
+            busy = self._busy_sum
+            return collections.OrderedDict([
+                ('jobs', jobs),
+                ('succeeded', self._succeeded),
+                ('failed', jobs - self._succeeded),
+                ('wall_seconds', wall_time),
+                ('throughput_jobs_per_second', jobs / wall_time if wall_time > 0 else math.nan),
+                ('latency_p50_seconds', percentile(self._latencies.values, 50)),
+                ('latency_p95_seconds', percentile(self._latencies.values, 95)),
+                ('queue_wait_mean_seconds', self._queue_wait_sum / jobs if jobs else math.nan),
+                ('queue_wait_p95_seconds', percentile(self._queue_waits.values, 95)),
+                ('overhead_mean_seconds', self._overhead_sum / jobs if jobs else math.nan),
+                ('overhead_fraction', self._overhead_sum / busy if busy > 0 else math.nan),
+                ('worker_utilization', busy / (wall_time * max_workers) if wall_time > 0 else math.nan),
+            ])
+
+    @staticmethod
+    def format_summary(summary: dict) -> str:
+        return (f"{summary['jobs']} jobs ({summary['failed']} failed) in {summary['wall_seconds']:.1f}s, "
+                f"{summary['throughput_jobs_per_second']:.2f} jobs/s, "
+                f"latency p50 {summary['latency_p50_seconds']:.2f}s p95 {summary['latency_p95_seconds']:.2f}s, "
+                f"queue wait mean {summary['queue_wait_mean_seconds']:.2f}s p95 "
+                f"{summary['queue_wait_p95_seconds']:.2f}s, manager overhead {summary['overhead_mean_seconds']:.3f}s "
+                f"per job ({100 * summary['overhead_fraction']:.1f}% of busy worker time), "
+                f"worker utilization {100 * summary['worker_utilization']:.1f}%")
+
+    def write_prometheus(self, path: Path, summary: dict) -> Path:
+        """
+        Writes the summary and the phase totals in the Prometheus text format, e.g. for the textfile collector of
+        node_exporter. The file is replaced atomically.
+        :param path: output file, should end with .prom
+        :param summary: result of summary()
+        :return: path
+        """
+        with self._lock:
+            phase_sums = dict(self._phase_sums)
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f'# HELP docker_sim_{name} {help_text}')
+            lines.append(f'# TYPE docker_sim_{name} gauge')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f'docker_sim_{name}{{{label_text}}} {value}' if label_text
+                             else f'docker_sim_{name} {value}')
+
+        metric('jobs', 'Jobs processed in the last computation',
+               [({'status': 'succeeded'}, summary['succeeded']), ({'status': 'failed'}, summary['failed'])])
+        metric('throughput_jobs_per_second', 'Finished jobs per second', [({}, summary['throughput_jobs_per_second'])])
+        metric('job_latency_seconds', 'Time from submission until a job finished',
+               [({'quantile': '0.5'}, summary['latency_p50_seconds']),
+                ({'quantile': '0.95'}, summary['latency_p95_seconds'])])
+        metric('queue_wait_seconds', 'Time from submission until a worker picked a job up',
+               [({'quantile': 'mean'}, summary['queue_wait_mean_seconds']),
+                ({'quantile': '0.95'}, summary['queue_wait_p95_seconds'])])
+        metric('manager_overhead_seconds', 'Mean time per job spent in init, create, remove and cleanup',
+               [({}, summary['overhead_mean_seconds'])])
+        metric('worker_utilization_ratio', 'Busy worker time divided by available worker time',
+               [({}, summary['worker_utilization'])])
+        metric('phase_seconds', 'Total time of all jobs per processing phase',
+               [({'phase': phase}, phase_sums[phase]) for phase in PHASES])
+        metric('last_run_timestamp_seconds', 'End of the last computation', [({}, self.finished_at)])
+
+        path = Path(path)
+        with tempfile.NamedTemporaryFile('w', dir=str(path.parent), prefix=f'.{path.name}', delete=False) as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(f.name, str(path))
+        return path
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""Template staging for DockerSimManager
+
+Provides the template files of a SimJob inside its working directory. Instead of copying shared inputs into every
+job directory, templates can be bind mounted read-only, hardlinked or cloned copy-on-write (reflink). Strategies,
+which the file system does not support, fall back to a plain copy.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+from docker.types import Mount
+from loguru import logger
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+TEMPLATE_STAGINGS = ('bind', 'hardlink', 'reflink', 'copy')
+# ioctl request number of FICLONE on Linux (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+# pairs of (source device, destination device), which do not support reflinks
+_no_reflink = set()
+
+
+def _template_entries(templates):
+    """
+    :param templates: file or directory, None for jobs without templates
+    :return: the template file, or the entries of the template directory
+    """
+    if templates is None:
+        return []
+    templates = Path(templates)
+    if templates.is_file():
+        return [templates]
+    return sorted(templates.iterdir())
+
+
+def _reflink(source, destination) -> bool:
+    """
+    Clones a file copy-on-write
+    :return: True if the file system supports reflinks
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    devices = (os.stat(source).st_dev, os.stat(os.path.dirname(destination)).st_dev)
+    if devices in _no_reflink:
+        return False
+    try:
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    except OSError as e:
+        _no_reflink.add(devices)
+        logger.info(f'Reflinks from {source} are not supported, copying templates instead: {e}')
+        return False
+    shutil.copystat(source, destination)
+    return True
+
+
+def _stage_file(source, destination, strategy: str):
+    if strategy == 'hardlink':
+        try:
+            os.link(source, destination)
+            return destination
+        except OSError as e:
+            logger.debug(f'Hardlink of {source} not possible, copying it: {e}')
+    elif strategy == 'reflink' and _reflink(source, destination):
+        return destination
+    return shutil.copy2(source, destination)
+
+
+def stage_templates(templates, working_dir: Path, strategy: str = 'reflink'):
+    """
+    Provides the templates of a job inside its working directory. A template file is staged as
+    working_dir/<file name>, the entries of a template directory as working_dir/<entry name>.
+    With 'bind' only empty mount points are created, the templates are mounted by template_mounts.
+    Staged files may share their storage with the templates ('hardlink'), so they must not be modified in place.
+    :param templates: file or directory, None for jobs without templates
+    :param working_dir: the job's working directory
+    :param strategy: 'bind', 'hardlink', 'reflink' or 'copy'
+    :return: paths of the staged entries, which are removed after the run
+    """
+    if strategy not in TEMPLATE_STAGINGS:
+        raise ValueError(f'Unknown template staging {strategy}, choose one of {TEMPLATE_STAGINGS}')
+    staged = []
+    for entry in _template_entries(templates):
+        destination = working_dir.joinpath(entry.name)
+        if strategy == 'bind':
+            if entry.is_dir():
+                destination.mkdir()
+            else:
+                destination.touch()
+        elif entry.is_dir():
+            shutil.copytree(str(entry), str(destination),
+                            copy_function=lambda source, target: _stage_file(source, target, strategy))
+        else:
+            _stage_file(entry, destination, strategy)
+        staged.append(destination)
+    return staged
+
+
+def template_mounts(templates, target: str = '/mnt/data'):
+    """
+    Read-only bind mounts of the templates of a job for the 'bind' strategy
+    :param templates: file or directory, None for jobs without templates
+    :param target: mount point of the job's working directory inside the container
+    :return: list of docker.types.Mount
+    """
+    return [Mount(target=f'{target}/{entry.name}', source=str(entry.resolve()), type='bind', read_only=True)
+            for entry in _template_entries(templates)]
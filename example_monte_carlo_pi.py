@@ -6,7 +6,7 @@ This example runs multiple monte carlo simulations to estimate pi
 
 from docker_sim_manager import DockerSimManager
 from pathlib import Path
-from docker_sim_manager import SimJob
+from docker_sim_sweep import ParameterSweep
 
 __author__ = "Michael Wittmann"
 __copyright__ = "Copyright 2020, Michael Wittmann"
@@ -28,9 +28,10 @@ if __name__ == '__main__':
                                       1,
                                       output_path)
 
-    # Add 20 simulation jobs to the job queue
-    for i in range(1,20):
-        docker_manager.add_sim_job(SimJob(f'IT{i}',None, command=f'-o /mnt/data -r {i} -i 100'))
+    # Sweep 19 random seeds, the jobs are generated lazily while the computation runs
+    sweep = ParameterSweep('-o /mnt/data -r {random_seed} -i {iterations}',
+                           {'random_seed': range(1, 20), 'iterations': [100]},
+                           name='IT{random_seed}')
 
     # Start computation
-    docker_manager.start_computation()
\ No newline at end of file
+    docker_manager.start_computation(jobs=sweep.jobs())
\ No newline at end of file
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Benchmark of the sampling strategies of MonteCarloPi
+
+Reports the root mean squared error of the pi estimate against the sample count for every sampling strategy,
+averaged over several random seeds, together with the mean runtime per estimate.
+"""
+
+import getopt
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from monte_carlo_pi import MonteCarloPi, SAMPLING_STRATEGIES
+
+__author__ = "Michael Wittmann"
+__copyright__ = "Copyright 2020, Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+
+def benchmark(sample_counts, repetitions: int, output_dir: Path):
+    """
+    Estimate pi repetitions times per strategy and sample count
+    :param sample_counts: list of sample counts
+    :param repetitions: number of random seeds per strategy and sample count
+    :param output_dir: output directory handed to MonteCarloPi
+    :return: list of (strategy, sample count, rmse, mean runtime in s)
+    """
+    results = []
+    for sampling in SAMPLING_STRATEGIES:
+        for iterations in sample_counts:
+            errors = []
+            tic = time.perf_counter()
+            for seed in range(repetitions):
+                simulation = MonteCarloPi(iterations=iterations, random_seed=seed, output_dir=output_dir,
+                                          sampling=sampling)
+                errors.append(simulation.estimate_pi() - math.pi)
+            runtime = (time.perf_counter() - tic) / repetitions
+            results.append((sampling, iterations, float(np.sqrt(np.mean(np.square(errors)))), runtime))
+    return results
+
+
+def main(argv):
+    sample_counts = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+    repetitions: int = 20
+    usage = 'benchmark_sampling.py -n <comma separated sample counts> -r <repetitions>'
+
+    try:
+        opts, args = getopt.getopt(argv, 'hn:r:', ['samples=', 'repetitions='])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit(0)
+
+        if opt in ('-n', '--samples'):
+            sample_counts = [int(n) for n in arg.split(',')]
+
+        if opt in ('-r', '--repetitions'):
+            repetitions = int(arg)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        results = benchmark(sample_counts, repetitions, Path(output_dir))
+
+    print(f'{"sampling":<12}{"samples":>12}{"rmse":>14}{"runtime [ms]":>14}')
+    for sampling, iterations, rmse, runtime in results:
+        print(f'{sampling:<12}{iterations:>12}{rmse:>14.3e}{runtime * 1000:>14.2f}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -6,14 +6,16 @@ https://en.wikipedia.org/wiki/Monte_Carlo_method
 
 """
 
-import random
-import math
 from pathlib import Path
-import matplotlib.pyplot as plt
 import numpy as np
 import time
 import sys
 import getopt
+import json
+import math
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 __author__ = "Michael Wittmann and Maximilian Speicher"
 __copyright__ = "Copyright 2020, Michael Wittmann and Maximilian Speicher"
@@ -24,21 +26,299 @@ __maintainer__ = "Michael Wittmann"
 __email__ = "michael.wittmann@tum.de"
 __status__ = "Example"
 
+# early stopping is not allowed before this many samples, the variance estimate is unreliable below
+MIN_CONVERGENCE_SAMPLES = 1000
+
+SAMPLING_STRATEGIES = ('random', 'antithetic', 'stratified', 'halton', 'sobol')
+PLOT_MODES = ('scatter', 'density')
+
+# direction numbers of the first two Sobol dimensions (32 bit): van der Corput and primitive polynomial x + 1
+_SOBOL_BITS = 32
+_SOBOL_DIRECTIONS = np.zeros((2, _SOBOL_BITS), dtype=np.uint64)
+_SOBOL_DIRECTIONS[0] = [1 << (_SOBOL_BITS - 1 - j) for j in range(_SOBOL_BITS)]
+_SOBOL_DIRECTIONS[1, 0] = 1 << (_SOBOL_BITS - 1)
+for _j in range(1, _SOBOL_BITS):
+    _SOBOL_DIRECTIONS[1, _j] = _SOBOL_DIRECTIONS[1, _j - 1] ^ (_SOBOL_DIRECTIONS[1, _j - 1] >> np.uint64(1))
+
+
+def _bernoulli_moments(n: int, n_inside: int):
+    """
+    Mean and sum of squared deviations of the per-sample estimates 4 * [x^2 + y^2 < 1]
+    :param n: number of samples
+    :param n_inside: number of samples inside the circle
+    :return: (n, mean, m2)
+    """
+    return n, 4.0 * n_inside / n, 16.0 * n_inside * (n - n_inside) / n
+
+
+class RunningStats():
+
+    def __init__(self) -> None:
+        """
+        Online mean and variance of per-sample estimates. Batches are merged with the parallel update
+        of Chan et al., so no sample has to be kept in memory.
+        """
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def merge(self, n: int, mean: float, m2: float) -> None:
+        """
+        Merge the moments of a batch into the running statistics
+        :param n: number of samples in the batch
+        :param mean: mean of the batch
+        :param m2: sum of squared deviations from the batch mean
+        """
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+
+    @property
+    def standard_error(self) -> float:
+        """
+        :return: standard error of the mean, inf if less than two samples were merged
+        """
+        if self.n < 2:
+            return math.inf
+        return math.sqrt(self.m2 / (self.n - 1) / self.n)
+
+
+class Reservoir():
+
+    def __init__(self, size: int, rng) -> None:
+        """
+        Uniform random sample of fixed size from a stream of points (reservoir sampling, algorithm R)
+        :param size: maximum number of points kept
+        :param rng: numpy random Generator used for the replacement decisions
+        """
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.points = np.empty((0, 2))
+
+    def add(self, points: np.ndarray) -> None:
+        """
+        Offer a chunk of points to the reservoir. The i-th point of the stream replaces a random slot
+        with probability size / (i + 1), vectorized over the chunk.
+        :param points: (n, 2) array of points
+        """
+        n = len(points)
+        fill = min(max(self.size - self.seen, 0), n)
+        if fill:
+            self.points = np.concatenate((self.points, points[:fill]))
+        if n > fill and self.size > 0:
+            slots = self.rng.integers(0, self.seen + fill + np.arange(1, n - fill + 1))
+            hit = slots < self.size
+            self.points[slots[hit]] = points[fill:][hit]
+        self.seen += n
+
+
+def _merge_reservoirs(samples, populations, size: int, rng) -> np.ndarray:
+    """
+    Merge uniform samples of disjoint populations into one uniform sample of their union
+    :param samples: list of (k_i, 2) arrays, uniform samples without replacement of each population
+    :param populations: size of each population
+    :param size: maximum size of the merged sample
+    :param rng: numpy random Generator
+    :return: (min(size, sum(populations)), 2) array of points
+    """
+    total = int(sum(populations))
+    if total == 0 or size == 0:
+        return np.empty((0, 2))
+    counts = rng.multivariate_hypergeometric(np.asarray(populations, dtype=np.int64), min(size, total))
+    return np.concatenate([sample[rng.choice(len(sample), count, replace=False)]
+                           for sample, count in zip(samples, counts)])
+
+
+def _sobol(start_index: int, n: int, scramble) -> np.ndarray:
+    """
+    Points start_index ... start_index + n - 1 of the 2D Sobol sequence, scrambled by a random digital shift
+    :param start_index: index of the first point
+    :param n: number of points
+    :param scramble: one 32 bit integer per dimension, xor-ed to all points
+    :return: (n, 2) array of points in [0, 1)
+    """
+    if start_index + n > 1 << _SOBOL_BITS:
+        raise ValueError(f'Sobol sampling supports at most 2^{_SOBOL_BITS} points')
+    index = np.arange(start_index, start_index + n, dtype=np.uint64)
+    points = np.zeros((n, 2), dtype=np.uint64)
+    for j in range(min(int(start_index + n).bit_length(), _SOBOL_BITS)):
+        bit = (index >> np.uint64(j)) & np.uint64(1)
+        points ^= bit[:, None] * _SOBOL_DIRECTIONS[:, j]
+    points ^= np.asarray(scramble, dtype=np.uint64)
+    return points.astype(np.float64) / float(1 << _SOBOL_BITS)
+
+
+def _halton(start_index: int, n: int, scramble) -> np.ndarray:
+    """
+    Points start_index ... start_index + n - 1 of the 2D Halton sequence (bases 2 and 3),
+    scrambled by a random (Cranley-Patterson) shift modulo 1
+    :param start_index: index of the first point
+    :param n: number of points
+    :param scramble: shift in [0, 1) per dimension
+    :return: (n, 2) array of points in [0, 1)
+    """
+    points = np.zeros((n, 2))
+    for dim, base in enumerate((2, 3)):
+        index = np.arange(start_index, start_index + n, dtype=np.int64)
+        factor = 1.0 / base
+        while index.any():
+            points[:, dim] += (index % base) * factor
+            index //= base
+            factor /= base
+    points += scramble
+    return points % 1.0
+
+
+def _stratified(rng, n: int) -> np.ndarray:
+    """
+    One jittered point per cell of a k x k grid with k = floor(sqrt(n)), the remaining n - k^2 points are uniform
+    :param rng: numpy random Generator
+    :param n: number of points
+    :return: (n, 2) array of points in [0, 1)
+    """
+    k = math.isqrt(n)
+    cells = np.arange(k * k)
+    grid = (np.stack((cells // k, cells % k), axis=1) + rng.random((k * k, 2))) / k
+    return np.concatenate((grid, rng.random((n - k * k, 2))))
+
+
+def _draw_points(rng, sampling: str, start_index: int, n: int, scramble) -> np.ndarray:
+    """
+    Draw n points of the given sampling strategy
+    :param rng: numpy random Generator
+    :param sampling: one of SAMPLING_STRATEGIES
+    :param start_index: index of the first point within the (quasi-random) sequence
+    :param n: number of points
+    :param scramble: scrambling of the quasi-random sequences, shared by all shards
+    :return: (n, 2) array of points in [0, 1). Antithetic pairs are (points[i], points[n // 2 + i]).
+    """
+    if sampling == 'antithetic':
+        half = rng.random((n // 2, 2))
+        return np.concatenate((half, 1.0 - half, rng.random((n % 2, 2))))
+    if sampling == 'stratified':
+        return _stratified(rng, n)
+    if sampling == 'halton':
+        return _halton(start_index, n, scramble)
+    if sampling == 'sobol':
+        return _sobol(start_index, n, scramble)
+    return rng.random((n, 2))
+
+
+def _sample_shard(seed, start_index: int, iterations: int, chunk_size: int, plot_samples: int,
+                  sampling: str = 'random', scramble=None, density_bins: int = 0):
+    """
+    Draw and classify iterations samples from an independent random stream.
+    Module level function, so it can be dispatched to a process pool.
+    :param seed: seed or numpy.random.SeedSequence of this shard's random stream
+    :param start_index: index of the shard's first sample within the quasi-random sequences
+    :param iterations: number of samples
+    :param chunk_size: number of samples drawn and classified at once
+    :param plot_samples: size of the uniform reservoir sample kept per class (inside/outside) for plotting
+    :param sampling: one of SAMPLING_STRATEGIES
+    :param scramble: scrambling of the quasi-random sequences, shared by all shards
+    :param density_bins: if > 0, all samples are counted in a density_bins x density_bins histogram
+    :return: (number of points inside, (n, mean, m2) of the per-sample estimates, sampled points inside,
+              sampled points outside, histogram or None)
+    """
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_sequence)
+    reservoir_rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    n_inside = 0
+    stats = RunningStats()
+    reservoir_inside = Reservoir(plot_samples, reservoir_rng)
+    reservoir_outside = Reservoir(plot_samples, reservoir_rng)
+    histogram = np.zeros(density_bins * density_bins, dtype=np.int64) if density_bins > 0 else None
+
+    remaining = iterations
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        points = _draw_points(rng, sampling, start_index + iterations - remaining, n, scramble)
+        inside = np.einsum('ij,ij->i', points, points) < 1.0
+        n_in = int(np.count_nonzero(inside))
+        n_inside += n_in
+        if sampling == 'antithetic':
+            # pairs are the independent observations, their mean estimate is 2 * (inside_a + inside_b)
+            half = n // 2
+            values = np.concatenate((2.0 * (inside[:half].astype(np.float64) + inside[half:2 * half]),
+                                     4.0 * inside[2 * half:]))
+            stats.merge(len(values), float(values.mean()), float(((values - values.mean()) ** 2).sum()))
+        else:
+            stats.merge(*_bernoulli_moments(n, n_in))
+
+        if plot_samples > 0:
+            reservoir_inside.add(points[inside])
+            reservoir_outside.add(points[~inside])
+        if histogram is not None:
+            cells = np.minimum((points * density_bins).astype(np.int64), density_bins - 1)
+            histogram += np.bincount(cells[:, 1] * density_bins + cells[:, 0], minlength=density_bins ** 2)
+        remaining -= n
+
+    if histogram is not None:
+        histogram = histogram.reshape(density_bins, density_bins)
+    return n_inside, (stats.n, stats.mean, stats.m2), reservoir_inside.points, reservoir_outside.points, histogram
+
 
 class MonteCarloPi():
 
-    def __init__(self, iterations: int = 10000, random_seed: int = None, output_dir:Path = 'output') -> None:
+    def __init__(self, iterations: int = 10000, random_seed: int = None, output_dir:Path = 'output',
+                 chunk_size: int = 1_000_000, plot_samples: int = 10000, workers: int = 1,
+                 target_error: float = None, target_half_width: float = None, confidence: float = 0.95,
+                 max_iterations: int = None, sampling: str = 'random', plot_mode: str = 'scatter',
+                 density_bins: int = 200) -> None:
         """
         New instance of MonteCarloPI
         :param iterations: number of samples
         :param random_seed: random seed to be used for sampling
         :param output_dir: output directory for generated plots
+        :param chunk_size: number of samples drawn and classified at once, bounds the memory footprint
+        :param plot_samples: size of the uniform reservoir sample of points kept per class (inside/outside)
+                             for the scatter plot. Set to 0 if no plot is needed.
+        :param workers: number of processes the iterations are split across
+        :param target_error: stop as soon as the standard error of the estimate drops below this value
+        :param target_half_width: stop as soon as the confidence interval's half-width drops below this value
+        :param confidence: confidence level of the reported (and targeted) half-width
+        :param max_iterations: sample budget if a target is given, unbounded if None. iterations is ignored then.
+        :param sampling: sampling strategy, one of SAMPLING_STRATEGIES. 'antithetic' draws pairs (u, 1 - u),
+                         'stratified' one jittered point per grid cell, 'halton' and 'sobol' scrambled
+                         low-discrepancy sequences. For stratified and quasi-random sampling the reported
+                         standard error assumes independent samples and is conservative.
+        :param plot_mode: one of PLOT_MODES. 'scatter' plots the reservoir samples, 'density' a 2D histogram
+                          of all samples.
+        :param density_bins: number of histogram bins per axis for plot_mode 'density'
         """
+        if sampling not in SAMPLING_STRATEGIES:
+            raise ValueError(f'Unknown sampling strategy {sampling}, choose one of {SAMPLING_STRATEGIES}')
+        if plot_mode not in PLOT_MODES:
+            raise ValueError(f'Unknown plot mode {plot_mode}, choose one of {PLOT_MODES}')
         self.random_seed = random_seed
         self.iterations = iterations
-        self.points_inside = []
-        self.points_outside = []
+        self.chunk_size = chunk_size
+        self.plot_samples = plot_samples
+        self.workers = workers
+        self.target_error = target_error
+        self.target_half_width = target_half_width
+        self.confidence = confidence
+        self.max_iterations = max_iterations
+        self.sampling = sampling
+        self.plot_mode = plot_mode
+        self.density_bins = density_bins
+        self.density = None
+        self.points_inside = np.empty((0, 2))
+        self.points_outside = np.empty((0, 2))
+        self.n_inside = 0
+        self.n_outside = 0
+        self.n_samples = 0
         self.pi_estimate = None
+        self.standard_error = None
+        self.half_width = None
+        self.converged = None
+        self.runtime = None
+        self.output_files = []
         self.output_dir = output_dir
 
         if not output_dir.exists():
@@ -55,62 +335,270 @@ class MonteCarloPi():
         y = np.sqrt(radius ** 2 - x ** 2)
         return y
 
+    def _scramble(self, root_seed: np.random.SeedSequence):
+        """
+        Scrambling of the quasi-random sequences. Derived from random_seed and shared by all shards,
+        so the shards sample disjoint parts of the same sequence.
+        :param root_seed: SeedSequence of random_seed
+        :return: digital shift (sobol), random shift (halton) or None
+        """
+        if self.sampling == 'sobol':
+            return root_seed.generate_state(2, dtype=np.uint32)
+        if self.sampling == 'halton':
+            return (root_seed.generate_state(2, dtype=np.uint64) >> np.uint64(11)) * 2.0 ** -53
+        return None
+
+    def _map_shards(self, executor, seeds, start_indices, shard_sizes, scramble):
+        """
+        Sample shards either in this process or in the given process pool.
+        :param executor: ProcessPoolExecutor or None
+        :param seeds: seed of each shard
+        :param start_indices: index of each shard's first sample
+        :param shard_sizes: number of samples of each shard
+        :param scramble: scrambling of the quasi-random sequences
+        :return: iterator over the shard results, in order of seeds
+        """
+        args = (_sample_shard, seeds, start_indices, shard_sizes, repeat(self.chunk_size), repeat(self.plot_samples),
+                repeat(self.sampling), repeat(scramble),
+                repeat(self.density_bins if self.plot_mode == 'density' else 0))
+        if executor is None:
+            return map(*args)
+        return executor.map(*args)
+
+    def _target_reached(self, stats: RunningStats) -> bool:
+        """
+        :param stats: running statistics of the current estimate
+        :return: True if the requested standard error or half-width is reached
+        """
+        if stats.n < MIN_CONVERGENCE_SAMPLES:
+            return False
+        if self.target_error is not None and stats.standard_error > self.target_error:
+            return False
+        if self.target_half_width is not None and self._z * stats.standard_error > self.target_half_width:
+            return False
+        return True
+
+    @property
+    def _z(self) -> float:
+        return NormalDist().inv_cdf((1.0 + self.confidence) / 2.0)
+
     def estimate_pi(self) -> float:
         """
         Estimate pi, with monte carlo method.
         https://en.wikipedia.org/wiki/Monte_Carlo_method
+        Samples are generated and classified in chunks of self.chunk_size, only running counts and a
+        bounded number of points for plotting are kept. The result does not depend on the chunk size.
+        With workers > 1 the iterations are split into shards, each drawing from an independent stream
+        spawned from random_seed. The result is reproducible for a given (random_seed, workers, iterations).
+        If target_error or target_half_width is set, see _estimate_pi_until_converged.
         :return: Estimate of pi
         """
-        self.points_inside = []
-        self.points_outside = []
-        random.seed(self.random_seed)
-
-        for i in range(0, self.iterations):
-            point = (random.random(), random.random())
-            if (math.sqrt(point[0] ** 2 + point[1] ** 2)) < 1.0:
-                self.points_inside.append(point)
+        tic = time.perf_counter()
+        root_seed = np.random.SeedSequence(self.random_seed)
+        scramble = self._scramble(root_seed)
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            if self.target_error is None and self.target_half_width is None:
+                self._estimate_pi_fixed(executor, root_seed, scramble)
             else:
-                self.points_outside.append(point)
+                self._estimate_pi_until_converged(executor, root_seed, scramble)
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
-        self.pi_estimate = (float(len(self.points_inside)) / float(self.iterations)) * 4.0
+        self.n_outside = self.n_samples - self.n_inside
+        self.half_width = self._z * self.standard_error
+        self.runtime = time.perf_counter() - tic
         return self.pi_estimate
 
-    def plot(self, path=None):
+    def _estimate_pi_fixed(self, executor, root_seed: np.random.SeedSequence, scramble) -> None:
+        """
+        Sample exactly self.iterations points, split into one shard per worker
+        :param executor: ProcessPoolExecutor or None
+        :param root_seed: SeedSequence of random_seed
+        :param scramble: scrambling of the quasi-random sequences
+        """
+        if executor is not None:
+            seeds = root_seed.spawn(self.workers)
+            shard_sizes = [self.iterations // self.workers + (1 if i < self.iterations % self.workers else 0)
+                           for i in range(self.workers)]
+        else:
+            seeds = [self.random_seed]
+            shard_sizes = [self.iterations]
+        start_indices = np.cumsum([0] + shard_sizes[:-1]).tolist()
+        shards = list(self._map_shards(executor, seeds, start_indices, shard_sizes, scramble))
+
+        stats = RunningStats()
+        for shard in shards:
+            stats.merge(*shard[1])
+        self.n_samples = self.iterations
+        self.n_inside = sum(shard[0] for shard in shards)
+        merge_rng = np.random.default_rng(root_seed.generate_state(4))
+        self.points_inside = _merge_reservoirs([shard[2] for shard in shards], [shard[0] for shard in shards],
+                                               self.plot_samples, merge_rng)
+        self.points_outside = _merge_reservoirs([shard[3] for shard in shards],
+                                                [size - shard[0] for size, shard in zip(shard_sizes, shards)],
+                                                self.plot_samples, merge_rng)
+        if self.plot_mode == 'density':
+            self.density = sum(shard[4] for shard in shards)
+        self.pi_estimate = (float(self.n_inside) / float(self.iterations)) * 4.0
+        self.standard_error = stats.standard_error
+
+    def _estimate_pi_until_converged(self, executor, root_seed: np.random.SeedSequence, scramble) -> None:
+        """
+        Sample batches of self.chunk_size points until the target error is reached or max_iterations is spent.
+        Batch k draws from the k-th stream spawned from random_seed and batches are merged in order, so the
+        result does not depend on the number of workers. Each round samples one batch per worker.
+        :param executor: ProcessPoolExecutor or None
+        :param root_seed: SeedSequence of random_seed
+        :param scramble: scrambling of the quasi-random sequences
+        """
+        stats = RunningStats()
+        self.n_inside = 0
+        self.n_samples = 0
+        self.converged = False
+        merge_rng = np.random.default_rng(root_seed.generate_state(4))
+        self.points_inside = np.empty((0, 2))
+        self.points_outside = np.empty((0, 2))
+        self.density = None
+
+        while not self.converged:
+            budget = math.inf if self.max_iterations is None else self.max_iterations - self.n_samples
+            batch_sizes = []
+            while len(batch_sizes) < self.workers and budget > 0:
+                batch_sizes.append(int(min(self.chunk_size, budget)))
+                budget -= batch_sizes[-1]
+            if not batch_sizes:
+                break
+
+            seeds = root_seed.spawn(len(batch_sizes))
+            start_indices = (self.n_samples + np.cumsum([0] + batch_sizes[:-1])).tolist()
+            batches = self._map_shards(executor, seeds, start_indices, batch_sizes, scramble)
+            for n, (n_in, moments, points_in, points_out, histogram) in zip(batch_sizes, batches):
+                self.points_inside = _merge_reservoirs([self.points_inside, points_in], [self.n_inside, n_in],
+                                                       self.plot_samples, merge_rng)
+                self.points_outside = _merge_reservoirs([self.points_outside, points_out],
+                                                        [self.n_samples - self.n_inside, n - n_in],
+                                                        self.plot_samples, merge_rng)
+                if histogram is not None:
+                    self.density = histogram if self.density is None else self.density + histogram
+                stats.merge(*moments)
+                self.n_samples += n
+                self.n_inside += n_in
+                if self._target_reached(stats):
+                    self.converged = True
+                    break
+
+        self.pi_estimate = stats.mean
+        self.standard_error = stats.standard_error
+
+    def result(self) -> dict:
+        """
+        Machine-readable record of the last estimate: parameters, estimate, sample counts, runtime of the estimate
+        in seconds and the plots written so far (relative to the output directory)
+        :return: dict of json serializable values
+        """
+        return {
+            'simulation': 'monte_carlo_pi',
+            'iterations': self.iterations,
+            'max_iterations': self.max_iterations,
+            'target_error': self.target_error,
+            'target_half_width': self.target_half_width,
+            'chunk_size': self.chunk_size,
+            'pi_estimate': self.pi_estimate,
+            'n_samples': self.n_samples,
+            'n_inside': self.n_inside,
+            'standard_error': self.standard_error,
+            'half_width': self.half_width,
+            'confidence': self.confidence,
+            'converged': self.converged,
+            'random_seed': self.random_seed,
+            'workers': self.workers,
+            'sampling': self.sampling,
+            'runtime_seconds': self.runtime,
+            'output_files': self.output_files,
+        }
+
+    def write_result(self, file_name: str = 'result.json') -> Path:
         """
-        Plot img of monte-carlo estimation
+        Write the result of the last estimate as json to the output directory
+        :param file_name: name of the result file
+        :return: path of the written file
+        """
+        result_path = self.output_dir.joinpath(file_name)
+        with open(result_path, 'w') as f:
+            json.dump(self.result(), f, indent=2)
+        return result_path
+
+    def plot(self, path=None, dpi: int = 300) -> Path:
+        """
+        Plot img of monte-carlo estimation. matplotlib is imported on first use and renders with the
+        headless Agg backend, so estimates without plot never pay for it.
         :param path: output directory, uses cwd if None
+        :param dpi: resolution of the saved figure
+        :return: path of the saved figure
         """
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
         x_circle = np.linspace(0, 1, 200)
-        fig, ax = plt.subplots(1, 1, figsize=(5, 5), dpi=300)
-        ax.scatter(*zip(*self.points_outside[:10000]), color='r', alpha=0.5,
-                   label=f'Points outside: $n={len(self.points_outside)}$')
-        ax.scatter(*zip(*self.points_inside[:10000]), color='b', alpha=0.5,
-                   label=f'Points inside: $n={len(self.points_inside)}$')
+        fig, ax = plt.subplots(1, 1, figsize=(5, 5), dpi=dpi)
+        if self.plot_mode == 'density' and self.density is not None:
+            ax.imshow(self.density, origin='lower', extent=(0, 1, 0, 1), cmap='viridis', interpolation='nearest')
+            ax.plot([], [], ' ', label=f'Points outside: $n={self.n_outside}$')
+            ax.plot([], [], ' ', label=f'Points inside: $n={self.n_inside}$')
+        else:
+            ax.scatter(self.points_outside[:, 0], self.points_outside[:, 1], color='r', alpha=0.5,
+                       label=f'Points outside: $n={self.n_outside}$')
+            ax.scatter(self.points_inside[:, 0], self.points_inside[:, 1], color='b', alpha=0.5,
+                       label=f'Points inside: $n={self.n_inside}$')
         ax.plot(x_circle, self._f_circle(x_circle), color='black', linestyle='--', linewidth=2, label='circle')
-        ax.set_title(f'Estimate of $\pi={self.pi_estimate:.10f}$\nIterations $n={self.iterations}$')
+        ax.set_title(f'Estimate of $\\pi={self.pi_estimate:.10f}$\nIterations $n={self.n_samples}$')
         ax.set_xlim(0, 1)
         ax.set_ylim(0, 1)
         ax.legend(loc='lower right')
 
-        figure_path = self.output_dir.joinpath(f'pi_estmimate_n{self.iterations}_at{time.time_ns()}.png')
-        plt.savefig(figure_path, dpi=300)
+        figure_path = self.output_dir.joinpath(f'pi_estmimate_n{self.n_samples}_at{time.time_ns()}.png')
+        fig.savefig(figure_path, dpi=dpi)
+        plt.close(fig)
+        self.output_files.append(figure_path.name)
+        return figure_path
 
 
 def main(argv):
     output_folder:Path = Path('img')
     iterations: int = 100000
     random_seed:int = 1
+    workers: int = 1
+    chunk_size: int = 1_000_000
+    target_error: float = None
+    target_half_width: float = None
+    confidence: float = 0.95
+    max_iterations: int = None
+    sampling: str = 'random'
+    plot: bool = True
+    plot_mode: str = 'scatter'
+    dpi: int = 300
+    batch_manifest: Path = None
+    usage = ('monte_carlo_pi.py -o <output_folder> -i <iterations> -r <random_seed> -w <workers> '
+             '-c <chunk_size> -e <target_error> --half_width <target_half_width> --confidence <confidence> '
+             f'-m <max_iterations> -s <{"|".join(SAMPLING_STRATEGIES)}> -p <{"|".join(PLOT_MODES)}> '
+             '--dpi <dpi> --no-plot --batch <manifest>')
 
     try:
-        opts, args = getopt.getopt(argv, 'ho:i:r:',['output_dir=', '--iterations', '--random_seed'])
+        opts, args = getopt.getopt(argv, 'ho:i:r:w:c:e:m:s:p:',
+                                   ['output_dir=', 'iterations=', 'random_seed=', 'workers=', 'chunk_size=',
+                                    'target_error=', 'half_width=', 'confidence=', 'max_iterations=',
+                                    'sampling=', 'plot_mode=', 'dpi=', 'no-plot', 'batch='])
     except getopt.GetoptError:
-        print('monte_carlo_pi.py - o <output_folder> -i <iterations> -r <random_seed>')
+        print(usage)
         sys.exit(2)
 
 
     for opt, arg in opts:
         if opt == '-h':
-            print('monte_carlo_pi.py - o <output_folder> -i <iterations> -r <random_seed>')
+            print(usage)
 
         if opt in ('-o', '--output_dir'):
             output_folder = Path(arg)
@@ -121,15 +609,66 @@ def main(argv):
         if opt in ('-r', '--random_seed'):
             random_seed = int(arg)
 
+        if opt in ('-w', '--workers'):
+            workers = int(arg)
+
+        if opt in ('-c', '--chunk_size'):
+            chunk_size = int(arg)
+
+        if opt in ('-e', '--target_error'):
+            target_error = float(arg)
+
+        if opt == '--half_width':
+            target_half_width = float(arg)
+
+        if opt == '--confidence':
+            confidence = float(arg)
+
+        if opt in ('-m', '--max_iterations'):
+            max_iterations = int(arg)
+
+        if opt in ('-s', '--sampling'):
+            sampling = arg
+
+        if opt in ('-p', '--plot_mode'):
+            plot_mode = arg
+
+        if opt == '--dpi':
+            dpi = int(arg)
+
+        if opt == '--no-plot':
+            plot = False
+
+        if opt == '--batch':
+            batch_manifest = Path(arg)
+
+    if batch_manifest is not None:
+        # shared with DockerSimManager's job fusion, the image ships docker_sim_batch.py next to this script
+        from docker_sim_batch import run_batch
+        # the output directory of each job replaces its -o argument
+        failed = run_batch(batch_manifest, lambda args, output_dir: main(list(args) + ['-o', str(output_dir)]))
+        print(f'Batch finished, {failed} job(s) failed')
+        return
 
-    print(f'Starting Simulation: iteations={iterations}, random_seed={random_seed}')
+    print(f'Starting Simulation: iteations={iterations}, random_seed={random_seed}, workers={workers}, '
+          f'sampling={sampling}')
     tic = time.time()
-    simulation = MonteCarloPi(iterations=iterations, random_seed=random_seed, output_dir = output_folder)
+    simulation = MonteCarloPi(iterations=iterations, random_seed=random_seed, output_dir = output_folder,
+                              workers=workers, chunk_size=chunk_size, target_error=target_error,
+                              target_half_width=target_half_width, confidence=confidence,
+                              max_iterations=max_iterations, sampling=sampling, plot_mode=plot_mode,
+                              plot_samples=10000 if plot and plot_mode == 'scatter' else 0)
     pi_hat = simulation.estimate_pi()
     print(f'Result: pi_hat = {pi_hat:.10f}')
+    print(f'Samples used: n = {simulation.n_samples}, standard error = {simulation.standard_error:.3e}, '
+          f'{confidence:.0%} half-width = {simulation.half_width:.3e}')
+    if simulation.converged is False:
+        print('Warning: sample budget exhausted before the target error was reached')
     toc = time.time()
-    print('Generating plot...')
-    simulation.plot()
+    if plot:
+        print('Generating plot...')
+        simulation.plot(dpi=dpi)
+    simulation.write_result()
     print(f'Simulation finished! ({toc-tic:.5} ms) ')
 
 
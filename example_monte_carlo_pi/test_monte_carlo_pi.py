@@ -4,10 +4,15 @@
 They are mainly used to show the integration of test-cases in a gitHub CI/CD pipeline.
 """
 
+import contextlib
+import io
+import json
+import tempfile
 from pathlib import Path
 from unittest import TestCase
 import math
-from example_monte_carlo_pi.monte_carlo_pi import MonteCarloPi
+import numpy as np
+from example_monte_carlo_pi.monte_carlo_pi import MonteCarloPi, SAMPLING_STRATEGIES, main
 
 
 __author__ = "Michael Wittmann "
@@ -21,16 +26,136 @@ __status__ = "Example"
 
 class TestMonteCarloPi(TestCase):
 
+    def setUp(self):
+        # plots and result records are written to a fresh directory, which is removed after each test
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.output_dir = Path(output_dir.name)
 
     def test_estimate_pi(self):
-        simulation = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=Path('ouput'))
+        simulation = MonteCarloPi(iterations=1000000, random_seed=12345, output_dir=self.output_dir)
         pi_hat = simulation.estimate_pi()
         print(abs(pi_hat/math.pi -1) )
         self.assertTrue(abs(pi_hat/math.pi -1) < 0.001)
 
 
     def test_plot(self):
-        simulation = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=Path('ouput'))
+        simulation = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=self.output_dir)
         simulation.estimate_pi()
         simulation.plot()
 
+
+    def test_estimate_pi_reproducible(self):
+        first = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=self.output_dir).estimate_pi()
+        second = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=self.output_dir).estimate_pi()
+        self.assertEqual(first, second)
+
+    def test_estimate_pi_chunk_size_independent(self):
+        simulation = MonteCarloPi(iterations=100003, random_seed=12345, output_dir=self.output_dir, chunk_size=1000)
+        chunked = simulation.estimate_pi()
+        unchunked = MonteCarloPi(iterations=100003, random_seed=12345, output_dir=self.output_dir).estimate_pi()
+        self.assertEqual(chunked, unchunked)
+        self.assertEqual(simulation.n_inside + simulation.n_outside, 100003)
+
+    def test_plot_samples_bounded(self):
+        simulation = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=self.output_dir,
+                                  chunk_size=1000, plot_samples=500)
+        simulation.estimate_pi()
+        self.assertEqual(len(simulation.points_inside), 500)
+        self.assertEqual(len(simulation.points_outside), 500)
+
+    def test_estimate_pi_workers(self):
+        simulation = MonteCarloPi(iterations=100001, random_seed=12345, output_dir=self.output_dir, workers=3)
+        first = simulation.estimate_pi()
+        second = MonteCarloPi(iterations=100001, random_seed=12345, output_dir=self.output_dir, workers=3).estimate_pi()
+        self.assertEqual(first, second)
+        self.assertEqual(simulation.n_inside + simulation.n_outside, 100001)
+        self.assertTrue(abs(first / math.pi - 1) < 0.01)
+
+    def test_estimate_pi_target_error(self):
+        simulation = MonteCarloPi(random_seed=12345, output_dir=self.output_dir, chunk_size=10000, target_error=0.005)
+        simulation.estimate_pi()
+        self.assertTrue(simulation.converged)
+        self.assertTrue(simulation.standard_error <= 0.005)
+        self.assertEqual(simulation.n_samples % 10000, 0)
+        self.assertTrue(simulation.n_samples < 1000000)
+
+    def test_estimate_pi_target_error_independent_of_workers(self):
+        kwargs = dict(random_seed=12345, output_dir=self.output_dir, chunk_size=10000, target_half_width=0.01)
+        single = MonteCarloPi(**kwargs)
+        multi = MonteCarloPi(workers=3, **kwargs)
+        self.assertEqual(single.estimate_pi(), multi.estimate_pi())
+        self.assertEqual(single.n_samples, multi.n_samples)
+
+    def test_estimate_pi_max_iterations(self):
+        simulation = MonteCarloPi(random_seed=12345, output_dir=self.output_dir, chunk_size=10000,
+                                  target_error=1e-6, max_iterations=25000)
+        simulation.estimate_pi()
+        self.assertFalse(simulation.converged)
+        self.assertEqual(simulation.n_samples, 25000)
+        self.assertEqual(simulation.result()['n_samples'], 25000)
+
+    def test_result_record(self):
+        simulation = MonteCarloPi(iterations=20000, random_seed=12345, output_dir=self.output_dir, plot_samples=100)
+        simulation.estimate_pi()
+        figure_path = simulation.plot(dpi=20)
+        record = json.loads(simulation.write_result().read_text())
+        self.assertEqual(record['simulation'], 'monte_carlo_pi')
+        self.assertEqual((record['iterations'], record['n_samples']), (20000, 20000))
+        self.assertEqual(record['pi_estimate'], simulation.pi_estimate)
+        self.assertGreater(record['runtime_seconds'], 0)
+        self.assertEqual(record['output_files'], [figure_path.name])
+
+    def test_batch_manifest(self):
+        with tempfile.TemporaryDirectory() as batch_dir, contextlib.redirect_stdout(io.StringIO()) as output:
+            manifest = Path(batch_dir).joinpath('manifest.json')
+            manifest.write_text(json.dumps({'jobs': [
+                {'name': f'IT{seed}', 'args': ['-o', '/mnt/data', '-r', str(seed), '-i', '1000', '--no-plot'],
+                 'output': f'job_IT{seed}'} for seed in (1, 2)] + [
+                {'name': 'broken', 'args': ['-i', 'many'], 'output': 'job_broken'}]}))
+            main(['--batch', str(manifest)])
+            for seed in (1, 2):
+                job_dir = Path(batch_dir).joinpath(f'job_IT{seed}')
+                record = json.loads(job_dir.joinpath('result.json').read_text())
+                self.assertEqual((record['random_seed'], record['n_samples']), (seed, 1000))
+                self.assertEqual(json.loads(job_dir.joinpath('exit_status.json').read_text())['exit_code'], 0)
+                self.assertIn('Result: pi_hat', job_dir.joinpath('log.txt').read_text())
+            job_dir = Path(batch_dir).joinpath('job_broken')
+            self.assertEqual(json.loads(job_dir.joinpath('exit_status.json').read_text())['exit_code'], 1)
+            self.assertIn('ValueError', job_dir.joinpath('log.txt').read_text())
+            self.assertIn('1 job(s) failed', output.getvalue())
+
+    def test_estimate_pi_sampling_strategies(self):
+        for sampling in SAMPLING_STRATEGIES:
+            simulation = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=self.output_dir,
+                                      sampling=sampling)
+            pi_hat = simulation.estimate_pi()
+            self.assertTrue(abs(pi_hat / math.pi - 1) < 0.01, sampling)
+            self.assertEqual(simulation.n_inside + simulation.n_outside, 100000)
+
+    def test_estimate_pi_quasi_random_independent_of_workers(self):
+        for sampling in ('halton', 'sobol'):
+            kwargs = dict(iterations=100000, random_seed=12345, output_dir=self.output_dir, sampling=sampling)
+            self.assertEqual(MonteCarloPi(chunk_size=30000, **kwargs).estimate_pi(),
+                             MonteCarloPi(workers=3, **kwargs).estimate_pi())
+
+    def test_unknown_sampling_strategy(self):
+        with self.assertRaises(ValueError):
+            MonteCarloPi(output_dir=self.output_dir, sampling='unknown')
+
+    def test_plot_samples_uniform(self):
+        simulation = MonteCarloPi(iterations=200000, random_seed=12345, output_dir=self.output_dir,
+                                  chunk_size=1000, plot_samples=2000, workers=2)
+        simulation.estimate_pi()
+        self.assertEqual(len(simulation.points_inside), 2000)
+        self.assertEqual(len(simulation.points_outside), 2000)
+        self.assertTrue(abs(simulation.points_outside.mean(axis=0) - 0.78).max() < 0.03)
+        self.assertTrue((np.einsum('ij,ij->i', simulation.points_inside, simulation.points_inside) < 1.0).all())
+
+    def test_plot_density(self):
+        simulation = MonteCarloPi(iterations=100000, random_seed=12345, output_dir=self.output_dir,
+                                  plot_mode='density', density_bins=50, plot_samples=0)
+        simulation.estimate_pi()
+        self.assertEqual(simulation.density.shape, (50, 50))
+        self.assertEqual(simulation.density.sum(), 100000)
+        self.assertTrue(simulation.plot(dpi=50).exists())
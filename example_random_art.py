@@ -6,7 +6,7 @@ This example generates random art in different scales and sizes
 
 from docker_sim_manager import DockerSimManager
 from pathlib import Path
-from docker_sim_manager import SimJob
+from docker_sim_sweep import ParameterSweep, chain_sweeps
 
 __author__ = "Michael Wittmann"
 __copyright__ = "Copyright 2020, Michael Wittmann"
@@ -28,12 +28,11 @@ if __name__ == '__main__':
                                       10,
                                       output_folder)
 
-    # Add 20 simulation jobs to the job queue
-    for i in range(1,10):
-        docker_manager.add_sim_job(SimJob(f'randomArt_size{i}x{i}',None, command=f'-g {i} -i 30 -s 5000 -o /mnt/data -n 50'))
-
-    for i in range(1,10):
-        docker_manager.add_sim_job(SimJob(f'random_Art_invaders_{i}',None, command=f'-g 10 -i {i} -s 5000 -o /mnt/data -n 50'))
+    # Sweep the grid size and the number of invaders, 18 jobs in total
+    sizes = ParameterSweep('-g {grid_size} -i 30 -s 5000 -o /mnt/data -n 50', {'grid_size': range(1, 10)},
+                           name='randomArt_size{grid_size}x{grid_size}')
+    invaders = ParameterSweep('-g 10 -i {invaders} -s 5000 -o /mnt/data -n 50', {'invaders': range(1, 10)},
+                              name='random_Art_invaders_{invaders}')
 
     # Start computation
-    docker_manager.start_computation()
\ No newline at end of file
+    docker_manager.start_computation(jobs=chain_sweeps(sizes, invaders))
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Benchmark of the sprite renderers of sprithering
+
+Compares images per second of the reference renderer (one ImageDraw.rectangle per grid cell) with the
+array-backed renderer and checks that both produce the same pixels for the same seed.
+"""
+
+import getopt
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+import sprithering
+
+__author__ = "Michael Wittmann"
+
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+
+def images_per_second(renderer, size: int, invaders: int, imgSize: int, repetitions: int, seed: int):
+    """
+    Render repetitions images with the given renderer
+    :param renderer: called with size, invaders, imgSize and a random number generator
+    :return: (images per second, pixels of the last image)
+    """
+    rng = np.random.default_rng(seed)
+    tic = time.perf_counter()
+    for _ in range(repetitions):
+        image = renderer(size, invaders, imgSize, rng)
+    return repetitions / (time.perf_counter() - tic), np.asarray(image)
+
+
+def replayed_draw_image(size: int, invaders: int, imgSize: int, rng: np.random.Generator):
+    """
+    Reference renderer, fed with the same random numbers render_image draws from rng
+    :return: PIL Image
+    """
+    draws = sprithering._draw_random_requests(invaders * invaders, size, rng)
+    with mock.patch.object(sprithering, 'random', sprithering.ReplayedRandom(*draws)):
+        return sprithering.draw_image(size, invaders, imgSize)
+
+
+def main(argv):
+    configurations = [(5, 10, 1000), (15, 30, 1000), (15, 30, 5000)]
+    repetitions: int = 3
+    seed: int = 1
+    usage = 'benchmark_renderer.py -n <repetitions> -r <seed>'
+
+    try:
+        opts, args = getopt.getopt(argv, 'hn:r:', ['repetitions=', 'seed='])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit(0)
+
+        if opt in ('-n', '--repetitions'):
+            repetitions = int(arg)
+
+        if opt in ('-r', '--seed'):
+            seed = int(arg)
+
+    print(f'{"grid":>6}{"invaders":>10}{"img_size":>10}{"draw [img/s]":>14}{"array [img/s]":>15}{"speedup":>9}'
+          f'{"equal":>7}')
+    for size, invaders, imgSize in configurations:
+        reference, reference_pixels = images_per_second(replayed_draw_image, size, invaders, imgSize,
+                                                        repetitions, seed)
+        array, array_pixels = images_per_second(sprithering.render_image, size, invaders, imgSize,
+                                                repetitions, seed)
+        equal = np.array_equal(reference_pixels, array_pixels)
+        print(f'{size:>6}{invaders:>10}{imgSize:>10}{reference:>14.2f}{array:>15.2f}{array / reference:>9.2f}'
+              f'{str(equal):>7}')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
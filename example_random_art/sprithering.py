@@ -5,12 +5,20 @@ A detailed blog post on this script can be found under
 https://www.freecodecamp.org/news/how-to-create-generative-art-in-less-than-100-lines-of-code-d37f379859f/
 """
 
+import collections
 import getopt
+import io
+import json
+import os
+import queue
 import random
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
 from PIL import Image, ImageDraw
 
 __author__ = "Michael Wittmann and Eric Davidson"
@@ -21,6 +29,7 @@ __email__ = "michael.wittmann@tum.de"
 __status__ = "Example"
 
 
+
 def r():
     return random.randint(0, 255)
 
@@ -29,10 +38,7 @@ def rc():
     return r(), r(), r()
 
 
-listSym = []
-
-
-def create_square(border, draw, randColor, element, size):
+def create_square(border, draw, randColor, element, size, listSym):
     if element == int(size / 2):
         draw.rectangle(border, randColor)
     elif len(listSym) == element + 1:
@@ -46,6 +52,8 @@ def create_invader(border, draw, size):
     x0, y0, x1, y1 = border
     squareSize = (x1 - x0) / size
     randColors = [rc(), rc(), rc(), (0, 0, 0), (0, 0, 0), (0, 0, 0)]
+    # symmetry state of this invader only
+    listSym = []
     i = 1
     for y in range(0, size):
         i *= -1
@@ -55,64 +63,380 @@ def create_invader(border, draw, size):
             topLeftY = y * squareSize + y0
             botRightX = topLeftX + squareSize
             botRightY = topLeftY + squareSize
-            create_square((topLeftX, topLeftY, botRightX, botRightY), draw, random.choice(randColors), element, size)
+            create_square((topLeftX, topLeftY, botRightX, botRightY), draw, random.choice(randColors), element, size,
+                          listSym)
             if element == int(size / 2) or element == 0:
                 i *= -1
                 element += i
 
 
-def main(size:int, invaders:int, imgSize:int, output_path:Path, samples:int):
+def draw_image(size:int, invaders:int, imgSize:int):
+    """
+    Reference renderer, draws every grid cell with a separate ImageDraw.rectangle call
+    :param size: grid size of an invader
+    :param invaders: number of invaders per row and column
+    :param imgSize: edge length of the image in pixels
+    :return: PIL Image
+    """
+    origDimension = imgSize
+    origImage = Image.new('RGB', (origDimension, origDimension))
+    draw = ImageDraw.Draw(origImage)
+    invaderSize = origDimension / invaders
+    padding = invaderSize / size
+    for x in range(0, invaders):
+        for y in range(0, invaders):
+            topLeftX = x * invaderSize + padding / 2
+            topLeftY = y * invaderSize + padding / 2
+            botRightX = topLeftX + invaderSize - padding
+            botRightY = topLeftY + invaderSize - padding
+            create_invader((topLeftX, topLeftY, botRightX, botRightY), draw, size)
+    return origImage
+
+
+def _draw_random_requests(count:int, size:int, rng:np.random.Generator):
+    """
+    Draws the random numbers of count consecutive invaders at once: like create_invader, 3 random colours and a
+    choice from a palette of 6 (the colours and 3 times black) for each of the size * size cells
+    :param count: number of invaders
+    :param size: grid size of an invader
+    :param rng: random number generator
+    :return: (count, 3, 3) array of colours, (count, size * size) array of palette indices
+    """
+    return rng.integers(0, 256, size=(count, 3, 3)), rng.integers(0, 6, size=(count, size * size))
+
+
+class ReplayedRandom():
+    """
+    Stand-in for the random module of draw_image, which hands out given random numbers instead of drawing them.
+    Patched into sprithering, draw_image renders the sprites render_image renders from the same draws.
+    """
+
+    def __init__(self, palettes:np.ndarray, choices:np.ndarray):
+        """
+        :param palettes: (count, 3, 3) array of colours, see _draw_random_requests
+        :param choices: (count, size * size) array of palette indices, see _draw_random_requests
+        """
+        # create_invader draws the 3 colours of an invader, then the choices of its cells, invader by invader
+        self._colors = iter(np.asarray(palettes).reshape(-1).tolist())
+        self._choices = iter(np.asarray(choices).reshape(-1).tolist())
+
+    def randint(self, a:int, b:int) -> int:
+        return next(self._colors)
+
+    def choice(self, seq):
+        return seq[next(self._choices)]
+
+
+_symmetry_programs = {}
+
+
+def _symmetry_program(size:int):
+    """
+    Control flow of the symmetry rule of create_invader/create_square. Every invader starts with an empty
+    symmetry stack, so the rule only depends on the grid size and is replayed once per size.
+    :param size: grid size of an invader
+    :return: int array, per cell the index of the cell whose random colour is shown
+    """
+    if size not in _symmetry_programs:
+        middle = int(size / 2)
+        stack = []
+        sources = np.empty(size * size, dtype=np.intp)
+        i = 1
+        cell = 0
+        for y in range(0, size):
+            i *= -1
+            element = 0
+            for x in range(0, size):
+                if element == middle:
+                    sources[cell] = cell
+                elif len(stack) == element + 1:
+                    sources[cell] = stack.pop()
+                else:
+                    stack.append(cell)
+                    sources[cell] = cell
+                cell += 1
+                if element == middle or element == 0:
+                    i *= -1
+                    element += i
+        _symmetry_programs[size] = sources
+    return _symmetry_programs[size]
+
+
+def invader_colors(size:int, randColors:np.ndarray):
+    """
+    Colours of the invaders' grid cells. Applies the symmetry rule exactly like create_invader,
+    but without drawing.
+    :param size: grid size of an invader
+    :param randColors: (..., size * size, 3) array, the colour random.choice picked for each cell, row by row
+    :return: (..., size * size, 3) array of colours, row by row
+    """
+    return randColors[..., _symmetry_program(size), :]
+
+
+def _cell_lookup(origins, squareSize, size:int, imgSize:int):
+    """
+    Maps every pixel row (or column) to the grid cell painted last onto it by draw_image.
+    Rectangles cover [int(start), int(end)] inclusively and later cells overwrite shared edges,
+    so a pixel belongs to the last cell starting at or before it, if that cell reaches the pixel.
+    :param origins: top left coordinate of each invader along this axis
+    :param squareSize: edge length of a grid cell
+    :param size: grid size of an invader
+    :param imgSize: edge length of the image in pixels
+    :return: int array of length imgSize, invader * size + cell, or -1 for background pixels
+    """
+    starts = np.arange(size) * squareSize + np.asarray(origins)[:, None]
+    ends = (starts + squareSize).ravel().astype(np.intp)
+    starts = starts.ravel().astype(np.intp)
+    pixels = np.arange(imgSize)
+    lookup = np.searchsorted(starts, pixels, side='right') - 1
+    lookup[(lookup < 0) | (ends[np.maximum(lookup, 0)] < pixels)] = -1
+    return lookup
+
+
+def render_image(size:int, invaders:int, imgSize:int, rng:np.random.Generator = None):
+    """
+    Array-backed renderer. Every invader is built as a size x size colour array, the canvas is composed by
+    a vectorized nearest-neighbour upscale and handed to Pillow at once. Draws the same sprites as draw_image,
+    but with colours from a numpy random number generator instead of Python's random.
+    :param size: grid size of an invader
+    :param invaders: number of invaders per row and column
+    :param imgSize: edge length of the image in pixels
+    :param rng: random number generator, Default: a new generator seeded from the operating system
+    :return: PIL Image
+    """
+    invaderSize = imgSize / invaders
+    padding = invaderSize / size
+    origins = [x * invaderSize + padding / 2 for x in range(0, invaders)]
+    # invaders are generated column by column, like in draw_image
+    palettes, choices = _draw_random_requests(invaders * invaders, size, rng if rng is not None
+                                              else np.random.default_rng())
+    palettes = np.concatenate((palettes, np.zeros_like(palettes)), axis=1).astype(np.uint8)
+    randColors = palettes[np.arange(invaders * invaders)[:, None], choices]
+    cells = invader_colors(size, randColors).reshape(invaders, invaders * size, size, 3)
+
+    canvas = np.zeros((imgSize, imgSize, 3), dtype=np.uint8)
+    row_lookups = {}
+    for x in range(0, invaders):
+        # draw_image derives the cell height from the invader's width, so rows depend on the column as well
+        squareSize = (origins[x] + invaderSize - padding - origins[x]) / size
+        if squareSize not in row_lookups:
+            row_lookups[squareSize] = _cell_lookup(origins, squareSize, size, imgSize)
+        rows = row_lookups[squareSize]
+        columns = _cell_lookup([origins[x]], squareSize, size, imgSize)
+        row_index = np.flatnonzero(rows >= 0)
+        column_index = np.flatnonzero(columns >= 0)
+        column_slice = slice(column_index[0], column_index[-1] + 1)
+        canvas[row_index, column_slice] = cells[x].take(rows[row_index], axis=0).take(columns[column_slice], axis=1)
+    return Image.fromarray(canvas, 'RGB')
+
+
+def sample_seed(seed:int, sample:int) -> list:
+    """
+    Seed of a single sample, derived from the run's seed and the sample's index
+    :param seed: seed of the run
+    :param sample: index of the sample
+    :return: seed for numpy.random.default_rng
+    """
+    return [seed, sample]
+
+
+def render_sample(size:int, invaders:int, imgSize:int, seed:list, encode:bool = False):
+    """
+    Render one sample from its own seed. Module level function, so it can be dispatched to a process pool.
+    :param size: grid size of an invader
+    :param invaders: number of invaders per row and column
+    :param imgSize: edge length of the image in pixels
+    :param seed: seed of the sample, see sample_seed
+    :param encode: return the JPEG encoded image, to avoid shipping raw pixels between processes
+    :return: PIL Image or JPEG bytes
+    """
+    image = render_image(size, invaders, imgSize, np.random.default_rng(seed))
+    if not encode:
+        return image
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def _write_samples(samples:queue.Queue, errors:list):
+    """
+    Writer stage: saves (path, image or JPEG bytes) items from the queue until it receives None
+    :param samples: bounded queue filled by the render stage
+    :param errors: collects the exception of a failed write, the pipeline stops producing then
+    """
+    while True:
+        item = samples.get()
+        if item is None:
+            return
+        path, image = item
+        try:
+            if isinstance(image, bytes):
+                with open(path, 'wb') as f:
+                    f.write(image)
+            else:
+                image.save(path)
+        except Exception as e:
+            errors.append(e)
+
+
+def _sample_path(output_path:Path, size:int, invaders:int, imgSize:int, sample:int) -> Path:
+    """
+    :return: output file of a sample
+    """
+    file_name = f'{size}x{size}-{invaders}-{imgSize}-{sample}-{time.time_ns()}.jpg'
+    return output_path.joinpath(file_name)
+
+
+def write_result(output_path:Path, record:dict, file_name:str = 'result.json') -> Path:
+    """
+    Write the machine-readable record of a run as json to the output directory
+    :param output_path: output directory
+    :param record: dict of json serializable values
+    :param file_name: name of the result file
+    :return: path of the written file
+    """
+    result_path = output_path.joinpath(file_name)
+    with open(result_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    return result_path
+
+
+def main(size:int, invaders:int, imgSize:int, output_path:Path, samples:int, seed:int = None, workers:int = 1,
+         queue_size:int = 4):
+    """
+    Render samples images and save them to output_path.
+    Rendering and encoding/saving run as a pipeline: the render stage puts images into a bounded queue, a writer
+    thread encodes and saves them while the next image is rendered (Pillow releases the GIL while encoding). With workers > 1 samples are rendered in a
+    process pool; workers encode their image themselves, so only the JPEG bytes are shipped back.
+    Sample n is rendered from sample_seed(seed, n), images are reproducible independent of workers.
+    :param size: grid size of an invader
+    :param invaders: number of invaders per row and column
+    :param imgSize: edge length of the image in pixels
+    :param output_path: output directory
+    :param samples: number of images
+    :param seed: seed of the run, drawn randomly and printed if None
+    :param workers: number of render processes, 0 uses all available cores
+    :param queue_size: maximum number of rendered images waiting to be written
+    :return: record of the run (parameters, image files relative to output_path, runtime in seconds), which is also
+        written to output_path/result.json
+    """
+    tic = time.perf_counter()
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    if workers == 0:
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
     if not output_path.exists():
         output_path.mkdir(parents=True, exist_ok=True)
-    origDimension = imgSize
-    for n in range(0, samples):
-        origImage = Image.new('RGB', (origDimension, origDimension))
-        draw = ImageDraw.Draw(origImage)
-        invaderSize = origDimension / invaders
-        padding = invaderSize / size
-        for x in range(0, invaders):
-            for y in range(0, invaders):
-                topLeftX = x * invaderSize + padding / 2
-                topLeftY = y * invaderSize + padding / 2
-                botRightX = topLeftX + invaderSize - padding
-                botRightY = topLeftY + invaderSize - padding
-                create_invader((topLeftX, topLeftY, botRightX, botRightY), draw, size)
-
-        file_name =  f'{size}x{size}-{invaders}-{imgSize}-{time.time_ns()}.jpg'
-        origImage.save(output_path.joinpath(file_name))
+    print(f'Rendering {samples} samples with seed {seed} on {workers} worker(s)')
+
+    pending = queue.Queue(maxsize=queue_size)
+    errors = []
+    output_files = []
+    writer = threading.Thread(target=_write_samples, args=(pending, errors), name='writer')
+    writer.start()
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # at most workers + queue_size samples are in flight, results are handed over in order
+                in_flight = collections.deque()
+                for n in range(0, samples):
+                    in_flight.append((n, executor.submit(render_sample, size, invaders, imgSize,
+                                                         sample_seed(seed, n), True)))
+                    while in_flight and not errors and (len(in_flight) >= workers + queue_size or n == samples - 1):
+                        done, future = in_flight.popleft()
+                        path = _sample_path(output_path, size, invaders, imgSize, done)
+                        output_files.append(path.name)
+                        pending.put((path, future.result()))
+                    if errors:
+                        for _, future in in_flight:
+                            future.cancel()
+                        break
+        else:
+            for n in range(0, samples):
+                image = render_sample(size, invaders, imgSize, sample_seed(seed, n))
+                path = _sample_path(output_path, size, invaders, imgSize, n)
+                output_files.append(path.name)
+                pending.put((path, image))
+                if errors:
+                    break
+    finally:
+        pending.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+    record = {
+        'simulation': 'sprithering',
+        'grid_size': size,
+        'invaders': invaders,
+        'img_size': imgSize,
+        'samples': samples,
+        'seed': seed,
+        'workers': workers,
+        'runtime_seconds': time.perf_counter() - tic,
+        'output_files': output_files,
+    }
+    write_result(output_path, record)
+    return record
 
 
-if __name__ == "__main__":
+def cli(argv):
     output_folder: Path = Path('art')
     size: int = 15
     invaders: int = 30
     imgSize: int  = 3000
     samples:int = 20
+    seed:int = None
+    workers:int = 1
+    batch_manifest:Path = None
+    usage = ('sprithering.py -o <output_folder> -g <grid_size> -i <invaders> -s <img_size> -n <samples> -r <seed> '
+             '-w <workers, 0 for all cores> --batch <manifest>')
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 'ho:g:i:s:n:', ['--output_dir=','--grid_size=', '--invaders=', '--img_size=', '--samples='])
+        opts, args = getopt.getopt(argv, 'ho:g:i:s:n:r:w:', ['output_dir=', 'grid_size=', 'invaders=', 'img_size=',
+                                                             'samples=', 'seed=', 'workers=', 'batch='])
     except getopt.GetoptError:
-        print('sprithering.py -o <output_folder> -g <grid_size> -i <invaders> -s <img_size> -n <samples>')
+        print(usage)
         sys.exit(2)
 
     for opt, arg in opts:
         if opt == '-h':
-            print('sprithering.py -o <output_folder> -g <grid_size> -i <invaders> -s <img_size> -n <samples>')
+            print(usage)
 
-        if opt in ('-o', '--output_dir='):
+        if opt in ('-o', '--output_dir'):
             output_folder = Path(arg)
 
-        if opt in ('-i', '--invaders='):
+        if opt in ('-i', '--invaders'):
             invaders = int(arg)
 
-        if opt in ('-s', '--imgsize='):
+        if opt in ('-s', '--img_size'):
             imgSize = int(arg)
 
-        if opt in ('-g', '--grid_size='):
+        if opt in ('-g', '--grid_size'):
             size = int(arg)
 
-        if opt in ('-n', '--samples='):
+        if opt in ('-n', '--samples'):
             samples = int(arg)
 
+        if opt in ('-r', '--seed'):
+            seed = int(arg)
+
+        if opt in ('-w', '--workers'):
+            workers = int(arg)
 
-    main(size=size, invaders=invaders, samples=samples, imgSize=imgSize, output_path=output_folder)
+        if opt == '--batch':
+            batch_manifest = Path(arg)
+
+    if batch_manifest is not None:
+        # shared with DockerSimManager's job fusion, the image ships docker_sim_batch.py next to this script
+        from docker_sim_batch import run_batch
+        # the output directory of each job replaces its -o argument
+        failed = run_batch(batch_manifest, lambda args, output_path: cli(list(args) + ['-o', str(output_path)]))
+        print(f'Batch finished, {failed} job(s) failed')
+        return
+
+    main(size=size, invaders=invaders, samples=samples, imgSize=imgSize, output_path=output_folder, seed=seed,
+         workers=workers)
+
+
+if __name__ == "__main__":
+    cli(sys.argv[1:])
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Example Test cases for sprithering
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+import numpy as np
+
+from example_random_art import sprithering
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+
+class TestSprithering(TestCase):
+
+    def test_render_image_pixel_equivalent(self):
+        for size, invaders, imgSize in [(15, 30, 500), (5, 10, 503), (7, 13, 333), (15, 30, 100)]:
+            # draw_image is fed the colours and choices render_image draws from the same seed
+            draws = sprithering._draw_random_requests(invaders * invaders, size, np.random.default_rng(12345))
+            with mock.patch.object(sprithering, 'random', sprithering.ReplayedRandom(*draws)):
+                reference = np.asarray(sprithering.draw_image(size, invaders, imgSize))
+            rendered = np.asarray(sprithering.render_image(size, invaders, imgSize, np.random.default_rng(12345)))
+            self.assertTrue(np.array_equal(reference, rendered), (size, invaders, imgSize))
+
+    def test_samples_reproducible_independent_of_workers(self):
+        with tempfile.TemporaryDirectory() as sequential, tempfile.TemporaryDirectory() as parallel:
+            sprithering.main(size=5, invaders=4, imgSize=64, output_path=Path(sequential), samples=3, seed=7)
+            sprithering.main(size=5, invaders=4, imgSize=64, output_path=Path(parallel), samples=3, seed=7,
+                             workers=2, queue_size=1)
+            for sample in range(3):
+                first, = Path(sequential).glob(f'5x5-4-64-{sample}-*.jpg')
+                second, = Path(parallel).glob(f'5x5-4-64-{sample}-*.jpg')
+                self.assertEqual(first.read_bytes(), second.read_bytes())
+
+    def test_result_record(self):
+        with tempfile.TemporaryDirectory() as output_path:
+            record = sprithering.main(size=5, invaders=4, imgSize=64, output_path=Path(output_path), samples=2, seed=7)
+            self.assertEqual(json.loads(Path(output_path).joinpath('result.json').read_text()), record)
+            self.assertEqual((record['simulation'], record['img_size'], record['seed']), ('sprithering', 64, 7))
+            self.assertEqual(sorted(record['output_files']),
+                             sorted(path.name for path in Path(output_path).glob('*.jpg')))
+
+    def test_batch_manifest(self):
+        with tempfile.TemporaryDirectory() as batch_dir, contextlib.redirect_stdout(io.StringIO()):
+            manifest = Path(batch_dir).joinpath('manifest.json')
+            manifest.write_text(json.dumps({'jobs': [
+                {'name': f'size{size}', 'args': ['-g', str(size), '-i', '4', '-s', '64', '-n', '2', '-r', '7'],
+                 'output': f'job_size{size}'} for size in (3, 5)]}))
+            sprithering.cli(['--batch', str(manifest)])
+            for size in (3, 5):
+                job_dir = Path(batch_dir).joinpath(f'job_size{size}')
+                record = json.loads(job_dir.joinpath('result.json').read_text())
+                self.assertEqual((record['grid_size'], record['seed']), (size, 7))
+                self.assertEqual(len(list(job_dir.glob('*.jpg'))), 2)
+                self.assertEqual(json.loads(job_dir.joinpath('exit_status.json').read_text())['exit_code'], 0)
@@ -0,0 +1,953 @@
+#!/usr/bin/env python
+"""In-process fake of the docker SDK client used by DockerSimManager
+
+Implements the subset of docker.DockerClient used by this project (containers.run/create/get/list, exec, logs,
+archives, events, images.pull, login) without a docker daemon. Container lifecycle steps take a configurable amount of
+time, so benchmarks can compare execution modes offline. Jobs are simulated by a callable, which receives the
+command and the host directory mounted as the working directory and returns (exit_code, output). output is
+either bytes or an iterable of byte chunks, which appear in the container's log as they are produced.
+Paths, which are not bind mounted, live in a private temporary directory per container. fail() simulates a daemon,
+which became unreachable, fail_creates() a daemon answering the next container creations with server errors and
+drop_log_streams() a lost connection to the log streams of running containers.
+FakeDockerAPIServer serves a fake Docker Engine API over a unix socket for benchmarks of the real docker SDK and the
+asyncio engine, which talk HTTP to the daemon.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import io
+import itertools
+import json
+import queue
+import random
+import re
+import shlex
+import shutil
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path, PurePosixPath
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from docker.errors import APIError, ContainerError, NotFound
+from requests import Response
+from requests.exceptions import ConnectionError
+from docker.models.containers import ExecResult
+
+from docker_sim_batch import BATCH_OPTION, BATCH_STATUS_FILE
+
+__author__ = "Michael Wittmann"
+
+__license__ = "MIT"
+__version__ = "1.0.0"
+__maintainer__ = "Michael Wittmann"
+__email__ = "michael.wittmann@tum.de"
+__status__ = "Example"
+
+
+_END_OF_STREAM = object()
+
+
+def sleeping_job(seconds: float):
+    """
+    Creates a job simulation, which sleeps for a fixed time and succeeds
+    :param seconds: simulated runtime of each job
+    :return: job callable for FakeDockerClient
+    """
+    def job(command, host_dir):
+        time.sleep(seconds)
+        return 0, f'{" ".join(command)} finished\n'.encode('utf-8')
+    return job
+
+
+def synthetic_job(seconds: float, failure_rate: float = 0.0, log_bytes: int = 0, chunk_size: int = 1 << 16):
+    """
+    Creates a job simulation with a fixed runtime, a share of failing jobs and a given log volume
+    :param seconds: simulated runtime of each job
+    :param failure_rate: share of jobs, which exit with exit code 1. Whether a job fails depends on its command only,
+        so repeated runs fail the same jobs
+    :param log_bytes: output of each job in bytes, written in chunks of chunk_size
+    :return: job callable for FakeDockerClient
+    """
+    def job(command, host_dir):
+        line = " ".join(command)
+        failed = random.Random(zlib.crc32(line.encode('utf-8'))).random() < failure_rate
+        time.sleep(seconds)
+
+        def output():
+            for offset in range(0, log_bytes, chunk_size):
+                yield b'x' * min(chunk_size, log_bytes - offset)
+            yield f'{line} {"failed" if failed else "finished"}\n'.encode('utf-8')
+        return (1 if failed else 0), output()
+    return job
+
+
+class FakeStream():
+    def __init__(self) -> None:
+        """
+        Blocking stream of items put by other threads, which can be cancelled like docker's CancellableStream
+        """
+        self._queue = queue.Queue()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self._queue.get()
+        if item is _END_OF_STREAM:
+            self._queue.put(_END_OF_STREAM)
+            raise StopIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def close(self):
+        self._queue.put(_END_OF_STREAM)
+
+    def abort(self, error: Exception):
+        """
+        Ends the stream with an error, like a connection, which broke while streaming
+        """
+        self._queue.put(error)
+
+
+def _image_digest(repository: str, tag: str, revision: int = 0) -> str:
+    name = f'{repository}:{tag}' if not revision else f'{repository}:{tag}:{revision}'
+    return 'sha256:' + hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+
+def _container_stats(running_seconds: float, log_bytes: int) -> dict:
+    """
+    Stats sample of a container, which used half a core while running and holds its log in memory
+    """
+    return {
+        'cpu_stats': {'cpu_usage': {'total_usage': int(running_seconds * 0.5e9)}},
+        'memory_stats': {'usage': 8 * 1024 ** 2 + log_bytes},
+        'blkio_stats': {'io_service_bytes_recursive': [{'op': 'read', 'value': 4096}, {'op': 'write', 'value': log_bytes}]},
+        'networks': {'eth0': {'rx_bytes': 0, 'tx_bytes': 0}},
+    }
+
+
+class FakeImage():
+    def __init__(self, repository: str, tag: str, entrypoint=None, working_dir='/usr/src/app', revision=0) -> None:
+        self.id = _image_digest(repository, tag, revision)
+        self.tags = [f'{repository}:{tag}']
+        self.attrs = {
+            'Id': self.id,
+            'RepoDigests': [f'{repository}@{self.id}'],
+            'Config': {'Entrypoint': entrypoint, 'WorkingDir': working_dir},
+        }
+
+
+class FakeContainer():
+    def __init__(self, client, name: str, image: FakeImage, command, mounts, working_dir, labels, keepalive) -> None:
+        self.client = client
+        self.name = name
+        self.id = f'{next(client.container_ids):064x}'
+        self.image = image
+        self.labels = dict(labels or {})
+        self.command = command
+        self.status = 'created'
+        self.exit_code = None
+        # the most specific mount wins, like nested bind mounts
+        self._mounts = sorted(((PurePosixPath(mount['Target']), Path(mount['Source'])) for mount in mounts or []),
+                              key=lambda mount: len(mount[0].parts), reverse=True)
+        self._working_dir = working_dir or image.attrs['Config']['WorkingDir']
+        self._keepalive = keepalive
+        self._log = bytearray()
+        self._log_times = []
+        self._log_streams = []
+        self._finished = threading.Event()
+        self._rootfs = None
+        self._started = None
+        self.host_config = {}
+        self.attrs = {'Name': f'/{name}', 'State': {'Status': 'created', 'StartedAt': '0001-01-01T00:00:00Z'}}
+
+    def host_path(self, container_path):
+        """
+        Maps a path inside the container to the bind mounted path on the host, or to the container's private
+        file system
+        :param container_path: absolute path inside the container
+        :return: host path
+        """
+        container_path = PurePosixPath(container_path)
+        for target, source in self._mounts:
+            if container_path == target or target in container_path.parents:
+                return source.joinpath(container_path.relative_to(target))
+        with self.client.lock:
+            if self._rootfs is None:
+                self._rootfs = Path(tempfile.mkdtemp(prefix='fake_container_'))
+        path = self._rootfs.joinpath(container_path.relative_to('/'))
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def start(self):
+        self.client.check()
+        self._start()
+        threading.Thread(target=self._run_main_process, daemon=True).start()
+
+    def put_archive(self, path, data):
+        self.client.check()
+        target = self.host_path(path)
+        fileobj = io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
+        with tarfile.open(fileobj=fileobj, mode='r|*') as tar:
+            tar.extractall(target)
+        return True
+
+    def get_archive(self, path, chunk_size=1 << 16):
+        self.client.check()
+        source = self.host_path(path)
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            tar.add(str(source), arcname=PurePosixPath(path).name)
+        data = buffer.getvalue()
+        stat = {'name': PurePosixPath(path).name, 'size': len(data)}
+        return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size)), stat
+
+    def _start(self):
+        time.sleep(self.client.start_time)
+        self._started = time.monotonic()
+        self.status = 'running'
+        self.attrs['State'] = {'Status': 'running',
+                               'StartedAt': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        self.client.publish(self, 'start')
+
+    def _execute(self, command, working_dir):
+        time.sleep(self.client.process_time)
+        if command[:1] == [BATCH_OPTION]:
+            return self._execute_batch(command[1])
+        exit_code, output = self.client.job(command, self.host_path(working_dir))
+        return exit_code, output
+
+    def _execute_batch(self, manifest):
+        """
+        Runs the jobs of a batch manifest one after another like the example simulations' --batch mode: each job's
+        output goes to log.txt and its exit status to exit_status.json inside its output directory
+        """
+        with open(self.host_path(manifest)) as f:
+            entries = json.load(f)['jobs']
+        summary = []
+        for entry in entries:
+            output_dir = self.host_path(entry['output'])
+            output_dir.mkdir(parents=True, exist_ok=True)
+            tic = time.monotonic()
+            exit_code, output = self.client.job(list(entry['args']), output_dir)
+            with open(output_dir.joinpath('log.txt'), 'wb') as f:
+                for chunk in [output] if isinstance(output, (bytes, bytearray)) else output:
+                    f.write(chunk)
+            output_dir.joinpath(BATCH_STATUS_FILE).write_text(json.dumps(
+                {'exit_code': exit_code, 'runtime_seconds': time.monotonic() - tic}))
+            summary.append(f'{entry["name"]}: exit code {exit_code}\n')
+        return 0, ''.join(summary).encode('utf-8')
+
+    def _append_log(self, output: bytes):
+        if not output:
+            return
+        with self.client.lock:
+            self._log.extend(output)
+            self._log_times.append(time.time())
+            for stream in self._log_streams:
+                stream.put(bytes(output))
+
+    def _run_main_process(self):
+        if self._keepalive:
+            self._finished.wait()
+            return
+        exit_code, output = self._execute(self.command, self._working_dir)
+        if isinstance(output, (bytes, bytearray)):
+            self._append_log(output)
+        else:
+            for chunk in output:
+                if self._finished.is_set():
+                    return
+                self._append_log(chunk)
+        self._exit(exit_code)
+
+    def _exit(self, exit_code):
+        with self.client.lock:
+            if self._finished.is_set():
+                return
+            self.exit_code = exit_code
+            self.status = 'exited'
+            self.attrs['State'] = dict(self.attrs['State'], Status='exited', ExitCode=exit_code)
+            self._finished.set()
+            for stream in self._log_streams:
+                stream.close()
+        self.client.publish(self, 'die')
+
+    def exec_run(self, cmd, workdir=None, user='', **kwargs):
+        if self.status != 'running':
+            raise APIError(f'Container {self.name} is not running')
+        time.sleep(self.client.exec_time)
+        if isinstance(cmd, str):
+            cmd = shlex.split(cmd)
+        exit_code, output = self._execute(list(cmd), workdir or self._working_dir)
+        return ExecResult(exit_code, output)
+
+    def logs(self, since=None, stream=False, follow=False, tail='all', **kwargs):
+        self.client.check()
+        with self.client.lock:
+            if stream:
+                log_stream = FakeStream()
+                if tail != 0 and self._log:
+                    log_stream.put(bytes(self._log))
+                if follow and not self._finished.is_set():
+                    self._log_streams.append(log_stream)
+                else:
+                    log_stream.close()
+                return log_stream
+            if since is None:
+                return bytes(self._log)
+            return b'' if not any(t >= since for t in self._log_times) else bytes(self._log)
+
+    def stats(self, stream=True, **kwargs):
+        self.client.check()
+        running = time.monotonic() - self._started if self._started is not None else 0.0
+        stats = _container_stats(running, len(self._log))
+        return stats if not stream else iter([stats])
+
+    def wait(self, timeout=None):
+        self.client.check()
+        self._finished.wait(timeout)
+        self.client.check()
+        return {'StatusCode': self.exit_code}
+
+    def reload(self):
+        if self.name not in self.client.containers.by_name:
+            raise NotFound(f'No such container: {self.name}')
+
+    def stop(self, timeout=None):
+        if self.status == 'running':
+            time.sleep(self.client.stop_time)
+            self._exit(137 if not self._keepalive else 0)
+
+    def kill(self, signal=None):
+        self.stop()
+
+    def remove(self, force=False, **kwargs):
+        self.client.check()
+        if self.status == 'running':
+            if not force:
+                raise APIError(f'You cannot remove a running container {self.name}')
+            self.stop()
+        time.sleep(self.client.remove_time)
+        self.client.containers.forget(self)
+        if self._rootfs is not None:
+            shutil.rmtree(self._rootfs, ignore_errors=True)
+        self.client.publish(self, 'destroy')
+
+
+class FakeAPIClient():
+    def __init__(self, client) -> None:
+        """
+        Low level API of the fake client, only exec is supported
+        """
+        self.client = client
+        self._execs = {}
+        self._exec_ids = itertools.count(1)
+
+    def _container(self, container_id):
+        with self.client.lock:
+            for container in self.client.containers.by_name.values():
+                if container.id == container_id or container.name == container_id:
+                    return container
+        raise NotFound(f'No such container: {container_id}')
+
+    def exec_create(self, container, cmd, workdir=None, user='', **kwargs):
+        self.client.check()
+        container = self._container(getattr(container, 'id', container))
+        if container.status != 'running':
+            raise APIError(f'Container {container.name} is not running')
+        if isinstance(cmd, str):
+            cmd = shlex.split(cmd)
+        exec_id = f'exec{next(self._exec_ids)}'
+        self._execs[exec_id] = {'container': container, 'cmd': list(cmd), 'workdir': workdir, 'ExitCode': None,
+                                'Running': False}
+        return {'Id': exec_id}
+
+    def exec_start(self, exec_id, stream=False, **kwargs):
+        exec_instance = self._execs[exec_id]
+        time.sleep(self.client.exec_time)
+        container = exec_instance['container']
+        exec_instance['Running'] = True
+        exit_code, output = container._execute(exec_instance['cmd'],
+                                               exec_instance['workdir'] or container._working_dir)
+
+        def chunks():
+            if isinstance(output, (bytes, bytearray)):
+                yield bytes(output)
+            else:
+                yield from output
+            exec_instance['ExitCode'] = exit_code
+            exec_instance['Running'] = False
+
+        if stream:
+            return chunks()
+        return b''.join(chunks())
+
+    def exec_inspect(self, exec_id):
+        exec_instance = self._execs[exec_id]
+        return {'ExitCode': exec_instance['ExitCode'], 'Running': exec_instance['Running']}
+
+    def stats(self, container, decode=None, stream=True, one_shot=None):
+        self.client.stats_queries += 1
+        return self._container(getattr(container, 'id', container)).stats(stream=stream)
+
+
+class FakeContainerCollection():
+    def __init__(self, client) -> None:
+        self.client = client
+        self.by_name = {}
+        self.created = 0
+        self.mounts = {}
+
+    def create(self, image, command=None, name=None, mounts=None, working_dir=None, labels=None, entrypoint=None,
+               **kwargs):
+        self.client.check()
+        self.client.check_create(name)
+        if isinstance(command, str):
+            command = shlex.split(command)
+        if name is None:
+            name = f'fake_{next(self.client.container_ids)}'
+        time.sleep(self.client.create_time)
+        container = FakeContainer(self.client, name, image, list(command or []), mounts, working_dir, labels,
+                                  keepalive=entrypoint is not None)
+        container.host_config = {key: kwargs[key] for key in ('nano_cpus', 'cpuset_cpus', 'mem_limit', 'user')
+                                 if key in kwargs}
+        with self.client.lock:
+            if name in self.by_name:
+                raise APIError(f'Conflict. The container name "/{name}" is already in use')
+            self.by_name[name] = container
+            self.created += 1
+            self.mounts[name] = list(mounts or [])
+        self.client.publish(container, 'create')
+        return container
+
+    def run(self, image, command=None, detach=False, remove=False, **kwargs):
+        container = self.create(image, command, **kwargs)
+        if detach:
+            container.start()
+            return container
+        container._start()
+        container._run_main_process()
+        if remove:
+            container.remove()
+        if container.exit_code != 0:
+            raise ContainerError(container, container.exit_code, command, image, bytes(container._log))
+        return bytes(container._log)
+
+    def get(self, container_id):
+        self.client.check()
+        with self.client.lock:
+            container = self.by_name.get(container_id)
+        if container is None:
+            raise NotFound(f'No such container: {container_id}')
+        return container
+
+    def list(self, all=False, filters=None, **kwargs):
+        self.client.check()
+        with self.client.lock:
+            containers = list(self.by_name.values())
+        if not all:
+            containers = [c for c in containers if c.status == 'running']
+        for key, value in (filters or {}).items():
+            if key == 'name':
+                containers = [c for c in containers if value in c.name]
+            elif key == 'label':
+                label, _, label_value = value.partition('=')
+                containers = [c for c in containers
+                              if label in c.labels and (not label_value or c.labels[label] == label_value)]
+            elif key == 'status':
+                containers = [c for c in containers if c.status == value]
+        return containers
+
+    def forget(self, container):
+        with self.client.lock:
+            if self.by_name.get(container.name) is container:
+                del self.by_name[container.name]
+
+
+class FakeRegistryData():
+    def __init__(self, digest: str) -> None:
+        self.id = digest
+        self.attrs = {'Descriptor': {'digest': digest}}
+
+
+class FakeImageCollection():
+    def __init__(self, client) -> None:
+        self.client = client
+        self.pulls = 0
+        self.registry_queries = 0
+        self.local = {}
+
+    @staticmethod
+    def _split(name):
+        repository, _, tag = name.rpartition(':')
+        if not repository or '/' in tag:
+            return name, 'latest'
+        return repository, tag
+
+    def pull(self, repository, tag=None, **kwargs):
+        self.client.check()
+        self.client.check_registry_auth()
+        time.sleep(self.client.pull_time)
+        self.pulls += 1
+        image = FakeImage(repository, tag or 'latest', entrypoint=self.client.entrypoint,
+                          revision=self.client.remote_revision)
+        self.local[image.tags[0]] = image
+        return image
+
+    def get_registry_data(self, name, auth_config=None):
+        self.client.check()
+        self.client.check_registry_auth()
+        self.registry_queries += 1
+        return FakeRegistryData(_image_digest(*self._split(name), revision=self.client.remote_revision))
+
+    def get(self, name):
+        self.client.check()
+        name = ':'.join(self._split(name))
+        image = self.local.get(name)
+        if image is None:
+            raise NotFound(f'No such image: {name}')
+        return image
+
+
+class FakeDockerClient():
+    def __init__(self, job=None, entrypoint=None, create_time=0.0, start_time=0.0, exec_time=0.0, stop_time=0.0,
+                 remove_time=0.0, pull_time=0.0, process_time=0.0, cpus=8, memory=16 * 1024 ** 3,
+                 registry_auth=False) -> None:
+        """
+        Creates a fake docker client
+        :param job: callable(command, host_dir) -> (exit_code, output), default: immediately succeeding job
+        :param entrypoint: entrypoint of pulled images
+        :param create_time: seconds to create a container
+        :param start_time: seconds to start a container
+        :param exec_time: seconds to set up an exec inside a running container
+        :param stop_time: seconds to stop a running container
+        :param remove_time: seconds to remove a container
+        :param pull_time: seconds to pull an image
+        :param process_time: seconds the simulation process needs to start, e.g. to import its packages, once per
+            container or exec
+        :param cpus: number of cpus reported by info()
+        :param memory: memory in bytes reported by info()
+        :param registry_auth: the registry refuses pulls and digest queries until login() was called.
+            Set remote_revision to simulate a new image pushed to the registry.
+        """
+        self.job = job if job is not None else sleeping_job(0.0)
+        self.registry_auth = registry_auth
+        self.remote_revision = 0
+        self.logins = 0
+        self.stats_queries = 0
+        self.entrypoint = entrypoint
+        self.create_time = create_time
+        self.start_time = start_time
+        self.exec_time = exec_time
+        self.stop_time = stop_time
+        self.remove_time = remove_time
+        self.pull_time = pull_time
+        self.process_time = process_time
+        self.cpus = cpus
+        self.memory = memory
+        self.lock = threading.RLock()
+        self.container_ids = itertools.count(1)
+        self.containers = FakeContainerCollection(self)
+        self.images = FakeImageCollection(self)
+        self.api = FakeAPIClient(self)
+        self._event_streams = []
+        self.failed = False
+        self._create_failures = []
+
+    def check(self):
+        """
+        :raise ConnectionError: if the fake daemon failed
+        """
+        if self.failed:
+            raise ConnectionError('Connection aborted: fake docker daemon is unreachable')
+
+    def fail_creates(self, count: int = 1, status_code: int = 500, name: str = None):
+        """
+        Lets the next container creations fail with an error response of the daemon
+        :param count: number of failing creations
+        :param status_code: HTTP status code of the responses, 5xx for transient server errors
+        :param name: fail only creations of the container with this name, Default: any container
+        """
+        with self.lock:
+            self._create_failures.extend([(status_code, name)] * count)
+
+    def check_create(self, name: str = None):
+        """
+        :param name: name of the container to create
+        :raise APIError: if a failing container creation was requested with fail_creates
+        """
+        with self.lock:
+            failure = next((failure for failure in self._create_failures if failure[1] in (None, name)), None)
+            if failure is None:
+                return
+            self._create_failures.remove(failure)
+            status_code = failure[0]
+        response = Response()
+        response.status_code = status_code
+        raise APIError(f'{status_code} Server Error: fake daemon error', response=response)
+
+    def drop_log_streams(self):
+        """
+        Breaks the connections of all log streams, which follow running containers. The containers keep running.
+        """
+        with self.lock:
+            for container in self.containers.by_name.values():
+                for stream in container._log_streams:
+                    stream.abort(ConnectionError('Connection broken: fake log stream dropped'))
+                container._log_streams = []
+
+    def fail(self):
+        """
+        Simulates a daemon, which became unreachable: all streams end and further calls raise ConnectionError
+        """
+        with self.lock:
+            self.failed = True
+            streams = list(self._event_streams)
+            for container in self.containers.by_name.values():
+                streams.extend(container._log_streams)
+                container._finished.set()
+        for stream in streams:
+            stream.close()
+
+    def ping(self):
+        self.check()
+        return True
+
+    def events(self, decode=False, filters=None, **kwargs):
+        self.check()
+        event_stream = FakeStream()
+        with self.lock:
+            self._event_streams.append(event_stream)
+        return event_stream
+
+    def publish(self, container, action):
+        """
+        Publishes a container event to all event streams
+        :param container: FakeContainer
+        :param action: event, e.g. create, start, die, destroy
+        """
+        now = time.time()
+        event = {
+            'Type': 'container',
+            'Action': action,
+            'status': action,
+            'id': container.id,
+            'Actor': {'ID': container.id, 'Attributes': dict(container.labels, name=container.name)},
+            'time': int(now),
+            'timeNano': int(now * 1e9),
+        }
+        with self.lock:
+            for event_stream in self._event_streams:
+                event_stream.put(event)
+
+    def info(self):
+        self.check()
+        return {'NCPU': self.cpus, 'MemTotal': self.memory, 'Name': 'fake'}
+
+    def check_registry_auth(self):
+        """
+        :raise APIError: if the registry requires a login, which did not happen yet
+        """
+        if self.registry_auth and not self.logins:
+            raise APIError('unauthorized: authentication required')
+
+    def login(self, username=None, password=None, registry=None, reauth=False, **kwargs):
+        self.check()
+        self.logins += 1
+        return {'Status': 'Login Succeeded'}
+
+    def close(self):
+        pass
+
+
+class _FakeAPIContainer():
+    def __init__(self, container_id: str, name: str, config: dict) -> None:
+        self.id = container_id
+        self.name = name
+        self.config = config
+        self.labels = config.get('Labels') or {}
+        self.status = 'created'
+        self.started_at = '0001-01-01T00:00:00Z'
+        self.started = None
+        self.exit_code = None
+        self.log = bytearray()
+        self.followers = []
+        self.finished = asyncio.Event()
+        self.task = None
+
+    def inspect(self) -> dict:
+        return {
+            'Id': self.id,
+            'Name': f'/{self.name}',
+            'Image': self.config.get('Image'),
+            'Config': dict(self.config, Tty=False, Labels=self.labels),
+            'State': {'Status': self.status, 'Running': self.status == 'running', 'StartedAt': self.started_at,
+                      'ExitCode': self.exit_code or 0},
+        }
+
+    def summary(self) -> dict:
+        return {'Id': self.id, 'Names': [f'/{self.name}'], 'Image': self.config.get('Image'), 'Labels': self.labels,
+                'State': self.status, 'Status': self.status}
+
+
+class FakeDockerAPIServer():
+    def __init__(self, socket_path, job_time: float = 0.0, cpus: int = 8, memory: int = 16 * 1024 ** 3) -> None:
+        """
+        Fake Docker Engine API served over a unix socket. Implements the endpoints used by the docker SDK and the
+        asyncio engine of DockerSimManager (version, images, containers, logs, wait, events, ...). Every container
+        runs for job_time seconds, prints '<command> finished' and exits with 0, or 1 if its command contains 'fail'.
+        :param socket_path: path of the unix socket
+        :param job_time: simulated runtime of each container
+        :param cpus: number of cpus reported by /info
+        :param memory: memory in bytes reported by /info
+        """
+        self.socket_path = str(socket_path)
+        self.job_time = job_time
+        self.cpus = cpus
+        self.memory = memory
+        self.containers = {}
+        self.created = 0
+        self._ids = itertools.count(1)
+        self._event_queues = []
+
+    def serve_forever(self) -> None:
+        """
+        Serves requests until the process is terminated
+        """
+        async def serve():
+            server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(serve())
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    return
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                url = urlsplit(target)
+                path = re.sub(r'^/v[0-9.]+', '', unquote(url.path))
+                params = dict(parse_qsl(url.query))
+                await self._dispatch(writer, method, path, params, json.loads(body) if body else None)
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status: int, body=None, content_type='application/json'):
+        if body is None:
+            data = b''
+        elif isinstance(body, bytes):
+            data = body
+        else:
+            data = json.dumps(body).encode('utf-8')
+        writer.write((f'HTTP/1.1 {status} Fake\r\nContent-Type: {content_type}\r\nApi-Version: 1.45\r\n'
+                      f'Content-Length: {len(data)}\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+    @staticmethod
+    async def _start_stream(writer, content_type):
+        writer.write((f'HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nApi-Version: 1.45\r\n'
+                      f'Transfer-Encoding: chunked\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+    @staticmethod
+    async def _write_chunk(writer, data: bytes):
+        writer.write(f'{len(data):x}\r\n'.encode('latin-1') + data + b'\r\n')
+        await writer.drain()
+
+    def _container(self, container_id):
+        container = self.containers.get(container_id)
+        if container is None:
+            for candidate in self.containers.values():
+                if candidate.id.startswith(container_id):
+                    return candidate
+        return container
+
+    async def _dispatch(self, writer, method, path, params, body):
+        parts = path.strip('/').split('/')
+        if path == '/_ping':
+            return await self._respond(writer, 200, b'OK', 'text/plain')
+        if path == '/version':
+            return await self._respond(writer, 200, {'ApiVersion': '1.45', 'MinAPIVersion': '1.24',
+                                                     'Version': 'fake'})
+        if path == '/info':
+            return await self._respond(writer, 200, {'NCPU': self.cpus, 'MemTotal': self.memory, 'Name': 'fake'})
+        if path == '/auth':
+            return await self._respond(writer, 200, {'Status': 'Login Succeeded'})
+        if path == '/events':
+            return await self._events(writer)
+        if path == '/images/create':
+            await self._start_stream(writer, 'application/json')
+            await self._write_chunk(writer, json.dumps({'status': 'Pulled'}).encode('utf-8'))
+            return await self._write_chunk(writer, b'')
+        if parts[0] == 'distribution' and parts[-1] == 'json':
+            name = '/'.join(parts[1:-1])
+            if ':' not in name.rsplit('/', 1)[-1]:
+                name = f'{name}:latest'
+            digest = 'sha256:' + hashlib.sha256(name.encode('utf-8')).hexdigest()
+            return await self._respond(writer, 200, {'Descriptor': {'digest': digest}, 'Platforms': []})
+        if parts[0] == 'images' and parts[-1] == 'json':
+            name = '/'.join(parts[1:-1])
+            if ':' not in name.rsplit('/', 1)[-1]:
+                name = f'{name}:latest'
+            image_id = 'sha256:' + hashlib.sha256(name.encode('utf-8')).hexdigest()
+            return await self._respond(writer, 200, {'Id': image_id, 'RepoTags': [name],
+                                                     'RepoDigests': [f'{name.rsplit(":", 1)[0]}@{image_id}'],
+                                                     'Config': {'Entrypoint': None, 'WorkingDir': '/usr/src/app'}})
+        if path == '/containers/json':
+            return await self._list(writer, params)
+        if path == '/containers/create':
+            return await self._create(writer, params.get('name'), body or {})
+        if parts[0] != 'containers' or len(parts) < 2:
+            return await self._respond(writer, 404, {'message': f'page not found: {path}'})
+        container = self._container(parts[1])
+        if container is None:
+            return await self._respond(writer, 404, {'message': f'No such container: {parts[1]}'})
+        action = parts[2] if len(parts) > 2 else None
+        if method == 'DELETE' and action is None:
+            if container.status == 'running' and params.get('force') not in ('1', 'true', 'True'):
+                return await self._respond(writer, 409, {'message': 'You cannot remove a running container'})
+            self._exit(container, 137)
+            self.containers.pop(container.name, None)
+            self._publish(container, 'destroy')
+            return await self._respond(writer, 204)
+        if action == 'json':
+            return await self._respond(writer, 200, container.inspect())
+        if action == 'start':
+            if container.status == 'created':
+                container.status = 'running'
+                container.started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+                container.started = time.monotonic()
+                container.task = asyncio.ensure_future(self._run(container))
+                self._publish(container, 'start')
+            return await self._respond(writer, 204)
+        if action == 'stop' or action == 'kill':
+            self._exit(container, 137)
+            return await self._respond(writer, 204)
+        if action == 'wait':
+            await container.finished.wait()
+            return await self._respond(writer, 200, {'StatusCode': container.exit_code, 'Error': None})
+        if action == 'logs':
+            return await self._logs(writer, container, params)
+        if action == 'stats':
+            running = time.monotonic() - container.started if container.started is not None else 0.0
+            return await self._respond(writer, 200, _container_stats(running, len(container.log)))
+        return await self._respond(writer, 404, {'message': f'page not found: {path}'})
+
+    async def _create(self, writer, name, config):
+        container_id = f'{next(self._ids):064x}'
+        name = name or f'fake_{container_id[-8:]}'
+        if name in self.containers:
+            return await self._respond(writer, 409, {'message': f'Conflict. The container name "/{name}" is already '
+                                                                f'in use'})
+        container = _FakeAPIContainer(container_id, name, config)
+        self.containers[name] = container
+        self.created += 1
+        self._publish(container, 'create')
+        await self._respond(writer, 201, {'Id': container_id, 'Warnings': []})
+
+    async def _list(self, writer, params):
+        filters = json.loads(params.get('filters', '{}'))
+        containers = list(self.containers.values())
+        if params.get('all') not in ('1', 'true', 'True'):
+            containers = [c for c in containers if c.status == 'running']
+        for value in filters.get('name', []):
+            containers = [c for c in containers if value in c.name]
+        for value in filters.get('label', []):
+            label, _, label_value = value.partition('=')
+            containers = [c for c in containers
+                          if label in c.labels and (not label_value or c.labels[label] == label_value)]
+        await self._respond(writer, 200, [c.summary() for c in containers])
+
+    async def _run(self, container):
+        await asyncio.sleep(self.job_time)
+        command = container.config.get('Cmd') or []
+        self._append_log(container, f'{" ".join(command)} finished\n'.encode('utf-8'))
+        self._exit(container, 1 if 'fail' in command else 0)
+
+    def _append_log(self, container, output: bytes):
+        container.log.extend(output)
+        frame = struct.pack('>BxxxL', 1, len(output)) + output
+        for follower in container.followers:
+            follower.put_nowait(frame)
+
+    def _exit(self, container, exit_code):
+        if container.finished.is_set():
+            return
+        if container.task is not None and container.task is not asyncio.current_task():
+            container.task.cancel()
+        container.status = 'exited'
+        container.exit_code = exit_code
+        container.finished.set()
+        for follower in container.followers:
+            follower.put_nowait(None)
+        self._publish(container, 'die')
+
+    async def _logs(self, writer, container, params):
+        await self._start_stream(writer, 'application/vnd.docker.multiplexed-stream')
+        follower = asyncio.Queue()
+        if params.get('tail', 'all') != '0' and container.log:
+            follower.put_nowait(struct.pack('>BxxxL', 1, len(container.log)) + bytes(container.log))
+        if params.get('follow') in ('1', 'true', 'True') and not container.finished.is_set():
+            container.followers.append(follower)
+        else:
+            follower.put_nowait(None)
+        try:
+            while True:
+                frame = await follower.get()
+                if frame is None:
+                    break
+                await self._write_chunk(writer, frame)
+            await self._write_chunk(writer, b'')
+        finally:
+            if follower in container.followers:
+                container.followers.remove(follower)
+
+    def _publish(self, container, action):
+        now = time.time()
+        event = {'Type': 'container', 'Action': action, 'status': action, 'id': container.id,
+                 'Actor': {'ID': container.id, 'Attributes': dict(container.labels, name=container.name)},
+                 'time': int(now), 'timeNano': int(now * 1e9)}
+        for event_queue in self._event_queues:
+            event_queue.put_nowait(event)
+
+    async def _events(self, writer):
+        await self._start_stream(writer, 'application/json')
+        event_queue = asyncio.Queue()
+        self._event_queues.append(event_queue)
+        try:
+            while True:
+                event = await event_queue.get()
+                await self._write_chunk(writer, json.dumps(event).encode('utf-8') + b'\n')
+        finally:
+            self._event_queues.remove(event_queue)
+
+
+def serve_fake_docker_api(socket_path, job_time: float = 0.0) -> None:
+    """
+    Runs a FakeDockerAPIServer, use as target of a separate process
+    """
+    FakeDockerAPIServer(socket_path, job_time=job_time).serve_forever()
@@ -0,0 +1,894 @@
+import collections
+import csv
+import gzip
+import itertools
+import json
+import math
+import multiprocessing
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import docker
+from docker.errors import APIError, ImageNotFound, NotFound
+from docker.types import Mount
+from loguru import logger
+from requests import Response
+from requests.exceptions import ConnectionError as DaemonConnectionError
+
+from docker_sim_cache import ResultCache
+from docker_sim_hosts import DockerHost, HostPool
+from docker_sim_journal import QUEUED, RUNNING, SUCCEEDED
+from docker_sim_manager import DockerSimManager, SimJob, DATA_DIRECTORY_LABEL, ENGINES
+from docker_sim_resources import ResourceScheduler, parse_memory
+from docker_sim_retry import RetryPolicy, StragglerDetector, TIMEOUT_EXIT_CODE
+from docker_sim_runtimes import RuntimeHistory, command_parameters, longest_first
+from docker_sim_sweep import Choice, IntUniform, LogUniform, ParameterSweep, Uniform, chain_sweeps
+from docker_sim_telemetry import Reservoir, Telemetry
+from fake_docker import FakeDockerClient, serve_fake_docker_api, sleeping_job
+
+
+class OfflineSimManager(DockerSimManager):
+    def _authenticate_at_container_registry(self):
+        pass
+
+
+class TestDockerSimManager(unittest.TestCase):
+
+    def setUp(self) -> None:
+        logger.remove()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_directory = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def manager(self, docker_client, max_workers=2, **kwargs):
+        return OfflineSimManager('fake/sim-image', max_workers, self.data_directory, docker_client=docker_client,
+                                 **kwargs)
+
+    def test_start_computation_writes_logs(self):
+        manager = self.manager(FakeDockerClient())
+        for i in range(5):
+            manager.add_sim_job(SimJob(f'job{i}', None, command=f'-r {i}'))
+        manager.start_computation()
+        for i in range(5):
+            self.assertEqual(self.data_directory.joinpath(f'job_job{i}', 'log.txt').read_text(), f'-r {i} finished\n')
+
+    def test_stream_computation_is_bounded(self):
+        consumed = []
+        completed = []
+
+        def jobs():
+            for i in range(40):
+                consumed.append(i)
+                yield SimJob(f'job{i}', None)
+
+        manager = self.manager(FakeDockerClient(job=sleeping_job(0.002)), max_workers=3)
+        for sim_job, succeeded in manager.stream_computation(jobs(), buffer_size=2):
+            completed.append(sim_job)
+            self.assertTrue(succeeded)
+            self.assertLessEqual(len(consumed) - len(completed), 5)
+        self.assertEqual(len(completed), 40)
+
+    def test_add_jobs_while_running(self):
+        manager = self.manager(FakeDockerClient(job=sleeping_job(0.002)))
+
+        def producer():
+            time.sleep(0.02)
+            for i in range(5):
+                manager.add_sim_job(SimJob(f'late{i}', None))
+            manager.close_job_queue()
+
+        threading.Thread(target=producer).start()
+        names = [sim_job.sim_name for sim_job, _ in manager.stream_computation(
+            (SimJob(f'job{i}', None) for i in range(3)), wait_for_jobs=True)]
+        self.assertEqual(sorted(names), [f'job{i}' for i in range(3)] + [f'late{i}' for i in range(5)])
+
+    def test_jobs_added_while_a_slow_job_runs_start_right_away(self):
+        def job(command, host_dir):
+            time.sleep(1.0 if command == ['slow'] else 0.01)
+            return 0, b''
+
+        manager = self.manager(FakeDockerClient(job=job), max_workers=2)
+        # a close signal of an earlier computation does not end the next one
+        manager.close_job_queue()
+        finished_at = {}
+        started = time.monotonic()
+
+        def producer():
+            time.sleep(0.1)
+            manager.add_sim_job(SimJob('quick', None))
+            time.sleep(0.1)
+            manager.close_job_queue()
+
+        threading.Thread(target=producer).start()
+        for sim_job, succeeded in manager.stream_computation([SimJob('slow', None, command='slow')],
+                                                             wait_for_jobs=True):
+            finished_at[sim_job.sim_name] = time.monotonic() - started
+        self.assertEqual(sorted(finished_at), ['quick', 'slow'])
+        self.assertLess(finished_at['quick'], 0.5)
+
+    def test_warm_containers_are_reused_and_recycled(self):
+        def job(command, host_dir):
+            host_dir.joinpath('out.txt').write_text(' '.join(command))
+            return (1 if 'fail' in command else 0), b'done'
+
+        docker_client = FakeDockerClient(job=job, entrypoint=['python', './sim.py'])
+        manager = self.manager(docker_client, max_workers=2, warm_containers=True, jobs_per_container=5)
+        jobs = [SimJob(f'job{i}', None, command='-o /mnt/data/out') for i in range(20)]
+        jobs.append(SimJob('failing', None, command='fail'))
+        results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(jobs))
+
+        self.assertFalse(results.pop('failing'))
+        self.assertTrue(all(results.values()))
+        self.assertEqual(self.data_directory.joinpath('job_job3', 'out.txt').read_text(),
+                         'python /usr/src/app/sim.py -o /mnt/pool/job_job3/out')
+        self.assertEqual(self.data_directory.joinpath('job_job3', 'log.txt').read_bytes(), b'done')
+        self.assertGreaterEqual(docker_client.containers.created, 5)
+        self.assertLessEqual(docker_client.containers.created, 8)
+        self.assertEqual(docker_client.containers.list(all=True), [])
+
+    def test_monitor_stops_inactive_containers(self):
+        threads = set()
+
+        def job(command, host_dir):
+            def output():
+                if 'chatty' in command:
+                    threads.update(thread.name for thread in threading.enumerate())
+                    for _ in range(30):
+                        time.sleep(0.01)
+                        yield b'.'
+                else:
+                    yield b'started'
+                    while True:
+                        time.sleep(0.01)
+                        yield b''
+            return 0, output()
+
+        manager = self.manager(FakeDockerClient(job=job))
+        manager._minimum_runtime = 0.05
+        manager._maximum_inactivity_time = 0.1
+        tic = time.perf_counter()
+        results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(
+            [SimJob('hung', None), SimJob('chatty', None, command='chatty')]))
+        self.assertLess(time.perf_counter() - tic, 2)
+        self.assertEqual(results, {'hung': False, 'chatty': True})
+        self.assertEqual(self.data_directory.joinpath('job_hung', 'log.txt').read_text(), 'started')
+        self.assertEqual(self.data_directory.joinpath('job_chatty', 'log.txt').read_text(), '.' * 30)
+        # log activity comes from the manager's own log streams, the monitor only follows the events
+        self.assertIn('monitoring-events', threads)
+        self.assertFalse([name for name in threads if name.startswith('logs-')])
+
+    def test_monitor_shuts_down(self):
+        manager = self.manager(FakeDockerClient())
+        manager.add_sim_job(SimJob('job', None))
+        manager.start_computation()
+        time.sleep(0.05)
+        self.assertFalse([thread for thread in threading.enumerate() if thread.name.startswith('monitoring')])
+
+    def test_compressed_log_rotation(self):
+        def job(command, host_dir):
+            return 0, (f'line {i}\n'.encode('utf-8') for i in range(1000))
+
+        manager = self.manager(FakeDockerClient(job=job), log_compression='gzip', log_max_bytes=4000,
+                               log_backup_count=2)
+        manager.add_sim_job(SimJob('job', None))
+        manager.start_computation()
+        job_dir = self.data_directory.joinpath('job_job')
+        logs = [gzip.decompress(job_dir.joinpath(name).read_bytes())
+                for name in ('log.txt.gz.2', 'log.txt.gz.1', 'log.txt.gz')]
+        self.assertFalse(job_dir.joinpath('log.txt.gz.3').exists())
+        self.assertEqual([len(log) for log in logs[:2]], [4000, 4000])
+        self.assertTrue(b''.join(logs).endswith(b'line 999\n'))
+
+    def test_log_size_cap(self):
+        manager = self.manager(FakeDockerClient(job=lambda command, host_dir: (0, b'x' * 5000)), log_max_bytes=1000)
+        manager.add_sim_job(SimJob('job', None))
+        manager.start_computation()
+        self.assertEqual(self.data_directory.joinpath('job_job', 'log.txt').read_bytes(),
+                         b'x' * 1000 + b'\n[log truncated: 4000 bytes dropped]\n')
+
+    def test_result_cache(self):
+        def job(command, host_dir):
+            host_dir.joinpath('result.txt').write_text(' '.join(command))
+            return 0, b'computed'
+
+        docker_client = FakeDockerClient(job=job)
+        cache_directory = self.data_directory.joinpath('cache')
+        for run, commands in enumerate((['-r 1', '-r 2'], ['-r 1', '-r 3'])):
+            manager = OfflineSimManager('fake/sim-image', 2, self.data_directory.joinpath(f'run{run}'),
+                                        docker_client=docker_client, cache_directory=cache_directory)
+            for command in commands:
+                manager.add_sim_job(SimJob(command.replace(' ', ''), None, command=command))
+            manager.start_computation()
+        self.assertEqual(manager._result_cache.stats()['hits'], 1)
+        self.assertEqual(manager._result_cache.stats()['misses'], 1)
+        self.assertEqual(docker_client.containers.created, 3)
+        self.assertEqual(self.data_directory.joinpath('run1', 'job_-r1', 'result.txt').read_text(), '-r 1')
+        self.assertEqual(self.data_directory.joinpath('run1', 'job_-r1', 'log.txt').read_text(), 'computed')
+
+    def test_result_cache_rerun_into_same_directory(self):
+        def job(command, host_dir):
+            host_dir.joinpath('result.txt').write_text(' '.join(command))
+            return 0, b'computed'
+
+        docker_client = FakeDockerClient(job=job)
+        cache_directory = self.data_directory.joinpath('cache')
+        for commands in (['-r 1', '-r 2'], ['-r 1', '-r 2', '-r 3']):
+            manager = self.manager(docker_client, cache_directory=cache_directory)
+            results = list(manager.stream_computation(SimJob(command.replace(' ', ''), None, command=command)
+                                                      for command in commands))
+            self.assertTrue(all(succeeded for _, succeeded in results))
+        self.assertEqual(manager._result_cache.stats()['hits'], 2)
+        self.assertEqual(docker_client.containers.created, 3)
+        self.assertEqual(self.data_directory.joinpath('job_-r2', 'result.txt').read_text(), '-r 2')
+        self.assertEqual(manager._journal.job('-r1')['state'], SUCCEEDED)
+
+    def test_result_cache_eviction(self):
+        cache = ResultCache(self.data_directory.joinpath('cache'), max_bytes=250)
+        for i in range(3):
+            job_dir = self.data_directory.joinpath(f'job{i}')
+            job_dir.mkdir()
+            job_dir.joinpath('result.bin').write_bytes(bytes(100))
+            cache.store(f'{i:064x}', job_dir, runtime=1.0)
+            if i == 1:
+                self.assertTrue(cache.fetch(f'{0:064x}', self.data_directory.joinpath('restored')))
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertFalse(cache.fetch(f'{1:064x}', self.data_directory.joinpath('missing')))
+        self.assertTrue(cache.fetch(f'{2:064x}', self.data_directory.joinpath('restored2')))
+
+    def test_resume(self):
+        attempts = collections.Counter()
+        release = threading.Event()
+
+        def job(command, host_dir):
+            name = command[0]
+            attempts[name] += 1
+            if name == 'adopted':
+                release.wait(5)
+            if host_dir is not None:
+                host_dir.joinpath('result.txt').write_text(name)
+            return (1 if name == 'flaky' and attempts[name] == 1 else 0), b''
+
+        def jobs():
+            return [SimJob(name, None, command=name) for name in ('ok', 'flaky', 'adopted')]
+
+        docker_client = FakeDockerClient(job=job)
+        manager = self.manager(docker_client)
+        results = dict(manager.stream_computation(jobs()[:2]))
+        self.assertEqual([succeeded for _, succeeded in sorted(results.items(), key=lambda r: r[0].sim_name)],
+                         [False, True])
+
+        # simulate a crash of the manager while 'adopted' was running
+        manager._journal.record('adopted', QUEUED, command='adopted')
+        manager._journal.record('adopted', RUNNING)
+        working_dir = self.data_directory.joinpath('job_adopted')
+        working_dir.mkdir()
+        labels = {DATA_DIRECTORY_LABEL: str(self.data_directory.resolve())}
+        docker_client.containers.run(manager._docker_image, command='adopted', name='DockerSim_adopted', detach=True,
+                                     mounts=[Mount(target='/mnt/data', source=str(working_dir), type='bind')],
+                                     working_dir='/mnt/data', labels=labels)
+        docker_client.containers.run(manager._docker_image, command='stale', name='DockerSim_stale', labels=labels)
+
+        manager = self.manager(docker_client)
+        threading.Timer(0.05, release.set).start()
+        results = dict((sim_job.sim_name, succeeded)
+                       for sim_job, succeeded in manager.stream_computation(jobs(), resume=True))
+        self.assertEqual(results, {'ok': True, 'flaky': True, 'adopted': True})
+        self.assertEqual(attempts, {'ok': 1, 'flaky': 2, 'adopted': 1, 'stale': 1})
+        self.assertEqual(working_dir.joinpath('result.txt').read_text(), 'adopted')
+        self.assertEqual(docker_client.containers.list(all=True), [])
+        self.assertEqual(manager._journal.counts(), {SUCCEEDED: 3})
+        self.assertEqual(manager._journal.job('flaky')['attempts'], 2)
+
+    def test_resume_list_command(self):
+        docker_client = FakeDockerClient(job=lambda command, host_dir: (0, b''))
+        for command, created in ((['-r', '1'], 1), (['-r', '1'], 1), (['-r', '2'], 2), ('-r 2', 3)):
+            manager = self.manager(docker_client)
+            results = list(manager.stream_computation([SimJob('list', None, command=command)], resume=True))
+            self.assertEqual([succeeded for _, succeeded in results], [True])
+            self.assertEqual(docker_client.containers.created, created)
+        self.assertEqual(manager._journal.job('list')['command'], '-r 2')
+
+    def test_resource_scheduler_packs_disjoint_cores(self):
+        scheduler = ResourceScheduler(cores=range(8), memory=parse_memory('4g'))
+        big = scheduler.try_acquire(cpus=4, memory='1g')
+        small = [scheduler.try_acquire(cpus=0.5, memory='512m') for _ in range(4)]
+        self.assertEqual(big.container_kwargs(), {'nano_cpus': 4000000000, 'cpuset_cpus': '0,1,2,3',
+                                                  'mem_limit': 1024 ** 3})
+        cores = big.cores + [core for allocation in small for core in allocation.cores]
+        self.assertEqual(sorted(cores), list(range(8)))
+
+        self.assertIsNone(scheduler.try_acquire(cpus=1, memory='2g'))
+        scheduler.release(big)
+        self.assertEqual(scheduler.try_acquire(cpus=1, memory='2g').cores, [0])
+        self.assertIsNone(scheduler.try_acquire(cpus=1, memory='2g'))
+        with self.assertRaises(ValueError):
+            scheduler.validate(cpus=9)
+
+    def test_schedule_resources(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def job(command, host_dir):
+            with lock:
+                running.append(float(command[0]))
+                peak.append(sum(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(float(command[0]))
+            return 0, b''
+
+        docker_client = FakeDockerClient(job=job, cpus=4)
+        manager = self.manager(docker_client, max_workers=8, schedule_resources=True)
+        jobs = [SimJob(f'job{i}', None, command=str(cpus), cpus=cpus) for i, cpus in enumerate([1, 4, 0.5, 2] * 5)]
+        jobs.append(SimJob('too_big', None, cpus=5))
+        results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(jobs))
+        self.assertFalse(results.pop('too_big'))
+        self.assertTrue(all(results.values()))
+        self.assertLessEqual(max(peak), 4)
+
+    def test_jobs_wait_for_resources_on_no_host(self):
+        def job(command, host_dir):
+            time.sleep(1 if command == ['long'] else 0.01)
+            return 0, b''
+
+        # the long job takes all cores of node0, which still has the most free slots
+        hosts = [DockerHost(FakeDockerClient(job=job, cpus=4), max_workers=workers, name=f'node{i}')
+                 for i, workers in enumerate([4, 2])]
+        manager = self.manager(None, max_workers=6, hosts=hosts, schedule_resources=True)
+        jobs = [SimJob('long', None, command='long', cpus=4)] + [SimJob(f'job{i}', None, cpus=1) for i in range(4)]
+        tic = time.monotonic()
+        finished = []
+        for sim_job, succeeded in manager.stream_computation(jobs):
+            self.assertTrue(succeeded)
+            finished.append((sim_job.sim_name, time.monotonic() - tic))
+        self.assertEqual(finished[-1][0], 'long')
+        self.assertLess(max(seconds for _, seconds in finished[:-1]), 0.5)
+
+        # a job, which does not fit, is bypassed at most max_bypass times
+        host = DockerHost(FakeDockerClient(), max_workers=4, name='node')
+        host.resource_scheduler = ResourceScheduler(cores=range(2))
+        pool = HostPool([host], max_bypass=1)
+        _, first = pool.acquire(cpus=1)
+        order = []
+
+        def acquire(name, cpus):
+            _, allocation = pool.acquire(cpus=cpus)
+            order.append(name)
+            time.sleep(0.02)
+            pool.release(host, allocation)
+
+        threads = [threading.Thread(target=acquire, args=('big', 2))]
+        threads[0].start()
+        time.sleep(0.01)
+        for i in range(3):
+            threads.append(threading.Thread(target=acquire, args=(f'small{i}', 1)))
+            threads[-1].start()
+            time.sleep(0.01)
+        pool.release(host, first)
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(order[:2], ['small0', 'big'])
+
+    def test_jobs_are_balanced_across_hosts(self):
+        hosts = [DockerHost(FakeDockerClient(job=sleeping_job(0.01)), max_workers=workers, name=f'node{i}')
+                 for i, workers in enumerate([1, 3])]
+        manager = self.manager(None, max_workers=8, hosts=hosts)
+        results = list(manager.stream_computation(SimJob(f'job{i}', None) for i in range(20)))
+        self.assertTrue(all(succeeded for _, succeeded in results))
+        self.assertEqual([host.docker_client.images.pulls for host in hosts], [1, 1])
+        self.assertEqual(sum(host.docker_client.containers.created for host in hosts), 20)
+        self.assertGreater(hosts[1].docker_client.containers.created, hosts[0].docker_client.containers.created)
+
+    def test_results_are_copied_back_from_remote_hosts(self):
+        def job(command, host_dir):
+            host_dir.joinpath('result').mkdir()
+            host_dir.joinpath('result', 'pi.txt').write_text(command[0])
+            return 0, b'computed'
+
+        host = DockerHost(FakeDockerClient(job=job), max_workers=2, name='remote', shared_storage=False)
+        manager = self.manager(None, hosts=[host])
+        manager.add_sim_job(SimJob('job0', None, command='3.14'))
+        manager.start_computation()
+        working_dir = self.data_directory.joinpath('job_job0')
+        self.assertEqual(working_dir.joinpath('result', 'pi.txt').read_text(), '3.14')
+        self.assertEqual(working_dir.joinpath('log.txt').read_text(), 'computed')
+        self.assertEqual(host.docker_client.containers.by_name, {})
+
+    def test_jobs_of_a_failed_host_are_rescheduled(self):
+        started = threading.Event()
+
+        def hanging_job(command, host_dir):
+            started.set()
+            time.sleep(0.2)
+            return 0, b''
+
+        failing = DockerHost(FakeDockerClient(job=hanging_job), max_workers=2, name='failing')
+        healthy = DockerHost(FakeDockerClient(job=sleeping_job(0.005)), max_workers=2, name='healthy')
+        manager = self.manager(None, max_workers=4, hosts=[failing, healthy])
+
+        def fail_host():
+            started.wait(2)
+            failing.docker_client.fail()
+
+        threading.Thread(target=fail_host).start()
+        results = list(manager.stream_computation(SimJob(f'job{i}', None) for i in range(10)))
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(succeeded for _, succeeded in results))
+        self.assertFalse(failing.healthy)
+
+    def test_pull_policies(self):
+        docker_client = FakeDockerClient()
+        self.manager(docker_client)
+        self.assertEqual((docker_client.images.pulls, docker_client.images.registry_queries), (1, 0))
+        manager = self.manager(docker_client)
+        self.assertEqual((docker_client.images.pulls, docker_client.images.registry_queries), (1, 1))
+        self.assertIn('image', manager.startup_timings)
+        docker_client.remote_revision = 1
+        self.manager(docker_client, pull_policy='if-not-present')
+        self.assertEqual(docker_client.images.pulls, 1)
+        updated = self.manager(docker_client)
+        self.assertEqual((docker_client.images.pulls, docker_client.images.registry_queries), (2, 2))
+        self.assertEqual(updated._docker_image.id, docker_client.images.get('fake/sim-image').id)
+        self.manager(docker_client, pull_policy='never')
+        self.assertEqual(docker_client.images.pulls, 2)
+        with self.assertRaises(RuntimeError):
+            self.manager(FakeDockerClient(), pull_policy='never')
+
+    def test_registry_login_is_lazy(self):
+        logins = []
+
+        class LazyLoginManager(DockerSimManager):
+            def _authenticate_at_container_registry(self):
+                logins.append(True)
+                for host in self._hosts:
+                    host.docker_client.login(username='user', password='token', registry='ghcr.io')
+
+        docker_client = FakeDockerClient(registry_auth=True)
+        manager = LazyLoginManager('fake/sim-image', 2, self.data_directory, docker_client=docker_client)
+        self.assertEqual((len(logins), docker_client.images.pulls), (1, 1))
+        self.assertIn('authentication', manager.startup_timings)
+        LazyLoginManager('fake/sim-image', 2, self.data_directory, docker_client=docker_client,
+                         pull_policy='if-not-present')
+        self.assertEqual(len(logins), 1)
+
+    def test_registry_errors_fall_back_to_local_image(self):
+        response = Response()
+        response.status_code = 500
+        docker_client = FakeDockerClient()
+        self.manager(docker_client)
+        for error in (APIError('registry unreachable', response=response), NotFound('manifest unknown')):
+            with mock.patch.object(docker_client.images, 'get_registry_data', side_effect=error), \
+                    mock.patch.object(OfflineSimManager, '_authenticate_at_container_registry',
+                                      side_effect=AssertionError('no login expected')):
+                manager = self.manager(docker_client)
+            self.assertEqual(manager._docker_image.id, docker_client.images.get('fake/sim-image').id)
+        self.assertEqual((docker_client.images.pulls, docker_client.logins), (1, 0))
+
+    def test_telemetry_is_bounded(self):
+        table_path = self.data_directory.joinpath('telemetry.csv')
+        telemetry = Telemetry(stats_interval=None, table_path=table_path)
+        telemetry.start()
+        for i in range(50):
+            job = telemetry.job(f'job{i}')
+            job.start()
+            job.finish(0 if i % 10 else 1, i % 10 != 0)
+            telemetry.complete(f'job{i}')
+        self.assertEqual(telemetry._open, {})
+        telemetry.stop()
+        self.assertEqual([telemetry.summary(2)[key] for key in ('jobs', 'failed')], [50, 5])
+        with open(table_path, newline='') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 50)
+
+        reservoir = Reservoir(size=10)
+        for i in range(1000):
+            reservoir.add(i)
+        self.assertEqual((reservoir.count, len(reservoir.values)), (1000, 10))
+        self.assertGreater(max(reservoir.values), 9)
+
+    def templates(self):
+        templates = self.data_directory.joinpath('templates')
+        templates.joinpath('config').mkdir(parents=True)
+        templates.joinpath('map.bin').write_bytes(bytes(range(256)) * 64)
+        templates.joinpath('config', 'params.json').write_text('{"samples": 10}')
+        return templates
+
+    def test_template_staging(self):
+        templates = self.templates()
+        inode = templates.joinpath('map.bin').stat().st_ino
+
+        def job(command, host_dir):
+            shared = host_dir.joinpath('map.bin').stat().st_ino == inode
+            host_dir.joinpath('out.txt').write_text(
+                f"{len(host_dir.joinpath('map.bin').read_bytes())} "
+                f"{host_dir.joinpath('config', 'params.json').read_text()} {shared}")
+            return 0, b''
+
+        for strategy in ('hardlink', 'reflink', 'copy'):
+            manager = self.manager(FakeDockerClient(job=job), template_staging=strategy)
+            jobs = [SimJob(f'{strategy}{i}', templates) for i in range(4)]
+            self.assertTrue(all(succeeded for _, succeeded in manager.stream_computation(jobs)))
+            for i in range(4):
+                working_dir = self.data_directory.joinpath(f'job_{strategy}{i}')
+                self.assertEqual(working_dir.joinpath('out.txt').read_text(),
+                                 f'16384 {{"samples": 10}} {strategy == "hardlink"}')
+                self.assertEqual(sorted(path.name for path in working_dir.iterdir()), ['log.txt', 'out.txt'])
+        self.assertEqual(templates.joinpath('map.bin').read_bytes(), bytes(range(256)) * 64)
+        self.assertEqual(templates.joinpath('config', 'params.json').read_text(), '{"samples": 10}')
+
+    def test_bind_mounted_templates(self):
+        templates = self.templates()
+        docker_client = FakeDockerClient()
+        manager = self.manager(docker_client, template_staging='bind')
+        manager.add_sim_job(SimJob('job0', templates))
+        manager.start_computation()
+        mounts = dict((mount['Target'], mount) for mount in docker_client.containers.mounts['DockerSim_job0'])
+        self.assertEqual(mounts['/mnt/data/map.bin']['Source'], str(templates.joinpath('map.bin').resolve()))
+        self.assertTrue(mounts['/mnt/data/config']['ReadOnly'])
+        self.assertEqual(sorted(path.name for path in self.data_directory.joinpath('job_job0').iterdir()),
+                         ['log.txt'])
+        self.assertEqual(templates.joinpath('config', 'params.json').read_text(), '{"samples": 10}')
+        with self.assertRaises(ValueError):
+            self.manager(docker_client, template_staging='bind', warm_containers=True)
+
+    def test_telemetry(self):
+        docker_client = FakeDockerClient(job=sleeping_job(0.2))
+        prometheus_textfile = self.data_directory.joinpath('docker_sim.prom')
+        manager = self.manager(docker_client, stats_interval=0.02, prometheus_textfile=prometheus_textfile)
+        for i in range(4):
+            manager.add_sim_job(SimJob(f'job{i}', None, command=f'-r {i}'))
+        manager.start_computation()
+        summary = manager.telemetry_summary
+        self.assertEqual((summary['jobs'], summary['succeeded']), (4, 4))
+        self.assertGreater(summary['latency_p95_seconds'], 0.2)
+        # two workers for four jobs: the second pair waits for the first
+        self.assertGreater(summary['queue_wait_p95_seconds'], 0.15)
+        self.assertGreater(docker_client.stats_queries, 0)
+
+        telemetry_file, = self.data_directory.glob('docker_sim_telemetry_*.csv')
+        with open(telemetry_file, newline='') as f:
+            rows = dict((row['name'], row) for row in csv.DictReader(f))
+        self.assertEqual(sorted(rows), [f'job{i}' for i in range(4)])
+        for row in rows.values():
+            self.assertEqual((row['succeeded'], row['exit_code'], row['host']), ('True', '0', 'local'))
+            self.assertGreater(float(row['run_seconds']), 0.15)
+            self.assertGreater(float(row['init_seconds']), 0)
+            self.assertGreater(int(row['stats_samples']), 0)
+            self.assertGreater(float(row['cpu_seconds']), 0)
+            self.assertGreater(int(row['memory_peak_bytes']), 0)
+
+        metrics = prometheus_textfile.read_text()
+        self.assertIn('docker_sim_jobs{status="succeeded"} 4', metrics)
+        self.assertIn('docker_sim_job_latency_seconds{quantile="0.95"}', metrics)
+        self.assertIn('docker_sim_phase_seconds{phase="run"}', metrics)
+
+    def test_result_aggregation(self):
+        import numpy as np
+
+        def job(command, host_dir):
+            i = int(command[-1])
+            if i == 3:
+                return 0, b'no record\n'
+            n_samples = 1000 * (i + 1)
+            host_dir.joinpath('result.json').write_text(json.dumps({
+                'simulation': 'monte_carlo_pi', 'iterations': n_samples, 'pi_estimate': 3.0 + i / 10,
+                'n_samples': n_samples, 'standard_error': 0.01, 'output_files': [f'plot{i}.png']}))
+            return (1 if i == 4 else 0), b''
+
+        manager = self.manager(FakeDockerClient(job=job), aggregate_results='npz')
+        for i in range(5):
+            manager.add_sim_job(SimJob(f'job{i}', None, command=f'-r {i}'))
+        manager.start_computation()
+
+        # job3 wrote no record, the estimate of the failed job4 is not merged
+        weights = [1000, 2000, 3000]
+        pi = manager.result_summary['estimates']['pi']
+        self.assertEqual(manager.result_summary['records'], 4)
+        self.assertEqual((pi['n_samples'], pi['jobs']), (6000, 3))
+        self.assertAlmostEqual(pi['estimate'], sum(w * (3.0 + i / 10) for i, w in enumerate(weights)) / 6000)
+        self.assertAlmostEqual(pi['standard_error'], math.sqrt(sum((w * 0.01) ** 2 for w in weights)) / 6000)
+
+        with np.load(self.data_directory.joinpath('docker_sim_results.npz')) as results:
+            order = np.argsort(results['job'])
+            self.assertEqual(list(results['job'][order]), ['job0', 'job1', 'job2', 'job4'])
+            self.assertEqual(list(results['succeeded'][order]), [True, True, True, False])
+            self.assertEqual(results['n_samples'].dtype, np.int64)
+            self.assertEqual(json.loads(results['output_files'][order][1]), ['plot1.png'])
+        summary = json.loads(self.data_directory.joinpath('docker_sim_results_summary.json').read_text())
+        self.assertEqual(summary['estimates']['pi']['jobs'], 3)
+        with self.assertRaises(ValueError):
+            self.manager(FakeDockerClient(), aggregate_results='xlsx')
+
+    def test_parameter_sweep(self):
+        sweep = ParameterSweep('-g {grid_size} -i {invaders}', {'grid_size': range(1, 4), 'invaders': [10, 20]},
+                               name='art_{grid_size}_{invaders}')
+        manager = self.manager(FakeDockerClient())
+        manager.start_computation(jobs=chain_sweeps(sweep, ParameterSweep('-r {r}', {'r': [1, 2]})))
+        self.assertEqual(len(sweep), 6)
+        self.assertEqual(sweep.point(1), {'grid_size': 1, 'invaders': 20})
+        self.assertEqual(self.data_directory.joinpath('job_art_3_20', 'log.txt').read_text(), '-g 3 -i 20 finished\n')
+        self.assertTrue(self.data_directory.joinpath('job_sweep1', 'log.txt').exists())
+        with self.assertRaises(ValueError):
+            ParameterSweep('-g {grid_size}', {'grid_size': [1], 'invaders': [1, 2]})
+
+    def test_parameter_sweep_duplicates(self):
+        grid = ParameterSweep('-s {scale:.1f}', {'scale': [0.1, 0.12, 0.2]})
+        self.assertEqual([job.command for job in grid.jobs()], ['-s 0.1', '-s 0.2'])
+        sweep = ParameterSweep('-n {n}', {'n': IntUniform(1, 4)}, 'random', samples=100, seed=1)
+        self.assertEqual(sorted(job.command for job in sweep.jobs()), ['-n 1', '-n 2', '-n 3', '-n 4'])
+        self.assertEqual(sweep.duplicates, 96)
+        # a bounded window forgets old commands
+        sweep = ParameterSweep('-n {n}', {'n': IntUniform(1, 4)}, 'random', samples=100, seed=1, dedup_window=1)
+        self.assertGreater(len(list(sweep.jobs())), 4)
+
+    def test_parameter_sweep_sampling(self):
+        parameters = {'a': Uniform(-1, 1), 'b': LogUniform(1, 1000), 'c': Choice(['x', 'y'])}
+        lhs = ParameterSweep('-a {a} -b {b} -c {c}', parameters, 'lhs', samples=500, seed=7)
+        points = [lhs.point(i) for i in range(500)]
+        # every stratum of every dimension is hit exactly once
+        self.assertEqual(sorted(int((point['a'] + 1) / 2 * 500) for point in points), list(range(500)))
+        self.assertEqual(sorted(int(math.log10(point['b']) / 3 * 500) for point in points), list(range(500)))
+        self.assertEqual(collections.Counter(point['c'] for point in points), {'x': 250, 'y': 250})
+        self.assertEqual(points[42], ParameterSweep('-a {a} -b {b} -c {c}', parameters, 'lhs', samples=500,
+                                                    seed=7).point(42))
+        self.assertNotEqual(points[42], ParameterSweep('-a {a} -b {b} -c {c}', parameters, 'lhs', samples=500,
+                                                       seed=8).point(42))
+
+    def test_parameter_sweep_shards(self):
+        for sweep in [ParameterSweep('-x {x} -y {y}', {'x': range(7), 'y': range(3)}),
+                      ParameterSweep('-x {x}', {'x': Uniform(0, 1)}, 'lhs', samples=50)]:
+            shards = [[job.command for job in sweep.jobs(shard, 4)] for shard in range(4)]
+            commands = [command for shard in shards for command in shard]
+            self.assertEqual(len(set(commands)), len(sweep))
+            self.assertEqual(sorted(commands), sorted(job.command for job in sweep.jobs()))
+        with self.assertRaises(ValueError):
+            next(sweep.jobs(4, 4))
+        # points rendering the same command fall into the same shard
+        sweep = ParameterSweep('-n {n}', {'n': IntUniform(1, 4)}, 'random', samples=100, seed=1)
+        commands = [job.command for shard in range(3) for job in sweep.jobs(shard, 3)]
+        self.assertEqual(sorted(commands), ['-n 1', '-n 2', '-n 3', '-n 4'])
+
+    def test_runtime_model(self):
+        history = RuntimeHistory(self.data_directory.joinpath('runtimes.sqlite'))
+        for g, i, s, n in itertools.product([1, 5, 10], [10, 30], [500, 1000, 2000], [5, 50]):
+            history.record('art', ['-g', str(g), '-i', str(i), '-s', str(s), '-o', '/mnt/data', '-n', str(n)],
+                           1e-9 * n * s * s * (1 + g * i / 300))
+        history.record('art', '-g 1 -i 10 -s 500 -o /mnt/data -n 5', 0.002)
+        model = history.model('art')
+        self.assertEqual(command_parameters('-g 10 -i=30 -o /mnt/data --samples 5'),
+                         {'-g': 10.0, '-i': 30.0, '--samples': 5.0})
+        # the median of the recorded runs of a known command, the fitted power law for unseen ones
+        self.assertAlmostEqual(model.predict('-g 1 -i 10 -s 500 -o /mnt/data -n 5'),
+                               (0.002 + 1e-9 * 5 * 500 * 500 * (1 + 10 / 300)) / 2)
+        self.assertAlmostEqual(model.predict('-g 10 -i 30 -s 5000 -o /mnt/data -n 50'), 2.5, delta=0.5)
+        self.assertIsNone(history.model('pi').predict('-i 100'))
+        # only the last runs of a command are kept
+        for seconds in range(30):
+            history.record('pi', '-i 100', float(seconds))
+        rows = history._connection.execute('SELECT seconds FROM runtimes WHERE image=?', ('pi',)).fetchall()
+        self.assertEqual(sorted(seconds for seconds, in rows), [float(seconds) for seconds in range(20, 30)])
+
+    def test_longest_predicted_first(self):
+        started = []
+
+        def job(command, host_dir):
+            started.append(' '.join(command))
+            return 0, b''
+
+        runtime_history = self.data_directory.joinpath('runtimes.sqlite')
+        history = RuntimeHistory(runtime_history)
+        for iterations in [10, 100, 1000]:
+            history.record('fake/sim-image:latest', f'-i {iterations}', iterations / 1000)
+        manager = self.manager(FakeDockerClient(job=job), max_workers=1, job_order='lpt',
+                               runtime_history=runtime_history)
+        manager.add_sim_job(SimJob('small', None, command='-i 50'))
+        manager.start_computation(jobs=[SimJob('large', None, command='-i 5000'),
+                                        SimJob('unknown', None, command='-x 1'),
+                                        SimJob('medium', None, command='-i 500')])
+        self.assertEqual(started, ['-i 5000', '-i 500', '-i 50', '-x 1'])
+        # successful runs extend the history
+        self.assertEqual(len(history.model('fake/sim-image:latest').exact), 7)
+        # without ordering or fusion, no history is kept
+        manager = OfflineSimManager('fake/sim-image', 1, self.data_directory.joinpath('fifo'),
+                                    docker_client=FakeDockerClient())
+        manager.start_computation(jobs=[SimJob('job', None)])
+        self.assertFalse(self.data_directory.joinpath('fifo', 'docker_sim_runtimes.sqlite').exists())
+
+        self.assertEqual(list(longest_first(range(6), lambda x: x % 3, window=2)), [1, 2, 0, 4, 5, 3])
+        with self.assertRaises(ValueError):
+            self.manager(FakeDockerClient(), job_order='random')
+
+    def test_job_fusion(self):
+        def job(command, host_dir):
+            return (1 if command == ['fail'] else 0), f'{" ".join(command)} finished\n'.encode('utf-8')
+
+        docker_client = FakeDockerClient(job=job)
+        history = RuntimeHistory(self.data_directory.joinpath('docker_sim_runtimes.sqlite'))
+        history.record('fake/sim-image:latest', '-i 100000', 60.0)
+        manager = self.manager(docker_client, fuse_jobs=4, fuse_unknown_jobs=True, log_compression='gzip')
+        jobs = [SimJob(f'job{i}', None, command='fail' if i == 3 else f'-o /mnt/data -r {i}') for i in range(9)]
+        jobs.append(SimJob('long', None, command='-i 100000'))
+        results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(jobs))
+
+        self.assertEqual(results, dict((sim_job.sim_name, sim_job.sim_name != 'job3') for sim_job in jobs))
+        # 9 short jobs in batches of 4, 4 and 1, the long job in its own container
+        self.assertEqual(docker_client.containers.created, 4)
+        self.assertEqual(docker_client.containers.list(all=True), [])
+        job_dir = self.data_directory.joinpath('job_job5')
+        with gzip.open(job_dir.joinpath('log.txt.gz'), 'rt') as f:
+            self.assertEqual(f.read(), '-o /mnt/jobs/job_job5 -r 5 finished\n')
+        self.assertEqual(json.loads(job_dir.joinpath('exit_status.json').read_text())['exit_code'], 0)
+        self.assertEqual(manager._journal.job('job3')['exit_code'], 1)
+        # only the batch of the failed job is kept
+        self.assertEqual(sorted(path.name for path in self.data_directory.glob('batch_*')), ['batch_job0'])
+        self.assertEqual(manager.telemetry_summary['jobs'], 10)
+        self.assertEqual(len(history.model('fake/sim-image:latest').exact), 9)
+        with self.assertRaises(ValueError):
+            self.manager(docker_client, fuse_jobs=4, warm_containers=True)
+
+    def test_jobs_without_history_are_not_fused(self):
+        history = self.data_directory.joinpath('docker_sim_runtimes.sqlite')
+        for run, containers in (('cold', 3), ('warm', 1)):
+            docker_client = FakeDockerClient()
+            manager = OfflineSimManager('fake/sim-image', 2, self.data_directory.joinpath(run),
+                                        docker_client=docker_client, fuse_jobs=4, runtime_history=history)
+            results = list(manager.stream_computation(SimJob(f'job{i}', None, command=f'-r {i}') for i in range(3)))
+            self.assertTrue(all(succeeded for _, succeeded in results))
+            self.assertEqual(docker_client.containers.created, containers, run)
+
+    def test_job_timeouts(self):
+        def job(command, host_dir):
+            time.sleep(5 if command == ['hang'] else 0.01)
+            return 0, b''
+
+        manager = self.manager(FakeDockerClient(job=job), job_timeout=2)
+        tic = time.monotonic()
+        results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(
+            [SimJob('hang', None, command='hang', timeout=0.1), SimJob('fast', None)]))
+        self.assertEqual(results, {'hang': False, 'fast': True})
+        self.assertLess(time.monotonic() - tic, 2)
+        self.assertEqual(manager._journal.job('hang')['exit_code'], TIMEOUT_EXIT_CODE)
+
+    def test_async_engine_timeouts(self):
+        docker_url = self.fake_api_server(job_time=5)
+        manager = self.manager(docker.DockerClient(base_url=docker_url), engine='asyncio', docker_url=docker_url,
+                               job_timeout=0.1)
+        tic = time.monotonic()
+        results = list(manager.stream_computation([SimJob('slow', None)]))
+        self.assertFalse(results[0][1])
+        self.assertLess(time.monotonic() - tic, 2)
+        self.assertEqual(manager._journal.job('slow')['exit_code'], TIMEOUT_EXIT_CODE)
+
+    def test_retry_policy(self):
+        response = Response()
+        response.status_code = 503
+        self.assertTrue(RetryPolicy.is_transient(APIError('unavailable', response=response)))
+        self.assertTrue(RetryPolicy.is_transient(DaemonConnectionError('reset')))
+        self.assertFalse(RetryPolicy.is_transient(ImageNotFound('no such image')))
+        self.assertFalse(RetryPolicy.is_transient(ValueError()))
+        policy = RetryPolicy(backoff=1.0, max_backoff=5.0, seed=0)
+        for attempt, ceiling in ((1, 1.0), (2, 2.0), (3, 4.0), (10, 5.0)):
+            self.assertTrue(ceiling / 2 <= policy.delay(attempt) <= ceiling)
+        detector = StragglerDetector(3.0, min_peers=3)
+        detector.add(1.0)
+        detector.add(2.0)
+        self.assertIsNone(detector.deadline(100.0))
+        detector.add(10.0)
+        self.assertEqual(detector.deadline(100.0), 106.0)
+
+    def test_transient_errors_are_retried(self):
+        docker_client = FakeDockerClient()
+        docker_client.fail_creates(2)
+        manager = self.manager(docker_client, max_workers=1, max_retries=2, retry_backoff=0.01)
+        results = list(manager.stream_computation([SimJob('job0', None), SimJob('job1', None)]))
+        self.assertTrue(all(succeeded for _, succeeded in results))
+        self.assertEqual(docker_client.containers.created, 2)
+
+        # retries are exhausted and client errors are not retried
+        docker_client.fail_creates(3)
+        docker_client.fail_creates(1, status_code=404)
+        manager = self.manager(docker_client, max_workers=1, max_retries=2, retry_backoff=0.01)
+        results = list(manager.stream_computation([SimJob('job2', None), SimJob('job3', None), SimJob('job4', None)]))
+        self.assertEqual([succeeded for _, succeeded in results], [False, False, True])
+        self.assertIsNone(manager._journal.job('job2')['exit_code'])
+        self.assertEqual(docker_client.containers.list(all=True), [])
+
+    def test_dropped_log_streams_are_reattached(self):
+        docker_client = FakeDockerClient(job=lambda command, host_dir: (0, (
+            time.sleep(0.2) or f'line {i}\n'.encode('utf-8') for i in range(3))))
+        manager = self.manager(docker_client, max_workers=1, max_retries=2, retry_backoff=0.01)
+        threading.Timer(0.3, docker_client.drop_log_streams).start()
+        results = list(manager.stream_computation([SimJob('job0', None)]))
+        self.assertTrue(results[0][1])
+        # the running container is followed again instead of being replaced by a new run
+        self.assertEqual(docker_client.containers.created, 1)
+        self.assertEqual(self.data_directory.joinpath('job_job0', 'log.txt').read_text(), 'line 0\nline 1\nline 2\n')
+
+    def test_speculative_execution(self):
+        def job(command, host_dir):
+            # the first run of the straggler hangs, its speculative copy runs as fast as its peers
+            time.sleep(5 if host_dir.name == 'job_straggler' else 0.02)
+            return 0, f'{host_dir.name} finished\n'.encode('utf-8')
+
+        docker_client = FakeDockerClient(job=job)
+        manager = self.manager(docker_client, max_workers=3, speculate=3.0)
+        jobs = [SimJob('straggler', None, command='-r 0')] + [SimJob(f'job{i}', None) for i in range(1, 8)]
+        tic = time.monotonic()
+        results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(jobs))
+        self.assertLess(time.monotonic() - tic, 2)
+        self.assertEqual(results, dict((sim_job.sim_name, True) for sim_job in jobs))
+        self.assertEqual(self.data_directory.joinpath('job_straggler', 'log.txt').read_text(),
+                         'job_straggler_speculative finished\n')
+        self.assertFalse(self.data_directory.joinpath('job_straggler_speculative').exists())
+        self.assertEqual(manager._journal.job('straggler')['state'], SUCCEEDED)
+        self.assertIsNone(manager._journal.job('straggler_speculative'))
+        self.assertEqual(docker_client.containers.created, 9)
+        self.assertEqual(docker_client.containers.list(all=True), [])
+        self.assertEqual(manager.telemetry_summary['failed'], 0)
+        with self.assertRaises(ValueError):
+            self.manager(docker_client, speculate=3.0, warm_containers=True)
+
+    def test_pending_speculative_run_is_cancelled(self):
+        def job(command, host_dir):
+            time.sleep(0.5 if host_dir.name == 'job_straggler' else 0.02)
+            return 0, f'{host_dir.name} finished\n'.encode('utf-8')
+
+        docker_client = FakeDockerClient(job=job)
+        # the straggler's copy backs off far longer than the straggler runs
+        docker_client.fail_creates(1, name='DockerSim_straggler_speculative')
+        manager = self.manager(docker_client, max_workers=3, speculate=3.0, max_retries=1, retry_backoff=10.0)
+        jobs = [SimJob('straggler', None)] + [SimJob(f'job{i}', None) for i in range(1, 8)]
+        tic = time.monotonic()
+        results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(jobs))
+        self.assertLess(time.monotonic() - tic, 3)
+        self.assertEqual(results, dict((sim_job.sim_name, True) for sim_job in jobs))
+        self.assertEqual(self.data_directory.joinpath('job_straggler', 'log.txt').read_text(),
+                         'job_straggler finished\n')
+        # the copy's container was never started
+        self.assertEqual(docker_client.containers.created, 8)
+        self.assertEqual(manager._cancelled_runs, set())
+
+    def fake_api_server(self, job_time=0.0):
+        socket_path = self.data_directory.joinpath('docker.sock')
+        server = multiprocessing.Process(target=serve_fake_docker_api, args=(socket_path, job_time), daemon=True)
+        server.start()
+        self.addCleanup(server.terminate)
+        while not socket_path.exists():
+            time.sleep(0.01)
+        return f'unix://{socket_path}'
+
+    def test_engines_against_docker_api(self):
+        docker_url = self.fake_api_server(job_time=0.01)
+        docker_client = docker.DockerClient(base_url=docker_url)
+        for engine in ENGINES:
+            data_directory = self.data_directory.joinpath(engine)
+            manager = OfflineSimManager('fake/sim-image', 8, data_directory, docker_client=docker_client,
+                                        engine=engine, docker_url=docker_url)
+            jobs = [SimJob(f'job{i}', None, command='fail' if i == 3 else f'-r {i}') for i in range(20)]
+            results = dict((sim_job.sim_name, succeeded) for sim_job, succeeded in manager.stream_computation(jobs))
+            self.assertFalse(results.pop('job3'), engine)
+            self.assertTrue(all(results.values()), engine)
+            self.assertEqual(data_directory.joinpath('job_job5', 'log.txt').read_text(), '-r 5 finished\n')
+            self.assertEqual(docker_client.containers.list(all=True), [])
+            self.assertEqual((manager.telemetry_summary['jobs'], manager.telemetry_summary['failed']), (20, 1), engine)
+
+    def test_async_engine_stops_inactive_containers(self):
+        docker_url = self.fake_api_server(job_time=5)
+        manager = self.manager(docker.DockerClient(base_url=docker_url), engine='asyncio', docker_url=docker_url)
+        manager._minimum_runtime = 0.05
+        manager._maximum_inactivity_time = 0.05
+        tic = time.monotonic()
+        results = list(manager.stream_computation([SimJob('silent', None)]))
+        self.assertFalse(results[0][1])
+        self.assertLess(time.monotonic() - tic, 2)
+        self.assertEqual(manager._journal.job('silent')['exit_code'], 137)
+
+
+if __name__ == '__main__':
+    unittest.main()